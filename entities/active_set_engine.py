@@ -0,0 +1,90 @@
+from entities.simulation_engine import SimulationEngine
+from utils.navigation import DELTA
+from utils.navigation import turn
+
+class ActiveSetEngine(SimulationEngine):
+    """Engine that keeps going after collisions until every car is done
+
+    Collided cars are frozen on the collision cell and, like cars that ran
+    out of commands, become parked obstacles. Each step only the active set
+    of cars that still have commands is moved, so the work per step shrinks
+    as cars finish or crash. Every collision of every step is reported, a car
+    driving onto parked cars collides with all of them.
+    """
+
+    stops_at_first_collision = False
+
+    def run(self, cars, start_step=0, states=None, stop_step=None):
+        self.check_whole_run(start_step, states, stop_step)
+        width, height = self.width, self.height
+        states = [(car.x, car.y, car.direction) for car in cars]
+        commands = [car.commands for car in cars]
+        collisions = []
+
+        # Cell -> indexes of cars that no longer move
+        parked = {}
+        active = []
+        for i, (x, y, _) in enumerate(states):
+            if commands[i]:
+                active.append(i)
+            elif (x, y) in parked:
+                parked[(x, y)].append(i)
+            else:
+                parked[(x, y)] = [i]
+
+        step = 0
+        while active:
+            moved = {}
+            for i in active:
+                x, y, direction = states[i]
+                cmd = commands[i][step]
+                if cmd in ('L', 'R'):
+                    direction = turn(direction, cmd)
+                else:  # Move forward
+                    dx, dy = DELTA[direction]
+                    # Boundary check
+                    if 0 <= x + dx < width and 0 <= y + dy < height:
+                        x += dx
+                        y += dy
+                states[i] = (x, y, direction)
+                if (x, y) in moved:
+                    moved[(x, y)].append(i)
+                else:
+                    moved[(x, y)] = [i]
+
+            groups = []
+            for cell, indexes in moved.items():
+                if cell in parked or len(indexes) > 1:
+                    groups.append((sorted(parked.get(cell, []) + indexes), cell))
+            if step == 0:
+                # Cars placed on the same cell without commands collide at step 1
+                for cell, indexes in parked.items():
+                    if len(indexes) > 1 and cell not in moved:
+                        groups.append((indexes, cell))
+
+            # Report cells in the order their first car was seen, like run_simulation
+            groups.sort()
+            crashed = set()
+            for indexes, cell in groups:
+                collisions.append({
+                    'step': step + 1,
+                    'position': cell,
+                    'cars': [cars[i] for i in indexes]
+                })
+                crashed.update(indexes)
+
+            # Finished and crashed cars leave the active set
+            step += 1
+            still_active = []
+            for i in active:
+                if i in crashed or step >= len(commands[i]):
+                    cell = states[i][:2]
+                    if cell in parked:
+                        parked[cell].append(i)
+                    else:
+                        parked[cell] = [i]
+                else:
+                    still_active.append(i)
+            active = still_active
+
+        return {'positions': states, 'collisions': collisions}
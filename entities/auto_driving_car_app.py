@@ -1,157 +1,177 @@
+from entities.active_set_engine import ActiveSetEngine
 from entities.field import Field
+from entities.loop_engine import LoopEngine
+from entities.simulation_engine import SimulationEngine
+from entities.streaming_engine import StreamingEngine
+from utils.command_loop import parse_commands
 from utils.navigation import DIRECTIONS
-from utils.navigation import DELTA
-from utils.navigation import turn
+from utils.result_writer import limit_lines
 
 class AutoDrivingCarApp:
-    def __init__(self):
+    def __init__(self, continue_after_collision=False, max_lines=None, page_size=None, cache=None, dispatcher=None):
         self.field = None
+        # Keep simulating the remaining cars after a collision and report all collisions
+        self.continue_after_collision = continue_after_collision
+        # Summarize car lists and results after max_lines lines
+        self.max_lines = max_lines
+        # Pause the results every page_size lines
+        self.page_size = page_size
+        # Optional ResultCache answering scenarios simulated before
+        self.cache = cache
+        # Optional EngineDispatcher picking the engine, and the report of its last pick
+        self.dispatcher = dispatcher
+        self.engine_report = None
+
+    def parse_field_dimensions(self, text):
+        """Parse field dimensions, raise ValueError with the error to show"""
+        try:
+            width, height = text.split()
+            width, height = int(width), int(height)
+        except ValueError:
+            raise ValueError("Please enter correct format")
+        if width <= 0 or height <= 0:
+            raise ValueError("Width and height must be positive integers")
+        return width, height
+
+    def parse_choice(self, text):
+        """Parse a menu choice, raise ValueError with the error to show"""
+        if text in ('1', '2'):
+            return text
+        raise ValueError("Please enter 1 or 2")
+
+    def parse_car_name(self, text):
+        """Parse a car name, raise ValueError with the error to show"""
+        name = text.strip()
+        if not name:
+            raise ValueError("Name cannot be empty")
+        if self.field.has_car(name):
+            raise ValueError("A car with same name already exists")
+        return name
+
+    def parse_car_position(self, text):
+        """Parse car position and direction, raise ValueError with the error to show"""
+        try:
+            x, y, direction = text.strip().split()
+            x, y = int(x), int(y)
+        except ValueError:
+            raise ValueError("Invalid input format, should be like '1 2 N'")
+        direction = direction.upper()
+
+        # Validate direction
+        if direction not in DIRECTIONS:
+            raise ValueError("Direction must be N, S, E, or W")
+
+        # Validate border
+        if not self.field.in_bounds(x, y):
+            raise ValueError(f"Position must be within field border (0-{self.field.width-1}, 0-{self.field.height-1})")
+
+        # Check if same position with other car
+        if self.field.is_occupied(x, y):
+            raise ValueError(f"Position ({x},{y}) is already occupied by another car")
+
+        return x, y, direction
+
+    def parse_car_commands(self, text):
+        """Parse car commands, raise ValueError with the error to show
+
+        Repeated parts can be written as (commands)*count, e.g. (FFRFF)*1000000,
+        and are kept as a CommandLoop instead of being expanded.
+        """
+        return parse_commands(text)
+
+    def prompt(self, message, parse):
+        """Ask until the input parses, showing each error"""
+        while True:
+            try:
+                return parse(input(message))
+            except ValueError as e:
+                print(f"Error: {e}")
 
     def get_field_dimensions(self):
         """Get and validate field dimensions input"""
-        while True:
-            try:
-                width, height = input("\nPlease enter the width and height of the simulation field in x y format: ").split()
-                width, height = int(width), int(height)
-                if width <= 0 or height <= 0:
-                    print("Error: Width and height must be positive integers")
-                    continue
-                return width, height
-            except ValueError:
-                print("Error: Please enter correct format")
+        return self.prompt("\nPlease enter the width and height of the simulation field in x y format: ", self.parse_field_dimensions)
 
     def get_main_choice(self):
         """Get user's main menu choice"""
-        while True:
-            choice = input("\nPlease choose from the following options:\n[1] Add a car to field\n[2] Run simulation\n> ")
-            if choice in ('1', '2'):
-                return choice
-            print("Error: Please enter 1 or 2")
+        return self.prompt("\nPlease choose from the following options:\n[1] Add a car to field\n[2] Run simulation\n> ", self.parse_choice)
 
     def get_car_name(self):
         """Get and validate car name"""
-        while True:
-            name = input("\nPlease enter the name of the car: ").strip()
-            if not name:
-                print("Error: Name cannot be empty")
-                continue
-            if any(car.name == name for car in self.field.cars):
-                print("Error: A car with same name already exists")
-                continue
-            return name
+        return self.prompt("\nPlease enter the name of the car: ", self.parse_car_name)
 
     def get_car_position(self):
         """Get and validate car position and direction"""
-        while True:
-            try:
-                x, y, direction = input("Please enter initial position of car in x y Direction format: ").strip().split()
-                x, y = int(x), int(y)
-                direction = direction.upper()
-                
-                # Validate direction
-                if direction not in DIRECTIONS:
-                    print("Error: Direction must be N, S, E, or W")
-                    continue
-                    
-                # Validate border
-                if not (0 <= x < self.field.width and 0 <= y < self.field.height):
-                    print(f"Error: Position must be within field border (0-{self.field.width-1}, 0-{self.field.height-1})")
-                    continue
-                    
-                # Check if same position with other car
-                if any(car.x == x and car.y == y for car in self.field.cars):
-                    print(f"Error: Position ({x},{y}) is already occupied by another car")
-                    continue
-                    
-                return x, y, direction
-            except ValueError:
-                print("Error: Invalid input format, should be like '1 2 N'")
+        return self.prompt("Please enter initial position of car in x y Direction format: ", self.parse_car_position)
 
     def get_car_commands(self):
         """Get and validate car commands"""
-        while True:
-            commands = input("Please enter the commands for car: ").upper()
-            if all(c in {'F', 'L', 'R'} for c in commands):
-                return commands
-            print("Error: Commands can only be F, L, or R")
+        return self.prompt("Please enter the commands for car: ", self.parse_car_commands)
 
     def get_restart_choice(self):
         """Get restart/exit choice"""
-        while True:
-            choice = input("\nChoose:\n[1] Start over\n[2] Exit\n> ")
-            if choice in ('1', '2'):
-                return choice
-            print("Error: Please enter 1 or 2")
+        return self.prompt("\nChoose:\n[1] Start over\n[2] Exit\n> ", self.parse_choice)
 
-    def show_simulation_results(self):
-        """Display simulation results"""
-        print("\nAfter simulation, the result is:")
-        if self.field.collisions:
+    def simulation_result_lines(self):
+        """Lines describing the simulation results"""
+        if self.continue_after_collision:
+            yield from self.all_collision_lines()
+        elif self.field.collisions:
             collision = self.field.collisions[0]
             for car in collision['cars']:
-                others = [c.name for c in collision['cars'] if c != car]
-                print(f"- {car.name}, collides with {', '.join(others)} at ({collision['position'][0]},{collision['position'][1]}) at step {collision['step']}")
+                yield self.collision_line(car, collision)
         else:
             for car in self.field.cars:
-                print(f"- {car.name}, ({car.x},{car.y}) {car.direction}")
+                yield f"- {car.name}, ({car.x},{car.y}) {car.direction}"
+
+    def collision_line(self, car, collision):
+        others = [c.name for c in collision['cars'] if c != car]
+        return f"- {car.name}, collides with {', '.join(others)} at ({collision['position'][0]},{collision['position'][1]}) at step {collision['step']}"
+
+    def show_simulation_results(self):
+        """Display simulation results"""
+        print("\nAfter simulation, the result is:")
+        lines = limit_lines(self.simulation_result_lines(), self.max_lines)
+        for i, line in enumerate(lines, 1):
+            print(line)
+            if self.page_size and i % self.page_size == 0:
+                if input("-- More (Enter to continue, q to stop) --").strip().lower() == 'q':
+                    break
+
+    def show_collision_preview(self, name):
+        """Warn right away if the new car would collide when simulated"""
+        preview = self.field.collision_preview(name)
+        if preview:
+            others = ', '.join(car.name for car in preview['cars'])
+            print(f"\nWarning: {name} will collide with {others} at ({preview['position'][0]},{preview['position'][1]}) at step {preview['step']}")
+
+    def all_collision_lines(self):
+        """Each car's first collision, then the cars that never collided"""
+        collided = set()
+        for collision in self.field.collisions:
+            for car in collision['cars']:
+                if car not in collided:
+                    collided.add(car)
+                    yield self.collision_line(car, collision)
+        for car in self.field.cars:
+            if car not in collided:
+                yield f"- {car.name}, ({car.x},{car.y}) {car.direction}"
 
     def run_simulation(self):
-        max_steps = max(len(car.commands) for car in self.field.cars)
-        
-        for step in range(max_steps):
-            # Use map to store car position and find collision
-            car_position_map = {}
-            car_next_position_map = {}
-
-            # Calculate new position for all cars
-            for car in self.field.cars:
-                # The car finished its commands, no position change
-                if step >= len(car.commands):
-                    new_x, new_y = car.x, car.y
-                    new_dir = car.direction
-                else:  
-                    cmd = car.commands[step]
-                    if cmd in ['L', 'R']:
-                        new_dir = turn(car.direction, cmd)
-                        new_x, new_y = car.x, car.y
-                    else:  # Move forward
-                        dx, dy = DELTA[car.direction]
-                        # Boundary check
-                        if 0 <= car.x + dx < self.field.width and 0 <= car.y + dy < self.field.height:
-                            new_x = car.x + dx
-                            new_y = car.y + dy
-                        else:
-                            new_x = car.x
-                            new_y = car.y
-                        new_dir = car.direction
-                
-                # Update next position map
-                car_next_position_map[car] = (new_x, new_y, new_dir)
-
-                # Add the car to map, later find collision
-                if (new_x, new_y) in car_position_map:
-                    car_position_map[(new_x, new_y)].append(car)
-                else:
-                    car_position_map[(new_x, new_y)] = [car]
-                                    
-            # Check any collisions
-            for pos, cars in car_position_map.items():
-                if len(cars) > 1:
-                    self.field.collisions.append({
-                        'step': step + 1,
-                        'position': pos,
-                        'cars': cars
-                    })
-
-            # Stop simulation if collision occur   
-            if self.field.collisions:
-                return
-            
-            # This step no collision, update cars positions
-            for car, (new_x, new_y, new_dir) in car_next_position_map.items():
-                car.x = new_x
-                car.y = new_y
-                car.direction = new_dir
+        if self.continue_after_collision:
+            engine = ActiveSetEngine.from_field(self.field)
+        elif self.dispatcher is not None:
+            engine, self.engine_report = self.dispatcher.engine_for(self.field)
+        elif self.field.has_streams:
+            engine = StreamingEngine.from_field(self.field)
+        elif self.field.has_loops:
+            engine = LoopEngine.from_field(self.field)
+        else:
+            engine = SimulationEngine.from_field(self.field)
+        if self.cache is not None:
+            result = self.cache.simulate(engine, self.field.cars)
+        else:
+            result = engine.run(self.field.cars)
+        engine.apply(self.field, result)
 
     def run(self):
         while True:
@@ -173,7 +193,8 @@ class AutoDrivingCarApp:
                     commands = self.get_car_commands()
                     
                     self.field.add_car(name, x, y, direction, commands)
-                    self.field.show_cars()
+                    self.field.show_cars(self.max_lines)
+                    self.show_collision_preview(name)
 
                 elif choice == '2':
                     # Run simulation
@@ -0,0 +1,169 @@
+import numpy as np
+
+from entities.simulation_engine import SimulationEngine
+from entities.vectorized_engine import DX
+from entities.vectorized_engine import DY
+from entities.vectorized_engine import FORWARD
+from entities.vectorized_engine import LEFT
+from entities.vectorized_engine import RIGHT
+from entities.vectorized_engine import encode_commands
+from entities.vectorized_engine import find_collisions
+from utils.navigation import DIRECTIONS
+from utils.navigation import DIRECTION_INDEX
+
+def scenario_steps(commands):
+    """Steps each scenario runs for, the longest command list of its cars"""
+    issued = commands.any(axis=1)
+    if not issued.shape[1]:
+        return np.zeros(len(commands), dtype=np.int64)
+    last = issued.shape[1] - np.argmax(issued[:, ::-1], axis=1)
+    return np.where(issued.any(axis=1), last, 0)
+
+class BatchedEngine(SimulationEngine):
+    """Engine simulating a batch of scenarios of the same fleet at once
+
+    States are (scenarios x cars) arrays stepped together. A scenario stops
+    at its own first collision, or once its cars ran out of commands, and is
+    then retired from the arrays, so later steps only cost the scenarios
+    still running. Every scenario gets exactly SimulationEngine's result.
+    """
+
+    def run(self, cars, start_step=0, states=None, stop_step=None):
+        self.check_whole_run(start_step, states, stop_step)
+        return self.run_scenarios([cars])['results'][0]
+
+    def run_scenarios(self, scenarios):
+        """Simulate lists of cars, every list with the same number of cars
+
+        Returns the per scenario 'results', each like run()'s, and the
+        aggregate 'stats' of run_arrays().
+        """
+        n = len(scenarios[0]) if scenarios else 0
+        if any(len(cars) != n for cars in scenarios):
+            raise ValueError("Every scenario must have the same number of cars")
+        xs = np.array([[car.x for car in cars] for cars in scenarios], dtype=np.int64).reshape(len(scenarios), n)
+        ys = np.array([[car.y for car in cars] for cars in scenarios], dtype=np.int64).reshape(len(scenarios), n)
+        dirs = np.array(
+            [[DIRECTION_INDEX[car.direction] for car in cars] for cars in scenarios], dtype=np.int64
+        ).reshape(len(scenarios), n)
+
+        # A sweep over start positions shares one command matrix
+        first = [car.commands for car in scenarios[0]] if scenarios else []
+        if all([car.commands for car in cars] == first for cars in scenarios[1:]):
+            commands = encode_commands(first)
+        else:
+            matrices = [encode_commands([car.commands for car in cars]) for cars in scenarios]
+            steps = max(matrix.shape[1] for matrix in matrices)
+            commands = np.zeros((len(scenarios), n, steps), dtype=np.uint8)
+            for b, matrix in enumerate(matrices):
+                commands[b, :, :matrix.shape[1]] = matrix
+
+        outcome = self.run_arrays(xs, ys, dirs, commands)
+        results = []
+        for b, cars in enumerate(scenarios):
+            positions = [
+                (x, y, DIRECTIONS[d])
+                for x, y, d in zip(outcome['xs'][b].tolist(), outcome['ys'][b].tolist(), outcome['dirs'][b].tolist())
+            ]
+            collisions = [
+                {'step': c['step'], 'position': c['position'], 'cars': [cars[i] for i in c['cars']]}
+                for c in outcome['collisions'][b]
+            ]
+            results.append({'positions': positions, 'collisions': collisions})
+        return {'results': results, 'stats': outcome['stats']}
+
+    def run_arrays(self, xs, ys, dirs, commands):
+        """Simulate (scenarios x cars) int64 state arrays
+
+        commands is a (cars x steps) matrix shared by every scenario or a
+        (scenarios x cars x steps) tensor, encoded like encode_commands().
+        Returns the final 'xs', 'ys' and 'dirs', each scenario's
+        'collision_step' (0 without collision) and 'collisions' with car
+        indexes, and the 'stats' of the whole batch.
+        """
+        width, height = self.width, self.height
+        batch, n = xs.shape
+        shared = commands.ndim == 2
+        if shared:
+            steps = np.full(batch, scenario_steps(commands[np.newaxis])[0])
+        else:
+            steps = scenario_steps(commands)
+        final_xs, final_ys, final_dirs = xs.copy(), ys.copy(), dirs.copy()
+        collision_step = np.zeros(batch, dtype=np.int64)
+        collisions = [[] for _ in range(batch)]
+
+        # Rows of the scenarios still running, and their states
+        active = np.flatnonzero(steps > 0)
+        xs, ys, dirs = xs[active], ys[active], dirs[active]
+
+        step = 0
+        while len(active):
+            # Retire scenarios whose cars have no command left
+            done = steps[active] <= step
+            if done.any():
+                retired = active[done]
+                final_xs[retired], final_ys[retired], final_dirs[retired] = xs[done], ys[done], dirs[done]
+                running = ~done
+                active, xs, ys, dirs = active[running], xs[running], ys[running], dirs[running]
+                if not len(active):
+                    break
+
+            column = commands[:, step] if shared else commands[active, :, step]
+            new_dirs = (dirs + (column == RIGHT) - (column == LEFT)) & 3
+            forward = column == FORWARD
+            new_xs = xs + DX[dirs] * forward
+            new_ys = ys + DY[dirs] * forward
+            blocked = (new_xs < 0) | (new_xs >= width) | (new_ys < 0) | (new_ys >= height)
+            new_xs[blocked] = xs[blocked]
+            new_ys[blocked] = ys[blocked]
+
+            # A scenario collides when its sorted cells hold a repeat
+            cells = new_xs * height + new_ys
+            sorted_cells = np.sort(cells, axis=1)
+            collided = (sorted_cells[:, 1:] == sorted_cells[:, :-1]).any(axis=1)
+            if collided.any():
+                for row in np.flatnonzero(collided).tolist():
+                    b = active[row]
+                    collision_step[b] = step + 1
+                    for indexes in find_collisions(cells[row]):
+                        i = indexes[0]
+                        collisions[b].append({
+                            'step': step + 1,
+                            'position': (int(new_xs[row, i]), int(new_ys[row, i])),
+                            'cars': indexes
+                        })
+                # Collided scenarios keep the states from before the collision step
+                retired = active[collided]
+                final_xs[retired], final_ys[retired], final_dirs[retired] = xs[collided], ys[collided], dirs[collided]
+                running = ~collided
+                active = active[running]
+                xs, ys, dirs = new_xs[running], new_ys[running], new_dirs[running]
+            else:
+                xs, ys, dirs = new_xs, new_ys, new_dirs
+            step += 1
+
+        return {
+            'xs': final_xs,
+            'ys': final_ys,
+            'dirs': final_dirs,
+            'collision_step': collision_step,
+            'collisions': collisions,
+            'stats': self.collision_stats(collision_step, collisions, n),
+        }
+
+    def collision_stats(self, collision_step, collisions, n):
+        """Share of scenarios that collided, their collision steps and how often each car collided, as plain Python values"""
+        collided = collision_step[collision_step > 0]
+        car_collisions = np.zeros(n, dtype=np.int64)
+        for scenario_collisions in collisions:
+            for collision in scenario_collisions:
+                car_collisions[collision['cars']] += 1
+        return {
+            'scenarios': len(collision_step),
+            'collided': len(collided),
+            'collision_rate': len(collided) / len(collision_step) if len(collision_step) else 0.0,
+            'first_collision_step': int(collided.min()) if len(collided) else None,
+            'mean_collision_step': float(collided.mean()) if len(collided) else None,
+            'last_collision_step': int(collided.max()) if len(collided) else None,
+            'car_collisions': car_collisions.tolist(),
+        }
@@ -0,0 +1,195 @@
+from bisect import bisect_right
+
+from entities.simulation_engine import SimulationEngine
+from entities.trajectory_engine import trajectory_segments
+from utils.command_program import TURN
+from utils.command_program import advance
+from utils.command_program import compile_commands
+from utils.command_program import forward_room
+from utils.navigation import DIRECTIONS
+from utils.navigation import DIRECTION_INDEX
+from utils.navigation import DX
+from utils.navigation import DY
+
+# Steps of trajectory a box covers, and the side of the grid cells boxes are hashed into.
+# A car moves at most one cell per step, so a box spans at most two grid cells per axis.
+WINDOW = 64
+
+def trajectory_boxes(x, y, direction, program, width, height, max_steps, window=WINDOW):
+    """Bounding boxes of a car's path over time windows, from its compiled program
+
+    Returns (first_step, last_step, min_x, max_x, min_y, max_y) boxes of the
+    cells the car is on after each step, from step 1 to max_steps. Forward
+    runs are closed in boxes every window steps, turns and blocked moves only
+    extend the current box, and the last box holds the car once it is done,
+    so the cost is one per op plus one per window of forward moves.
+    """
+    boxes = []
+    first = 1
+    min_x = max_x = x
+    min_y = max_y = y
+    for opcode, step, count, rotation in program.ops:
+        if opcode == TURN:
+            direction = (direction + rotation) & 3
+            continue
+        # Turns before this run may have filled the current box already
+        if step - first + 1 >= window:
+            boxes.append((first, step, min_x, max_x, min_y, max_y))
+            first = step + 1
+            min_x = max_x = x
+            min_y = max_y = y
+        # Forward runs are split at window ends, the first moves cells of the run aren't blocked
+        moves = min(count, forward_room(x, y, direction, width, height))
+        used = 0
+        while used < count:
+            taken = min(count - used, first + window - 1 - (step + used))
+            moved = min(taken, max(moves - used, 0))
+            x += DX[direction] * moved
+            y += DY[direction] * moved
+            if x < min_x:
+                min_x = x
+            elif x > max_x:
+                max_x = x
+            if y < min_y:
+                min_y = y
+            elif y > max_y:
+                max_y = y
+            used += taken
+            last = step + used
+            if last - first + 1 >= window:
+                boxes.append((first, last, min_x, max_x, min_y, max_y))
+                first = last + 1
+                min_x = max_x = x
+                min_y = max_y = y
+    if first <= max_steps:
+        boxes.append((first, max_steps, min_x, max_x, min_y, max_y))
+    return boxes
+
+def candidate_pairs(car_boxes, cell_size=WINDOW):
+    """Pairs of boxes of different cars overlapping in time and space
+
+    Boxes are hashed into a grid of cell_size cells and swept by first step
+    within each grid cell, so only boxes sharing a grid cell are compared.
+    Returns (first_step, last_step, car, other car) for the steps both boxes
+    cover, sorted by first step.
+    """
+    grid = {}
+    for i, boxes in enumerate(car_boxes):
+        for box in boxes:
+            _, _, min_x, max_x, min_y, max_y = box
+            for gx in range(min_x // cell_size, max_x // cell_size + 1):
+                for gy in range(min_y // cell_size, max_y // cell_size + 1):
+                    if (gx, gy) in grid:
+                        grid[(gx, gy)].append((box, i))
+                    else:
+                        grid[(gx, gy)] = [(box, i)]
+
+    pairs = set()
+    for entries in grid.values():
+        if len(entries) < 2:
+            continue
+        entries.sort()
+        # Boxes started before this one and not yet ended
+        active = []
+        for box, i in entries:
+            first, last, min_x, max_x, min_y, max_y = box
+            active = [entry for entry in active if entry[0][1] >= first]
+            for other, j in active:
+                if j != i and other[2] <= max_x and min_x <= other[3] and other[4] <= max_y and min_y <= other[5]:
+                    pairs.add((first, min(last, other[1]), min(i, j), max(i, j)))
+            active.append((box, i))
+    return sorted(pairs)
+
+def earliest_meeting(stays, other_stays, first, last):
+    """Earliest (step, cell) from first to last at which two cars share a cell, or None"""
+    a = max(bisect_right(stays, (first,)) - 1, 0)
+    b = max(bisect_right(other_stays, (first,)) - 1, 0)
+    while a < len(stays) and b < len(other_stays):
+        a_first, a_last, x, y = stays[a]
+        b_first, b_last, other_x, other_y = other_stays[b]
+        step = max(a_first, b_first, first)
+        if step > last:
+            return None
+        if (x, y) == (other_x, other_y) and step <= min(a_last, b_last):
+            return step, (x, y)
+        # Move on from the stay that ends first
+        if a_last < b_last:
+            a += 1
+        else:
+            b += 1
+    return None
+
+class BroadPhaseEngine(SimulationEngine):
+    """Engine checking collisions only between cars whose trajectories come close
+
+    Each car's path is bounded over time windows, from its compiled program
+    alone. Boxes hashed into a coarse grid give the candidate pairs
+    overlapping in both space and time, and only the cell by cell paths of
+    those cars are compared for the first collision, so cars far apart on a
+    big field cost nearly nothing to check.
+    """
+
+    window = WINDOW
+
+    def run(self, cars, start_step=0, states=None, stop_step=None):
+        self.check_whole_run(start_step, states, stop_step)
+        width, height = self.width, self.height
+        max_steps = max((len(car.commands) for car in cars), default=0)
+
+        # Collisions are only checked from step 1 to max_steps
+        programs = [compile_commands(car.commands) for car in cars]
+        car_boxes = [
+            trajectory_boxes(car.x, car.y, DIRECTION_INDEX[car.direction], program, width, height, max_steps, self.window)
+            for car, program in zip(cars, programs)
+        ]
+
+        # Cell stays, only computed for the cars of candidate pairs
+        car_stays = {}
+
+        def stays_of(i):
+            if i not in car_stays:
+                car = cars[i]
+                stays = []
+                for first, last, x, y in trajectory_segments(car.x, car.y, DIRECTION_INDEX[car.direction], programs[i], width, height):
+                    first = max(first, 1)
+                    last = max_steps if last is None else last
+                    if first <= last:
+                        stays.append((first, last, x, y))
+                car_stays[i] = stays
+            return car_stays[i]
+
+        # Earliest meeting of every candidate pair, candidates starting after it can't beat it
+        collision_step = None
+        meetings = []
+        for first, last, i, j in candidate_pairs(car_boxes, self.window):
+            if collision_step is not None and first > collision_step:
+                break
+            meeting = earliest_meeting(stays_of(i), stays_of(j), first, last)
+            if meeting is None:
+                continue
+            step, cell = meeting
+            if collision_step is None or step < collision_step:
+                collision_step = step
+                meetings = []
+            if step == collision_step:
+                meetings.append((cell, i, j))
+
+        collisions = []
+        if collision_step is not None:
+            cell_cars = {}
+            for cell, i, j in meetings:
+                cell_cars.setdefault(cell, set()).update((i, j))
+            # Report cells in the order their first car was seen, like run_simulation
+            for indexes, cell in sorted((sorted(indexes), cell) for cell, indexes in cell_cars.items()):
+                collisions.append({
+                    'step': collision_step,
+                    'position': cell,
+                    'cars': [cars[i] for i in indexes]
+                })
+
+        steps = max_steps if collision_step is None else collision_step - 1
+        positions = []
+        for car, program in zip(cars, programs):
+            x, y, direction = advance(program, car.x, car.y, DIRECTION_INDEX[car.direction], steps, width, height)
+            positions.append((x, y, DIRECTIONS[direction]))
+        return {'positions': positions, 'collisions': collisions}
@@ -1,4 +1,14 @@
 from entities.car import Car
+from entities.loop_engine import LoopEngine
+from entities.trajectory_index import TrajectoryIndex
+from utils.occupancy import DenseOccupancy
+from utils.occupancy import SparseOccupancy
+from utils.occupancy import make_occupancy
+from utils.occupancy import prefers_dense
+from utils.command_loop import CommandLoop
+from utils.command_stream import CommandStream
+from utils.navigation import DIRECTIONS
+from utils.result_writer import limit_lines
 
 class Field:
     def __init__(self, width, height):
@@ -6,12 +16,150 @@ class Field:
         self.height = height
         self.cars = []
         self.collisions = []
+        # Indexes of cars added through add_car/add_cars, for O(1) admission checks
+        self.car_names = {}
+        # Occupied cell -> car index, dense or sparse backend depending on the field
+        self.occupied = make_occupancy(width, height, 0)
+        # Built on the first collision preview, then kept up to date by add_car/add_cars
+        self.trajectory_index = None
+        # Looped commands are too long to index, previews then run a LoopEngine instead
+        self.has_loops = False
+        # Streamed commands can only be read once, by the simulation, so they get no previews
+        self.has_streams = False
+        # Car name -> preview simulated on fields with loops, adding cars doesn't change
+        # the previews of cars added before them, so these are only dropped by cars_changed
+        self.loop_previews = {}
+
+    def has_car(self, name):
+        return name in self.car_names
+
+    def is_occupied(self, x, y):
+        return (x, y) in self.occupied
+
+    def in_bounds(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def validate_car(self, name, x, y, direction, commands, names=(), positions=()):
+        """Raise ValueError if the car cannot be admitted to the field
+
+        names and positions hold cars admitted in the same batch but not yet added.
+        """
+        if not name:
+            raise ValueError("Name cannot be empty")
+        if name in self.car_names or name in names:
+            raise ValueError("A car with same name already exists")
+        if direction not in DIRECTIONS:
+            raise ValueError("Direction must be N, S, E, or W")
+        if not self.in_bounds(x, y):
+            raise ValueError(f"Position must be within field border (0-{self.width-1}, 0-{self.height-1})")
+        if (x, y) in self.occupied or (x, y) in positions:
+            raise ValueError(f"Position ({x},{y}) is already occupied by another car")
+        # Streams validate their commands as they are read
+        if not isinstance(commands, (CommandLoop, CommandStream)) and commands.strip('FLR'):
+            raise ValueError("Commands can only be F, L, or R")
 
     def add_car(self, name, x, y, direction, commands):
-        self.cars.append(Car(name, x, y, direction, commands))
+        if not self.in_bounds(x, y):
+            raise ValueError(f"Position must be within field border (0-{self.width-1}, 0-{self.height-1})")
+        car = Car(name, x, y, direction, commands)
+        self.occupied[(x, y)] = len(self.cars)
+        self.cars.append(car)
+        self.car_names[name] = car
+        self.select_occupancy()
+        if isinstance(commands, CommandLoop):
+            self.has_loops = True
+            self.trajectory_index = None
+        if isinstance(commands, CommandStream):
+            self.has_streams = True
+            self.trajectory_index = None
+        if self.trajectory_index is not None:
+            self.trajectory_index.add(car)
+        return car
 
-    def show_cars(self):
-        """Display current list of cars"""
-        print("\nYour current list of cars are:")
+    def add_cars(self, cars):
+        """Validate and add (name, x, y, direction, commands) tuples in one pass
+
+        Nothing is added if any car is invalid.
+        """
+        names = set()
+        positions = set()
+        new_cars = []
+        for name, x, y, direction, commands in cars:
+            self.validate_car(name, x, y, direction, commands, names, positions)
+            names.add(name)
+            positions.add((x, y))
+            new_cars.append(Car(name, x, y, direction, commands))
+
+        if any(isinstance(car.commands, CommandLoop) for car in new_cars):
+            self.has_loops = True
+            self.trajectory_index = None
+        if any(isinstance(car.commands, CommandStream) for car in new_cars):
+            self.has_streams = True
+            self.trajectory_index = None
+        first = len(self.cars)
+        self.cars.extend(new_cars)
+        self.select_occupancy()
+        for i, car in enumerate(new_cars, first):
+            self.car_names[car.name] = car
+            self.occupied[(car.x, car.y)] = i
+            if self.trajectory_index is not None:
+                self.trajectory_index.add(car)
+        return new_cars
+
+    def cars_changed(self):
+        """Rebuild what depends on the cars' states and commands, after they were changed in place"""
+        self.trajectory_index = None
+        self.loop_previews = {}
+        self.occupied = make_occupancy(self.width, self.height, len(self.cars))
+        for i, car in enumerate(self.cars):
+            self.occupied[(car.x, car.y)] = i
+
+    def select_occupancy(self):
+        """Move to a dense grid once the field is small and busy enough for it"""
+        if isinstance(self.occupied, SparseOccupancy) and prefers_dense(self.width, self.height, len(self.cars)):
+            dense = DenseOccupancy(self.width, self.height)
+            for cell, index in self.occupied.items():
+                dense[cell] = index
+            self.occupied = dense
+
+    def collision_preview(self, name):
+        """First collision of a car with the cars added before it, or None
+
+        Only the car's own trajectory is checked against the cached index of
+        the other cars' trajectories, so the answer stays fast as the field
+        grows. Returns a dict with the 'step', 'position' and other 'cars'.
+        Fields with looped commands simulate the cars up to this one instead,
+        fields with streamed commands have no previews.
+        """
+        if self.has_streams:
+            return None
+        if self.has_loops:
+            if name not in self.loop_previews:
+                self.loop_previews[name] = self.simulated_preview(name)
+            return self.loop_previews[name]
+        if self.trajectory_index is None:
+            self.trajectory_index = TrajectoryIndex(self.width, self.height)
+            for car in self.cars:
+                self.trajectory_index.add(car)
+        return self.trajectory_index.previews.get(name)
+
+    def simulated_preview(self, name):
+        """collision_preview() by running the cars up to this one on a LoopEngine"""
+        car = self.car_names[name]
+        cars = self.cars[:self.cars.index(car) + 1]
+        for collision in LoopEngine(self.width, self.height).run(cars)['collisions']:
+            if car in collision['cars']:
+                others = [other for other in collision['cars'] if other is not car]
+                return {'step': collision['step'], 'position': collision['position'], 'cars': others}
+        return None
+
+    def car_lines(self):
+        """Lines describing each car"""
         for car in self.cars:
-            print(f"- {car.name}, ({car.x},{car.y}) {car.direction}, {car.commands}")
\ No newline at end of file
+            yield f"- {car.name}, ({car.x},{car.y}) {car.direction}, {car.commands}"
+
+    def show_cars(self, max_lines=None):
+        """Display current list of cars, only the first max_lines cars if given"""
+        print("\nYour current list of cars are:")
+        for line in limit_lines(self.car_lines(), max_lines):
+            print(line)
@@ -0,0 +1,115 @@
+from math import lcm
+
+from entities.simulation_engine import SimulationEngine
+from utils.command_loop import CommandLoop
+from utils.command_program import advance
+from utils.command_program import compile_commands
+from utils.navigation import DIRECTION_INDEX
+
+# Step a car's state stays periodic from once its commands are exhausted
+FOREVER = float('inf')
+
+# Loop iterations searched for a repeating pose before giving up on a cycle
+MAX_CYCLE_SEARCH = 4096
+
+# Longest joint period checked step by step before jumping ahead
+MAX_PERIOD = 1 << 16
+
+def periodic_windows(car, width, height):
+    """(start, end, period) windows of steps over which a car's state is periodic
+
+    A car runs its loops alone, its collisions aside, so its pose at the
+    start of each loop iteration only depends on the previous one. Once such
+    a pose repeats, after a iterations and then every c iterations, the state
+    at step t equals the state at step t + period for start <= t and
+    t + period <= end. After its commands the car keeps still forever.
+    """
+    x, y, direction = car.x, car.y, DIRECTION_INDEX[car.direction]
+    commands = car.commands
+    segments = commands.segments if isinstance(commands, CommandLoop) else [(commands, 1)]
+    windows = []
+    time = 0
+    for body, count in segments:
+        program = compile_commands(body)
+        length = len(body)
+        if count == 1:
+            x, y, direction = advance(program, x, y, direction, length, width, height)
+            time += length
+            continue
+
+        # Poses at the start of each iteration, until one repeats
+        poses = [(x, y, direction)]
+        seen = {poses[0]: 0}
+        cycle = None
+        while len(poses) <= min(count, MAX_CYCLE_SEARCH):
+            pose = advance(program, *poses[-1], length, width, height)
+            if pose in seen:
+                cycle = seen[pose], len(poses) - seen[pose]
+                break
+            seen[pose] = len(poses)
+            poses.append(pose)
+
+        if cycle is not None:
+            first, iterations = cycle
+            windows.append((time + first * length, time + count * length, iterations * length))
+            x, y, direction = poses[first + (count - first) % iterations]
+        else:
+            x, y, direction = poses[-1]
+            for _ in range(count - len(poses) + 1):
+                x, y, direction = advance(program, x, y, direction, length, width, height)
+        time += count * length
+
+    windows.append((time, FOREVER, 1))
+    return windows
+
+class LoopEngine(SimulationEngine):
+    """Engine jumping over the repeats of looped commands
+
+    Steps are simulated like SimulationEngine until every car is inside a
+    periodic window. Then all cars together repeat with the least common
+    multiple of their periods: one period is simulated, collisions checked,
+    and if there were none the whole field is back in the same state, so
+    every further full period until a window ends is skipped at once.
+    """
+
+    def run(self, cars, start_step=0, states=None, stop_step=None):
+        self.check_whole_run(start_step, states, stop_step)
+        windows = [periodic_windows(car, self.width, self.height) for car in cars]
+        cursors = [0] * len(cars)
+        max_steps = max((len(car.commands) for car in cars), default=0)
+        states = [(car.x, car.y, car.direction) for car in cars]
+
+        step = 0
+        while step < max_steps:
+            periods = []
+            end = FOREVER
+            stop = max_steps
+            for i, car_windows in enumerate(windows):
+                j = cursors[i]
+                while car_windows[j][1] <= step:
+                    j += 1
+                cursors[i] = j
+                start, window_end, period = car_windows[j]
+                if start <= step and step + period <= window_end:
+                    periods.append(period)
+                    end = min(end, window_end)
+                    stop = min(stop, window_end)
+                else:
+                    stop = min(stop, start if start > step else window_end)
+
+            if len(periods) == len(cars):
+                period = lcm(*periods)
+                if period <= MAX_PERIOD and step + 2 * period <= end:
+                    result = super().run(cars, step, states, step + period)
+                    if result['collisions']:
+                        return result
+                    step += (end - step) // period * period
+                    continue
+
+            result = super().run(cars, step, states, stop)
+            if result['collisions']:
+                return result
+            states = result['positions']
+            step = stop
+
+        return {'positions': states, 'collisions': []}
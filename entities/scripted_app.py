@@ -0,0 +1,73 @@
+from entities.auto_driving_car_app import AutoDrivingCarApp
+from entities.field import Field
+from utils.result_writer import limit_lines
+
+# Buffered output is flushed every this many lines
+FLUSH_LINES = 4096
+
+class ScriptedApp(AutoDrivingCarApp):
+    """Prompt-free run of an interactive session transcript
+
+    Reads the same lines a user would type, one answer per line, validates
+    them with the interactive rules, and writes only the simulation results,
+    line for line as the interactive app prints them, through one buffered
+    writer. Errors go to err, an invalid line is skipped like a retried prompt.
+    """
+
+    def __init__(self, out, err=None, continue_after_collision=False, max_lines=None, cache=None, dispatcher=None):
+        super().__init__(continue_after_collision, max_lines, cache=cache, dispatcher=dispatcher)
+        self.out = out
+        self.err = err
+        self.buffer = []
+
+    def write(self, line):
+        self.buffer.append(line)
+        if len(self.buffer) >= FLUSH_LINES:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.out.write('\n'.join(self.buffer) + '\n')
+            self.buffer = []
+
+    def error(self, message):
+        if self.err is not None:
+            self.err.write(f"Error: {message}\n")
+
+    def run(self, lines):
+        """Run every session of the transcript lines until Exit or the end of input"""
+        state = 'field'
+        name = position = None
+        for line in lines:
+            line = line.rstrip('\r\n')
+            try:
+                if state == 'field':
+                    self.field = Field(*self.parse_field_dimensions(line))
+                    state = 'menu'
+                elif state == 'menu':
+                    if self.parse_choice(line) == '1':
+                        state = 'name'
+                    elif not self.field.cars:
+                        raise ValueError("Please add at least one car first")
+                    else:
+                        self.run_simulation()
+                        self.write("After simulation, the result is:")
+                        for result_line in limit_lines(self.simulation_result_lines(), self.max_lines):
+                            self.write(result_line)
+                        state = 'restart'
+                elif state == 'name':
+                    name = self.parse_car_name(line)
+                    state = 'position'
+                elif state == 'position':
+                    position = self.parse_car_position(line)
+                    state = 'commands'
+                elif state == 'commands':
+                    self.field.add_car(name, *position, self.parse_car_commands(line))
+                    state = 'menu'
+                elif state == 'restart':
+                    if self.parse_choice(line) == '2':
+                        break
+                    state = 'field'
+            except ValueError as e:
+                self.error(e)
+        self.flush()
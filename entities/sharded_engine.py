@@ -0,0 +1,254 @@
+import multiprocessing
+import os
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from entities.simulation_engine import SimulationEngine
+from entities.vectorized_engine import COMMAND_CODES
+from entities.vectorized_engine import DX
+from entities.vectorized_engine import DY
+from entities.vectorized_engine import FORWARD
+from entities.vectorized_engine import LEFT
+from entities.vectorized_engine import NO_COMMAND
+from entities.vectorized_engine import RIGHT
+from entities.vectorized_engine import find_collisions
+from utils.navigation import DIRECTIONS
+from utils.navigation import DIRECTION_INDEX
+
+# Car states shared by every tile worker, double buffered: block b reads buffer
+# b % 2 and writes the states at its end to the other one, so workers never
+# read states another worker is writing
+STATE_ARRAYS = ('xs0', 'ys0', 'dirs0', 'xs1', 'ys1', 'dirs1')
+
+# Every car's commands back to back, with where each car's commands start and how many there are
+COMMAND_ARRAYS = ('command_starts', 'command_lengths')
+
+# Steps simulated per message to the workers
+BLOCK_STEPS = 128
+
+def attach_arrays(names, n, command_bytes):
+    """Numpy views over the shared memory blocks, plus the blocks to close"""
+    blocks = {name: SharedMemory(name=block) for name, block in names.items()}
+    arrays = {
+        name: np.ndarray((n,), dtype=np.int64, buffer=blocks[name].buf)
+        for name in STATE_ARRAYS + COMMAND_ARRAYS
+    }
+    arrays['command_data'] = np.ndarray((command_bytes,), dtype=np.uint8, buffer=blocks['command_data'].buf)
+    return arrays, blocks
+
+def block_commands(arrays, owned, first, steps):
+    """(cars x steps) command codes of the owned cars from step first on, NO_COMMAND once done"""
+    columns = first + np.arange(steps)
+    lengths = arrays['command_lengths'][owned]
+    indexes = arrays['command_starts'][owned, np.newaxis] + columns
+    has_command = columns < lengths[:, np.newaxis]
+    data = arrays['command_data']
+    codes = COMMAND_CODES[data[np.minimum(indexes, max(len(data) - 1, 0))]] if len(data) else np.zeros_like(indexes)
+    return np.where(has_command, codes, NO_COMMAND).astype(np.uint8)
+
+def tile_worker(conn, tile, names, n, command_bytes, width, height, tile_width):
+    """Simulate the cars starting a block inside one vertical strip of the field
+
+    Answers the engine's messages, one round trip each per block of steps:
+      ('move', first, steps, parity)  simulate the owned cars for the block,
+                                      write their states at its end and reply
+                                      their (step, car, x, y) visits of other
+                                      tiles as {tile: visits}, the halo
+      ('collide', visits)             take the halo visits of this tile and
+                                      reply its earliest collision as
+                                      (step, [(cars, (x, y))]), or None
+      ('rewind', step, parity)        write the states after step of the
+                                      block instead, once a collision is found
+      ('stop',)                       detach and exit
+    Cars keep moving on their own commands when they leave the tile within a
+    block, cars don't affect each other's paths until the first collision.
+    """
+    arrays, blocks = attach_arrays(names, n, command_bytes)
+    owned = path_xs = path_ys = path_dirs = None
+    xs = ys = dirs = None
+    try:
+        while True:
+            message = conn.recv()
+            if message[0] == 'move':
+                _, first, steps, parity = message
+                xs, ys, dirs = (arrays[f'{name}{parity}'] for name in ('xs', 'ys', 'dirs'))
+                owned = np.flatnonzero(xs // tile_width == tile)
+                x, y, d = xs[owned], ys[owned], dirs[owned]
+                commands = block_commands(arrays, owned, first, steps)
+                path_xs = np.empty((steps, len(owned)), dtype=np.int64)
+                path_ys = np.empty((steps, len(owned)), dtype=np.int64)
+                path_dirs = np.empty((steps, len(owned)), dtype=np.int64)
+                for k in range(steps):
+                    column = commands[:, k]
+                    new_d = (d + (column == RIGHT) - (column == LEFT)) & 3
+                    forward = column == FORWARD
+                    new_x = x + DX[d] * forward
+                    new_y = y + DY[d] * forward
+                    blocked = (new_x < 0) | (new_x >= width) | (new_y < 0) | (new_y >= height)
+                    new_x[blocked] = x[blocked]
+                    new_y[blocked] = y[blocked]
+                    x, y, d = new_x, new_y, new_d
+                    path_xs[k], path_ys[k], path_dirs[k] = x, y, d
+                if steps:
+                    other = 1 - parity
+                    arrays[f'xs{other}'][owned] = x
+                    arrays[f'ys{other}'][owned] = y
+                    arrays[f'dirs{other}'][owned] = d
+
+                # Visits of other tiles, only cars near the tile border make any
+                visited = path_xs // tile_width
+                outgoing = {}
+                for destination in np.unique(visited[visited != tile]).tolist():
+                    k, i = np.nonzero(visited == destination)
+                    outgoing[destination] = np.stack([k, owned[i], path_xs[k, i], path_ys[k, i]])
+                conn.send(outgoing)
+            elif message[0] == 'collide':
+                k, i = np.nonzero(path_xs // tile_width == tile)
+                visits = np.concatenate(
+                    [np.stack([k, owned[i], path_xs[k, i], path_ys[k, i]])] + list(message[1]), axis=1
+                )
+                steps, cars, cell_xs, cell_ys = visits
+                keys = (steps * width + cell_xs) * height + cell_ys
+                sorted_keys = np.sort(keys)
+                repeated = sorted_keys[1:][sorted_keys[1:] == sorted_keys[:-1]]
+                if len(repeated):
+                    step = int(repeated[0] // (width * height))
+                    at_step = np.flatnonzero(steps == step)
+                    at_step = at_step[np.argsort(cars[at_step], kind='stable')]
+                    groups = [
+                        (cars[at_step[g]].tolist(), (int(cell_xs[at_step[g[0]]]), int(cell_ys[at_step[g[0]]])))
+                        for g in find_collisions(cell_xs[at_step] * height + cell_ys[at_step])
+                    ]
+                    conn.send((step, groups))
+                else:
+                    conn.send(None)
+            elif message[0] == 'rewind':
+                _, step, parity = message
+                other = 1 - parity
+                if step > 0:
+                    arrays[f'xs{other}'][owned] = path_xs[step - 1]
+                    arrays[f'ys{other}'][owned] = path_ys[step - 1]
+                    arrays[f'dirs{other}'][owned] = path_dirs[step - 1]
+                else:
+                    for name in ('xs', 'ys', 'dirs'):
+                        arrays[f'{name}{other}'][owned] = arrays[f'{name}{parity}'][owned]
+                conn.send(None)
+            else:
+                break
+    finally:
+        # Views must go before their shared memory can be closed
+        del xs, ys, dirs, arrays
+        for block in blocks.values():
+            block.close()
+
+class ShardedEngine(SimulationEngine):
+    """Engine splitting one field into vertical tiles simulated by worker processes
+
+    Car states and commands live in shared memory. Each worker simulates the
+    cars of its tile for a block of steps at once, then hands the steps its
+    cars spend in other tiles over to those tiles (the halo exchange), and
+    checks collisions among the cars in its tile step by step. The engine
+    takes the earliest collision over every tile, the global first-collision
+    reduction, so the result is exactly SimulationEngine's with two round
+    trips per block of steps.
+    """
+
+    block_steps = BLOCK_STEPS
+
+    def __init__(self, width, height, observer=None, workers=None):
+        super().__init__(width, height, observer)
+        self.workers = workers or os.cpu_count() or 1
+
+    def run(self, cars, start_step=0, states=None, stop_step=None):
+        self.check_whole_run(start_step, states, stop_step)
+        n = len(cars)
+        commands = [car.commands for car in cars]
+        command_data = ''.join(commands).encode('ascii')
+        max_steps = max((len(c) for c in commands), default=0)
+        tile_width = -(-self.width // min(self.workers, self.width))
+        tiles = -(-self.width // tile_width)
+
+        blocks = {}
+        processes = []
+        conns = []
+        try:
+            for name in STATE_ARRAYS + COMMAND_ARRAYS:
+                blocks[name] = SharedMemory(create=True, size=max(1, n * 8))
+            blocks['command_data'] = SharedMemory(create=True, size=max(1, len(command_data)))
+            names = {name: block.name for name, block in blocks.items()}
+            arrays = {}
+            for name in STATE_ARRAYS + COMMAND_ARRAYS:
+                arrays[name] = np.ndarray((n,), dtype=np.int64, buffer=blocks[name].buf)
+            arrays['command_data'] = np.ndarray((len(command_data),), dtype=np.uint8, buffer=blocks['command_data'].buf)
+            arrays['xs0'][:] = [car.x for car in cars]
+            arrays['ys0'][:] = [car.y for car in cars]
+            arrays['dirs0'][:] = [DIRECTION_INDEX[car.direction] for car in cars]
+            lengths = np.fromiter((len(c) for c in commands), dtype=np.int64, count=n)
+            arrays['command_lengths'][:] = lengths
+            arrays['command_starts'][:] = np.cumsum(lengths) - lengths
+            arrays['command_data'][:] = np.frombuffer(command_data, dtype=np.uint8)
+
+            context = multiprocessing.get_context()
+            for tile in range(tiles):
+                parent, child = context.Pipe()
+                process = context.Process(
+                    target=tile_worker,
+                    args=(child, tile, names, n, len(command_data), self.width, self.height, tile_width),
+                    daemon=True
+                )
+                process.start()
+                processes.append(process)
+                conns.append(parent)
+
+            collisions = []
+            parity = 0
+            for first in range(0, max_steps, self.block_steps):
+                steps = min(self.block_steps, max_steps - first)
+                for conn in conns:
+                    conn.send(('move', first, steps, parity))
+                halos = [[] for _ in range(tiles)]
+                for conn in conns:
+                    for destination, visits in conn.recv().items():
+                        halos[destination].append(visits)
+                for tile, conn in enumerate(conns):
+                    conn.send(('collide', halos[tile]))
+                found = [found for found in (conn.recv() for conn in conns) if found is not None]
+                if found:
+                    step = min(step for step, _ in found)
+                    groups = [group for found_step, tile_groups in found if found_step == step for group in tile_groups]
+                    # Report cells in the order their first car was seen, like run_simulation
+                    for indexes, position in sorted(groups):
+                        collisions.append({
+                            'step': first + step + 1,
+                            'position': position,
+                            'cars': [cars[j] for j in indexes]
+                        })
+                    # Keep the states from before the collision step
+                    for conn in conns:
+                        conn.send(('rewind', step, parity))
+                    for conn in conns:
+                        conn.recv()
+                    parity = 1 - parity
+                    break
+                parity = 1 - parity
+
+            positions = [
+                (x, y, DIRECTIONS[d])
+                for x, y, d in zip(
+                    arrays[f'xs{parity}'].tolist(), arrays[f'ys{parity}'].tolist(), arrays[f'dirs{parity}'].tolist()
+                )
+            ]
+            del arrays
+            return {'positions': positions, 'collisions': collisions}
+        finally:
+            for conn in conns:
+                try:
+                    conn.send(('stop',))
+                except (BrokenPipeError, OSError):
+                    pass
+            for process in processes:
+                process.join()
+            for block in blocks.values():
+                block.close()
+                block.unlink()
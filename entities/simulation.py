@@ -0,0 +1,49 @@
+from collections import namedtuple
+
+from entities.loop_engine import LoopEngine
+from entities.simulation_engine import SimulationEngine
+from entities.streaming_engine import StreamingEngine
+from utils.command_loop import CommandLoop
+from utils.command_stream import CommandStream
+
+# Immutable inputs and outputs of simulate(). Engines read cars through their
+# x, y, direction and commands attributes only, so a CarSpec can stand in for
+# a Car without ever being written to.
+CarSpec = namedtuple('CarSpec', 'name x y direction commands')
+FieldSpec = namedtuple('FieldSpec', 'width height cars')
+CarState = namedtuple('CarState', 'name x y direction')
+Collision = namedtuple('Collision', 'step position cars')
+Result = namedtuple('Result', 'cars collisions')
+
+def field_spec(field):
+    """Immutable snapshot of a Field's dimensions and cars"""
+    cars = tuple(CarSpec(car.name, car.x, car.y, car.direction, car.commands) for car in field.cars)
+    return FieldSpec(field.width, field.height, cars)
+
+def simulate(spec, engine_class=None):
+    """Simulate a FieldSpec and return a Result, without side effects
+
+    The spec is only read and every call builds its own engine, so one spec
+    can be simulated from many threads at once. The Result holds the final
+    CarState of every car, in the spec's order, and the Collision tuples with
+    the names of the cars involved. engine_class defaults to StreamingEngine
+    for streamed commands, which are used up by the run, LoopEngine for looped
+    commands and SimulationEngine otherwise.
+    """
+    if engine_class is None:
+        if any(isinstance(car.commands, CommandStream) for car in spec.cars):
+            engine_class = StreamingEngine
+        elif any(isinstance(car.commands, CommandLoop) for car in spec.cars):
+            engine_class = LoopEngine
+        else:
+            engine_class = SimulationEngine
+    outcome = engine_class(spec.width, spec.height).run(spec.cars)
+    cars = tuple(
+        CarState(car.name, x, y, direction)
+        for car, (x, y, direction) in zip(spec.cars, outcome['positions'])
+    )
+    collisions = tuple(
+        Collision(c['step'], tuple(c['position']), tuple(car.name for car in c['cars']))
+        for c in outcome['collisions']
+    )
+    return Result(cars, collisions)
@@ -0,0 +1,194 @@
+from utils.navigation import DELTA
+from utils.navigation import turn
+
+class SimulationEngine:
+    """Headless simulation of cars on a field, no input() or print() involved"""
+
+    stops_at_first_collision = True
+
+    def __init__(self, width, height, observer=None):
+        self.width = width
+        self.height = height
+        # Optional SimulationObserver, runs without one take the uninstrumented loop.
+        # Observed runs go through trace(), engines with their own run() can't report
+        if observer is not None and type(self).run is not SimulationEngine.run:
+            raise NotImplementedError(f"{type(self).__name__} can't report to an observer")
+        self.observer = observer
+
+    @classmethod
+    def from_field(cls, field, observer=None):
+        return cls(field.width, field.height, observer)
+
+    def run(self, cars, start_step=0, states=None, stop_step=None):
+        """Run all cars' commands without mutating them
+
+        Returns a dict with the final 'positions' as (x, y, direction) per car,
+        in the same order as cars, and the 'collisions' of the step the
+        simulation stopped at, in the same format as Field.collisions.
+        To resume a run, pass the states of the cars after start_step.
+        To run only part of it, pass the step to stop before.
+        """
+        if self.observer is not None:
+            return self.run_observed(cars, start_step, states, stop_step)
+        width, height = self.width, self.height
+        if states is None:
+            states = [(car.x, car.y, car.direction) for car in cars]
+        states = list(states)
+        commands = [car.commands for car in cars]
+        max_steps = max((len(c) for c in commands), default=0)
+        if stop_step is not None:
+            max_steps = min(max_steps, stop_step)
+        collisions = []
+
+        for step in range(start_step, max_steps):
+            # Use map to store car position and find collision
+            car_position_map = {}
+            next_states = []
+
+            # Calculate new position for all cars
+            for i, (x, y, direction) in enumerate(states):
+                car_commands = commands[i]
+                # The car finished its commands, no position change
+                if step < len(car_commands):
+                    cmd = car_commands[step]
+                    if cmd in ('L', 'R'):
+                        direction = turn(direction, cmd)
+                    else:  # Move forward
+                        dx, dy = DELTA[direction]
+                        # Boundary check
+                        if 0 <= x + dx < width and 0 <= y + dy < height:
+                            x += dx
+                            y += dy
+
+                next_states.append((x, y, direction))
+                if (x, y) in car_position_map:
+                    car_position_map[(x, y)].append(i)
+                else:
+                    car_position_map[(x, y)] = [i]
+
+            # Check any collisions
+            if len(car_position_map) < len(states):
+                for pos, indexes in car_position_map.items():
+                    if len(indexes) > 1:
+                        collisions.append({
+                            'step': step + 1,
+                            'position': pos,
+                            'cars': [cars[i] for i in indexes]
+                        })
+                # Stop simulation if collision occur
+                break
+
+            # This step no collision, update cars positions
+            states = next_states
+
+        return {'positions': states, 'collisions': collisions}
+
+    def check_whole_run(self, start_step, states, stop_step):
+        """Raise for resumed or partial runs, in engines that only run from step 0 to the end"""
+        if start_step or states is not None or stop_step is not None:
+            raise NotImplementedError(f"{type(self).__name__} can't resume or stop a run early, use SimulationEngine")
+
+    def run_observed(self, cars, start_step=0, states=None, stop_step=None):
+        """run() through trace(), which reports every step to the observer"""
+        if states is None:
+            states = [(car.x, car.y, car.direction) for car in cars]
+        states = list(states)
+        collisions = []
+        for record in self.trace(cars, start_step, states, stop_step):
+            for i, x, y, direction in record['changes']:
+                states[i] = (x, y, direction)
+            collisions = record['collisions']
+        return {'positions': states, 'collisions': collisions}
+
+    def trace(self, cars, start_step=0, states=None, stop_step=None):
+        """Yield the state changes of each step without mutating the cars
+
+        Each step yields a dict with the 'step' number, the 'changes' as
+        (car index, x, y, direction) of the cars whose state changed, and the
+        step's 'collisions'. A step with collisions is the last one and, like
+        in run(), its changes are not applied, so they are left empty.
+        With an observer, each step is split into timed phases and its
+        counters and collisions are reported before it is yielded.
+        """
+        observer = self.observer
+        clock = observer.clock if observer is not None else float
+        width, height = self.width, self.height
+        if states is None:
+            states = [(car.x, car.y, car.direction) for car in cars]
+        states = list(states)
+        commands = [car.commands for car in cars]
+        max_steps = max((len(c) for c in commands), default=0)
+        if stop_step is not None:
+            max_steps = min(max_steps, stop_step)
+
+        for step in range(start_step, max_steps):
+            moves = turns = blocked = idle = 0
+            started = clock()
+
+            # Calculate new position for all cars
+            changes = []
+            positions = []
+            for i, state in enumerate(states):
+                x, y, direction = state
+                car_commands = commands[i]
+                if step >= len(car_commands):
+                    idle += 1
+                else:
+                    cmd = car_commands[step]
+                    if cmd in ('L', 'R'):
+                        direction = turn(direction, cmd)
+                        turns += 1
+                    else:  # Move forward
+                        dx, dy = DELTA[direction]
+                        if 0 <= x + dx < width and 0 <= y + dy < height:
+                            x += dx
+                            y += dy
+                            moves += 1
+                        else:
+                            blocked += 1
+                    if (x, y, direction) != state:
+                        changes.append((i, x, y, direction))
+                positions.append((x, y))
+            moved = clock()
+
+            # Use map to store car position and find collision
+            car_position_map = {}
+            for i, position in enumerate(positions):
+                if position in car_position_map:
+                    car_position_map[position].append(i)
+                else:
+                    car_position_map[position] = [i]
+            collisions = []
+            if len(car_position_map) < len(positions):
+                collisions = [
+                    {'step': step + 1, 'position': pos, 'cars': [cars[i] for i in indexes]}
+                    for pos, indexes in car_position_map.items() if len(indexes) > 1
+                ]
+                if observer is not None:
+                    for collision in collisions:
+                        observer.record_collision(collision)
+            collided = clock()
+
+            # Commit only if this step has no collision
+            if not collisions:
+                for i, x, y, direction in changes:
+                    states[i] = (x, y, direction)
+            committed = clock()
+
+            if observer is not None:
+                counters = {'moves': moves, 'turns': turns, 'blocked': blocked, 'idle': idle, 'cells_checked': len(positions)}
+                phase_times = {'move': moved - started, 'collide': collided - moved, 'commit': committed - collided}
+                observer.record_step(step + 1, counters, phase_times)
+            if collisions:
+                yield {'step': step + 1, 'changes': [], 'collisions': collisions}
+                return
+            yield {'step': step + 1, 'changes': changes, 'collisions': []}
+
+    def apply(self, field, result):
+        """Write a run() result back onto the field's cars, like run_simulation did"""
+        for car, (x, y, direction) in zip(field.cars, result['positions']):
+            car.x = x
+            car.y = y
+            car.direction = direction
+        field.collisions.extend(result['collisions'])
+        field.cars_changed()
@@ -0,0 +1,50 @@
+import time
+
+PHASES = ('move', 'collide', 'commit')
+COUNTERS = ('steps', 'moves', 'turns', 'blocked', 'idle', 'cells_checked', 'collisions')
+
+class SimulationObserver:
+    """Per-phase timings and per-step counters of a SimulationEngine run
+
+    Phases are 'move' (computing every car's next state), 'collide' (building
+    the position map and finding collisions) and 'commit' (updating states).
+    Each step on_step is called with the step number and that step's
+    counters, and on_collision with every collision. Totals accumulate over
+    every observed run.
+    """
+
+    clock = staticmethod(time.perf_counter)
+
+    def __init__(self, on_step=None, on_collision=None):
+        self.on_step = on_step
+        self.on_collision = on_collision
+        self.phase_times = dict.fromkeys(PHASES, 0.0)
+        self.totals = dict.fromkeys(COUNTERS, 0)
+
+    def record_step(self, step, counters, phase_times):
+        """Called by the engine once per simulated step"""
+        for phase, elapsed in phase_times.items():
+            self.phase_times[phase] += elapsed
+        self.totals['steps'] += 1
+        for name, value in counters.items():
+            self.totals[name] += value
+        if self.on_step:
+            self.on_step(step, counters)
+
+    def record_collision(self, collision):
+        """Called by the engine for every collision found"""
+        self.totals['collisions'] += 1
+        if self.on_collision:
+            self.on_collision(collision)
+
+    def summary(self):
+        """Totals and phase timings, with the share of time spent in each phase"""
+        total_time = sum(self.phase_times.values())
+        return {
+            **self.totals,
+            'phase_times': dict(self.phase_times),
+            'phase_shares': {
+                phase: elapsed / total_time if total_time else 0.0
+                for phase, elapsed in self.phase_times.items()
+            },
+        }
@@ -0,0 +1,86 @@
+from os.path import commonprefix
+
+from entities.simulation_engine import SimulationEngine
+from utils.scenario_stream import dump_field
+from utils.scenario_stream import load_field
+
+class SimulationSession:
+    """What-if re-simulation of a field that reuses checkpointed steps
+
+    Running the field keeps the state of every car each checkpoint_interval
+    steps. When a car's commands are edited, steps before the first edited
+    command cannot change, so the run resumes from the last checkpoint
+    before it instead of from step 0.
+    """
+
+    def __init__(self, field, checkpoint_interval=256):
+        self.field = field
+        self.engine = SimulationEngine.from_field(field)
+        self.checkpoint_interval = checkpoint_interval
+        self.car_indexes = {car.name: i for i, car in enumerate(field.cars)}
+        # Step -> (x, y, direction) of every car after that step
+        self.checkpoints = {0: tuple((car.x, car.y, car.direction) for car in field.cars)}
+        self.result = None
+
+    def run(self, start_step=0):
+        """Run from a checkpointed step, replacing every later checkpoint"""
+        states = list(self.checkpoints[start_step])
+        self.checkpoints = {step: s for step, s in self.checkpoints.items() if step <= start_step}
+        collisions = []
+        for record in self.engine.trace(self.field.cars, start_step, states):
+            if record['collisions']:
+                collisions = record['collisions']
+                break
+            for i, x, y, direction in record['changes']:
+                states[i] = (x, y, direction)
+            if record['step'] % self.checkpoint_interval == 0:
+                self.checkpoints[record['step']] = tuple(states)
+        self.result = {'positions': states, 'collisions': collisions}
+        return self.result
+
+    def update_commands(self, name, commands):
+        """Replace a car's commands and re-run only the steps the edit can affect"""
+        car = self.field.cars[self.car_indexes[name]]
+        # Command i is run at step i + 1, so steps up to the common prefix are unchanged
+        unchanged_steps = len(commonprefix([car.commands, commands]))
+        car.commands = commands
+        self.field.cars_changed()
+        if self.result is not None:
+            if self.result['collisions'] and unchanged_steps >= self.result['collisions'][0]['step']:
+                # The edit is after the collision that stopped the run
+                return self.result
+            start_step = max(step for step in self.checkpoints if step <= unchanged_steps)
+        else:
+            start_step = 0
+        return self.run(start_step)
+
+    def state_at(self, step):
+        """(x, y, direction) of every car after a step, from the nearest checkpoint"""
+        start_step = max(s for s in self.checkpoints if s <= step)
+        states = list(self.checkpoints[start_step])
+        if start_step == step:
+            return states
+        for record in self.engine.trace(self.field.cars, start_step, states):
+            if record['collisions']:
+                raise ValueError(f"The simulation stops at step {record['step']}")
+            for i, x, y, direction in record['changes']:
+                states[i] = (x, y, direction)
+            if record['step'] == step:
+                return states
+        # The cars ran out of commands before that step
+        return states
+
+    def snapshot(self, step):
+        """JSON-serializable snapshot of the field and every car's state after a step"""
+        return {
+            'scenario': dump_field(self.field),
+            'step': step,
+            'states': [list(state) for state in self.state_at(step)]
+        }
+
+    @classmethod
+    def restore(cls, snapshot, checkpoint_interval=256):
+        """Session resuming from a snapshot, without re-running its steps"""
+        session = cls(load_field(snapshot['scenario']), checkpoint_interval)
+        session.checkpoints[snapshot['step']] = tuple(tuple(state) for state in snapshot['states'])
+        return session
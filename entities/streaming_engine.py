@@ -0,0 +1,81 @@
+from entities.simulation_engine import SimulationEngine
+from utils.command_stream import CommandStream
+from utils.navigation import DELTA
+from utils.navigation import turn
+
+def command_chunks(commands):
+    """Iterator over chunks of a car's commands, whatever they are stored as"""
+    if isinstance(commands, CommandStream):
+        return commands
+    if isinstance(commands, str):
+        return iter([commands])
+    return CommandStream.from_iterable(commands)
+
+class StreamingEngine(SimulationEngine):
+    """Engine pulling commands from each car a chunk at a time
+
+    Cars' commands can be CommandStreams of unknown length, fed from
+    iterators, files or buffers, as well as strings or CommandLoops. Each car
+    only keeps its current chunk and the simulation runs until every source
+    ran out or the first collision, with SimulationEngine's result. Running
+    consumes the streams, so a field of streams can be run only once.
+    """
+
+    def run(self, cars, start_step=0, states=None, stop_step=None):
+        self.check_whole_run(start_step, states, stop_step)
+        width, height = self.width, self.height
+        states = [(car.x, car.y, car.direction) for car in cars]
+        sources = [command_chunks(car.commands) for car in cars]
+        buffers = [""] * len(cars)
+        offsets = [0] * len(cars)
+        running = list(range(len(cars)))
+        collisions = []
+
+        step = 0
+        while True:
+            # Refill cars at the end of their chunk, cars without commands left are done
+            still_running = []
+            for i in running:
+                while offsets[i] == len(buffers[i]):
+                    chunk = next(sources[i], None)
+                    if chunk is None:
+                        break
+                    buffers[i], offsets[i] = chunk, 0
+                if offsets[i] < len(buffers[i]):
+                    still_running.append(i)
+            running = still_running
+            if not running:
+                break
+
+            # Calculate new position for the cars with commands
+            next_states = list(states)
+            for i in running:
+                cmd = buffers[i][offsets[i]]
+                offsets[i] += 1
+                x, y, direction = states[i]
+                if cmd in ('L', 'R'):
+                    direction = turn(direction, cmd)
+                else:  # Move forward
+                    dx, dy = DELTA[direction]
+                    if 0 <= x + dx < width and 0 <= y + dy < height:
+                        x += dx
+                        y += dy
+                next_states[i] = (x, y, direction)
+
+            # Use map to store car position and find collision, finished cars included
+            car_position_map = {}
+            for i, (x, y, _) in enumerate(next_states):
+                if (x, y) in car_position_map:
+                    car_position_map[(x, y)].append(i)
+                else:
+                    car_position_map[(x, y)] = [i]
+            if len(car_position_map) < len(next_states):
+                for pos, indexes in car_position_map.items():
+                    if len(indexes) > 1:
+                        collisions.append({'step': step + 1, 'position': pos, 'cars': [cars[i] for i in indexes]})
+                break
+
+            states = next_states
+            step += 1
+
+        return {'positions': states, 'collisions': collisions}
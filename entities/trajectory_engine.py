@@ -0,0 +1,107 @@
+from entities.simulation_engine import SimulationEngine
+from utils.command_program import TURN
+from utils.command_program import advance
+from utils.command_program import compile_commands
+from utils.command_program import forward_room
+from utils.navigation import DIRECTIONS
+from utils.navigation import DIRECTION_INDEX
+from utils.navigation import DX
+from utils.navigation import DY
+
+def trajectory_segments(x, y, direction, program, width, height):
+    """Split a car's path into (first_step, last_step, x, y) stays on one cell
+
+    A car only moves by its own commands and the field border, so the whole
+    path can be computed without looking at other cars. Turn runs and moves
+    blocked by the border only extend the current stay, so the cost is one
+    per op plus one per cell actually entered. The last stay has last_step
+    None, the car remains there once its commands are exhausted.
+    """
+    segments = []
+    first = 0
+    for opcode, step, count, rotation in program.ops:
+        if opcode == TURN:
+            direction = (direction + rotation) & 3
+            continue
+        dx, dy = DX[direction], DY[direction]
+        for _ in range(min(count, forward_room(x, y, direction, width, height))):
+            segments.append((first, step, x, y))
+            x += dx
+            y += dy
+            step += 1
+            first = step
+    segments.append((first, None, x, y))
+    return segments
+
+def earliest_overlap(stays):
+    """Earliest step at which two (first_step, last_step, car) stays overlap, or None"""
+    stays.sort()
+    last_seen = -1
+    for first, last, _ in stays:
+        if first <= last_seen:
+            return first
+        last_seen = max(last_seen, last)
+    return None
+
+class TrajectorySweepEngine(SimulationEngine):
+    """Engine finding the first collision from precomputed per-car trajectories
+
+    Each car's compiled program is reduced to the cells it stays on and for
+    which steps, a finished car being one stay until the end, so the work
+    scales with the number of moves instead of steps x cars. Stays are hashed
+    by cell and the earliest overlapping pair of stays is the first collision.
+    """
+
+    def run(self, cars, start_step=0, states=None, stop_step=None):
+        self.check_whole_run(start_step, states, stop_step)
+        width, height = self.width, self.height
+        max_steps = max((len(car.commands) for car in cars), default=0)
+
+        # Collisions are only checked from step 1 to max_steps
+        programs = [compile_commands(car.commands) for car in cars]
+        cell_stays = {}
+        for i, car in enumerate(cars):
+            direction = DIRECTION_INDEX[car.direction]
+            for first, last, x, y in trajectory_segments(car.x, car.y, direction, programs[i], width, height):
+                first = max(first, 1)
+                last = max_steps if last is None else last
+                if first <= last:
+                    if (x, y) in cell_stays:
+                        cell_stays[(x, y)].append((first, last, i))
+                    else:
+                        cell_stays[(x, y)] = [(first, last, i)]
+
+        collision_step = None
+        collision_cells = []
+        for cell, stays in cell_stays.items():
+            if len(stays) < 2:
+                continue
+            step = earliest_overlap(stays)
+            if step is None or (collision_step is not None and step > collision_step):
+                continue
+            if step != collision_step:
+                collision_step = step
+                collision_cells = []
+            collision_cells.append(cell)
+
+        collisions = []
+        if collision_step is not None:
+            groups = []
+            for cell in collision_cells:
+                indexes = sorted(i for first, last, i in cell_stays[cell] if first <= collision_step <= last)
+                groups.append((indexes, cell))
+            # Report cells in the order their first car was seen, like run_simulation
+            groups.sort()
+            for indexes, cell in groups:
+                collisions.append({
+                    'step': collision_step,
+                    'position': cell,
+                    'cars': [cars[i] for i in indexes]
+                })
+
+        steps = max_steps if collision_step is None else collision_step - 1
+        positions = []
+        for car, program in zip(cars, programs):
+            x, y, direction = advance(program, car.x, car.y, DIRECTION_INDEX[car.direction], steps, width, height)
+            positions.append((x, y, DIRECTIONS[direction]))
+        return {'positions': positions, 'collisions': collisions}
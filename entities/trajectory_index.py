@@ -0,0 +1,77 @@
+from entities.trajectory_engine import trajectory_segments
+from utils.command_program import compile_commands
+from utils.navigation import DIRECTION_INDEX
+
+# Last step of the stay a car keeps once its commands are exhausted
+FOREVER = float('inf')
+
+class TrajectoryIndex:
+    """Spatio-temporal occupancy of the trajectories of cars added one by one
+
+    Every car's path is stored as (first_step, last_step, car) stays per cell,
+    so adding a car only compares the new car's own stays with the stays of
+    the cells it visits, whatever the number of cars already indexed.
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.cars = []
+        self.cell_stays = {}
+        self.max_steps = 0
+        # Earliest step two indexed cars share a cell, whether or not the run gets there
+        self.first_overlap = None
+        # Car name -> collision preview, for cars that collide when added
+        self.previews = {}
+
+    def add(self, car):
+        """Index a car and return its collision preview against the cars already indexed
+
+        The preview is a dict with the 'step' and 'position' of the new car's
+        first collision and the other 'cars' it collides with, or None if the
+        simulation would stop or finish before the new car collides.
+        """
+        i = len(self.cars)
+        self.cars.append(car)
+        self.max_steps = max(self.max_steps, len(car.commands))
+        program = compile_commands(car.commands)
+        segments = trajectory_segments(car.x, car.y, DIRECTION_INDEX[car.direction], program, self.width, self.height)
+
+        # Collisions are only checked from step 1
+        stays = []
+        for first, last, x, y in segments:
+            first = max(first, 1)
+            last = FOREVER if last is None else last
+            if first <= last:
+                stays.append((first, last, (x, y)))
+
+        overlap = None
+        position = None
+        for first, last, cell in stays:
+            for other_first, other_last, _ in self.cell_stays.get(cell, ()):
+                step = max(first, other_first)
+                if step <= min(last, other_last) and (overlap is None or step < overlap):
+                    overlap = step
+                    position = cell
+
+        for first, last, cell in stays:
+            if cell in self.cell_stays:
+                self.cell_stays[cell].append((first, last, i))
+            else:
+                self.cell_stays[cell] = [(first, last, i)]
+
+        preview = None
+        if overlap is not None and overlap <= self.max_steps and (self.first_overlap is None or overlap <= self.first_overlap):
+            preview = {
+                'step': overlap,
+                'position': position,
+                'cars': [
+                    self.cars[j] for first, last, j in self.cell_stays[position]
+                    if j != i and first <= overlap <= last
+                ]
+            }
+            self.previews[car.name] = preview
+
+        if overlap is not None and (self.first_overlap is None or overlap < self.first_overlap):
+            self.first_overlap = overlap
+        return preview
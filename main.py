@@ -1,5 +1,49 @@
+import argparse
+import sys
+
 from entities.auto_driving_car_app import AutoDrivingCarApp
+from entities.scripted_app import ScriptedApp
+from utils.engine_dispatcher import ENGINES
+from utils.engine_dispatcher import EngineDispatcher
+from utils.result_cache import ResultCache
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Auto Driving Car Simulation")
+    parser.add_argument('--script', metavar='FILE',
+                        help="Run a transcript of answers from FILE ('-' for stdin) without prompts, printing only the results")
+    parser.add_argument('--continue-after-collision', action='store_true',
+                        help="Keep simulating the other cars after a collision")
+    parser.add_argument('--max-lines', type=int, metavar='N',
+                        help="Show only the first N cars and results, then how many were left out")
+    parser.add_argument('--page-size', type=int, metavar='N',
+                        help="Pause the results every N lines (interactive mode only)")
+    parser.add_argument('--cache', metavar='FILE',
+                        help="Reuse results of scenarios simulated before, stored in the sqlite FILE")
+    parser.add_argument('--engine', choices=['auto', *ENGINES], default='auto',
+                        help="Engine to simulate with, 'auto' picks the fastest with a calibrated cost model")
+    parser.add_argument('--explain-engine', action='store_true',
+                        help="Print which engine each simulation used and why, to stderr")
+    return parser.parse_args(argv)
+
+class EngineReporter(EngineDispatcher):
+    """EngineDispatcher printing every report to stderr"""
+
+    def choose(self, width, height, cars):
+        engine_class, report = super().choose(width, height, cars)
+        print(f"Engine: {report['engine']} ({report['reason']})", file=sys.stderr)
+        return engine_class, report
 
 if __name__ == "__main__":
-    app = AutoDrivingCarApp()
-    app.run()
\ No newline at end of file
+    args = parse_args()
+    cache = ResultCache(path=args.cache) if args.cache else None
+    dispatcher = (EngineReporter if args.explain_engine else EngineDispatcher)(override=args.engine)
+    if args.script is None:
+        app = AutoDrivingCarApp(args.continue_after_collision, args.max_lines, args.page_size, cache, dispatcher)
+        app.run()
+    else:
+        app = ScriptedApp(sys.stdout, sys.stderr, args.continue_after_collision, args.max_lines, cache, dispatcher)
+        if args.script == '-':
+            app.run(sys.stdin)
+        else:
+            with open(args.script) as lines:
+                app.run(lines)
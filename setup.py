@@ -4,4 +4,7 @@ setup(
     name="auto_driving_car",
     version="0.1",
     packages=find_packages(),
+    install_requires=[
+        "numpy",
+    ],
 )
\ No newline at end of file
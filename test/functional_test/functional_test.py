@@ -2,6 +2,7 @@ import unittest
 from io import StringIO
 from unittest.mock import patch
 from entities.auto_driving_car_app import AutoDrivingCarApp
+from entities.scripted_app import ScriptedApp
 
 
 class TestUserInteraction(unittest.TestCase):
@@ -62,6 +63,7 @@ class TestUserInteraction(unittest.TestCase):
             "Your current list of cars are:",
             "- A, (1,2) N, FFRFFFFRRL",
             "- B, (7,8) W, FFLFFFFFFF",
+            "Warning: B will collide with A at (5,4) at step 7",
             "After simulation, the result is:",
             "- A, collides with B at (5,4) at step 7",
             "- B, collides with A at (5,4) at step 7",
@@ -268,5 +270,64 @@ class TestUserInteraction(unittest.TestCase):
         self.simulate_input_output(inputs, expected_outputs)
 
 
+class TestScriptedMode(unittest.TestCase):
+    def run_script(self, inputs):
+        out, err = StringIO(), StringIO()
+        ScriptedApp(out, err).run(line + "\n" for line in inputs)
+        return out.getvalue(), err.getvalue()
+
+    def test_same_result_lines_as_interactive(self):
+        inputs = [
+            "10 10",
+            "1", "A", "1 2 N", "FFRFFFFRRL",
+            "1", "B", "7 8 W", "FFLFFFFFFF",
+            "2",
+            "1",  # Restart
+            "5 5",
+            "1", "A", "0 0 S", "FLFR",
+            "2",
+            "2"
+        ]
+        out, err = self.run_script(inputs)
+        self.assertEqual(out.splitlines(), [
+            "After simulation, the result is:",
+            "- A, collides with B at (5,4) at step 7",
+            "- B, collides with A at (5,4) at step 7",
+            "After simulation, the result is:",
+            "- A, (1,0) S",
+        ])
+        self.assertEqual(err, "")
+
+    def test_invalid_lines_are_skipped(self):
+        inputs = [
+            "0 10", "10 10", "3", "2", "1", "", "A", "1 2 X", "1 2 N", "FFX", "FFRFF", "2", "2",
+            "10 10"  # Ignored after Exit
+        ]
+        out, err = self.run_script(inputs)
+        self.assertEqual(out.splitlines(), ["After simulation, the result is:", "- A, (3,4) E"])
+        self.assertEqual(err.splitlines(), [
+            "Error: Width and height must be positive integers",
+            "Error: Please enter 1 or 2",
+            "Error: Please add at least one car first",
+            "Error: Name cannot be empty",
+            "Error: Direction must be N, S, E, or W",
+            "Error: Commands can only be F, L, or R",
+        ])
+
+    def test_summarized_results(self):
+        inputs = ["10 10"]
+        for i in range(5):
+            inputs += ["1", f"C{i}", f"{i} 0 N", "F"]
+        inputs += ["2", "2"]
+        out = StringIO()
+        ScriptedApp(out, max_lines=2).run(line + "\n" for line in inputs)
+        self.assertEqual(out.getvalue().splitlines(), [
+            "After simulation, the result is:",
+            "- C0, (0,1) N",
+            "- C1, (1,1) N",
+            "... and 3 more",
+        ])
+
+
 if __name__ == "__main__":
     unittest.main()
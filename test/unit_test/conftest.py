@@ -0,0 +1,23 @@
+import pytest
+from entities.car import Car
+
+def make_random_cars(rng, width, height, count, max_commands):
+    """Random cars on distinct cells"""
+    cells = rng.sample([(x, y) for x in range(width) for y in range(height)], count)
+    return [
+        Car(f"C{i}", x, y, rng.choice("NESW"),
+            "".join(rng.choice("FFFLR") for _ in range(rng.randint(0, max_commands))))
+        for i, (x, y) in enumerate(cells)
+    ]
+
+def summarize_collisions(result):
+    return [(c['step'], c['position'], [car.name for car in c['cars']]) for c in result['collisions']]
+
+# Shared by the engine tests as fixtures, so no test module imports another
+@pytest.fixture
+def random_cars():
+    return make_random_cars
+
+@pytest.fixture
+def collision_summary():
+    return summarize_collisions
@@ -0,0 +1,57 @@
+import random
+import pytest
+from entities.car import Car
+from entities.active_set_engine import ActiveSetEngine
+from entities.simulation_engine import SimulationEngine
+
+class TestActiveSetEngine:
+    def test_other_cars_keep_going(self, collision_summary):
+        """Test cars not involved in a collision finish their commands"""
+        cars = [
+            Car("A", 1, 2, "N", "FFRFFFFRRL"),
+            Car("B", 7, 8, "W", "FFLFFFFFFF"),
+            Car("C", 0, 9, "E", "FFFFFFFFFF"),
+        ]
+        result = ActiveSetEngine(10, 10).run(cars)
+        assert collision_summary(result) == [(7, (5, 4), ["A", "B"])]
+        assert result['positions'] == [(5, 4, 'E'), (5, 4, 'S'), (9, 9, 'E')]
+
+    def test_driving_onto_a_wreck(self, collision_summary):
+        """Test a car reaching collided cars collides with all of them"""
+        cars = [
+            Car("X", 5, 5, "N", "F"),
+            Car("Y", 5, 7, "S", "F"),
+            Car("Z", 2, 6, "E", "FFFF"),
+        ]
+        result = ActiveSetEngine(10, 10).run(cars)
+        assert collision_summary(result) == [
+            (1, (5, 6), ["X", "Y"]),
+            (3, (5, 6), ["X", "Y", "Z"]),
+        ]
+        assert result['positions'][2] == (5, 6, 'E')
+
+    def test_driving_onto_a_finished_car(self, collision_summary):
+        """Test a parked car is an obstacle"""
+        cars = [Car("P", 0, 0, "E", "FF"), Car("Q", 5, 0, "W", "FFFFF")]
+        result = ActiveSetEngine(10, 10).run(cars)
+        assert collision_summary(result) == [(3, (2, 0), ["P", "Q"])]
+
+    @pytest.mark.parametrize("seed", range(20))
+    def test_first_collision_matches_simulation_engine(self, seed, collision_summary):
+        """Test the first collision step is the one run_simulation stops at"""
+        rng = random.Random(seed)
+        width, height = rng.randint(2, 8), rng.randint(2, 8)
+        cells = rng.sample([(x, y) for x in range(width) for y in range(height)], width * height // 3)
+        cars = [
+            Car(f"C{i}", x, y, rng.choice("NESW"), "".join(rng.choice("FFLR") for _ in range(rng.randint(0, 30))))
+            for i, (x, y) in enumerate(cells)
+        ]
+        expected = SimulationEngine(width, height).run(cars)
+        result = ActiveSetEngine(width, height).run(cars)
+        if not expected['collisions']:
+            assert result == expected
+        else:
+            first_step = expected['collisions'][0]['step']
+            first = [c for c in result['collisions'] if c['step'] == first_step]
+            assert collision_summary({'collisions': first}) == collision_summary(expected)
+            assert all(c['step'] >= first_step for c in result['collisions'])
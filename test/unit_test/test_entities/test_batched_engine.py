@@ -0,0 +1,52 @@
+import random
+import pytest
+from entities.batched_engine import BatchedEngine
+from entities.car import Car
+from entities.simulation_engine import SimulationEngine
+
+def perturbed(rng, cars, width, height):
+    """The same fleet, same commands, on other distinct cells"""
+    cells = rng.sample([(x, y) for x in range(width) for y in range(height)], len(cars))
+    return [Car(car.name, x, y, car.direction, car.commands) for car, (x, y) in zip(cars, cells)]
+
+class TestBatchedEngine:
+    @pytest.mark.parametrize("seed", range(5))
+    def test_sweep_of_start_positions(self, seed, random_cars, collision_summary):
+        """Test every perturbed scenario gets SimulationEngine's result"""
+        rng = random.Random(seed)
+        fleet = random_cars(rng, 8, 8, 10, 40)
+        scenarios = [perturbed(rng, fleet, 8, 8) for _ in range(50)]
+        outcome = BatchedEngine(8, 8).run_scenarios(scenarios)
+        for cars, result in zip(scenarios, outcome['results']):
+            expected = SimulationEngine(8, 8).run(cars)
+            assert result['positions'] == expected['positions']
+            assert collision_summary(result) == collision_summary(expected)
+
+    def test_command_variants(self, random_cars, collision_summary):
+        """Test scenarios with their own commands and lengths"""
+        rng = random.Random(7)
+        scenarios = [random_cars(rng, 6, 6, 5, rng.randint(0, 30)) for _ in range(40)]
+        outcome = BatchedEngine(6, 6).run_scenarios(scenarios)
+        for cars, result in zip(scenarios, outcome['results']):
+            expected = SimulationEngine(6, 6).run(cars)
+            assert result['positions'] == expected['positions']
+            assert collision_summary(result) == collision_summary(expected)
+
+    def test_stats(self):
+        """Test aggregate collision statistics of a sweep"""
+        safe = [Car("A", 0, 0, "N", "FF"), Car("B", 4, 4, "S", "FF")]
+        crash = [Car("A", 0, 0, "E", "FF"), Car("B", 2, 0, "W", "FF")]
+        late = [Car("A", 0, 0, "E", "LRFFF"), Car("B", 4, 0, "W", "LRFF")]
+        stats = BatchedEngine(5, 5).run_scenarios([safe, crash, late, crash])['stats']
+        assert stats['scenarios'] == 4
+        assert stats['collided'] == 3
+        assert stats['collision_rate'] == 0.75
+        assert stats['first_collision_step'] == 1
+        assert stats['last_collision_step'] == 4
+        assert stats['mean_collision_step'] == 2.0
+        assert stats['car_collisions'] == [3, 3]
+        assert all(type(count) is int for count in stats['car_collisions'])
+
+    def test_fleet_size_must_match(self):
+        with pytest.raises(ValueError, match="same number of cars"):
+            BatchedEngine(5, 5).run_scenarios([[Car("A", 0, 0, "N", "F")], []])
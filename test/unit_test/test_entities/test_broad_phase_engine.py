@@ -0,0 +1,70 @@
+import random
+import pytest
+from entities.broad_phase_engine import BroadPhaseEngine, candidate_pairs, trajectory_boxes
+from entities.car import Car
+from entities.simulation_engine import SimulationEngine
+from utils.command_program import compile_commands
+
+class SmallWindowEngine(BroadPhaseEngine):
+    """Windows and grid cells small enough for tiny fields to span many of them"""
+    window = 2
+
+class TestBroadPhaseEngine:
+    @pytest.mark.parametrize("seed", range(40))
+    def test_small_windows_match_simulation_engine(self, seed, random_cars, collision_summary):
+        """Test boxes split over many windows and grid cells still find the first collision"""
+        rng = random.Random(seed)
+        width, height = rng.randint(1, 9), rng.randint(1, 9)
+        cars = random_cars(rng, width, height, rng.randint(1, max(1, width * height // 3)), 40)
+        expected = SimulationEngine(width, height).run(cars)
+        result = SmallWindowEngine(width, height).run(cars)
+        assert result['positions'] == expected['positions']
+        assert collision_summary(result) == collision_summary(expected)
+
+    @pytest.mark.parametrize("seed", range(60))
+    def test_turn_runs_longer_than_window(self, seed, collision_summary):
+        """Test runs of turns spanning whole windows don't shift the boxes of later moves"""
+        rng = random.Random(seed)
+        width, height = rng.randint(2, 9), rng.randint(2, 9)
+        cells = rng.sample([(x, y) for x in range(width) for y in range(height)], min(4, width * height))
+        cars = []
+        for i, (x, y) in enumerate(cells):
+            commands = "".join(
+                rng.choice("LR") * rng.randint(1, 200) if rng.random() < 0.3 else "F" * rng.randint(1, 5)
+                for _ in range(rng.randint(1, 8))
+            )
+            cars.append(Car(f"C{i}", x, y, rng.choice("NESW"), commands))
+        expected = SimulationEngine(width, height).run(cars)
+        result = BroadPhaseEngine(width, height).run(cars)
+        assert result['positions'] == expected['positions']
+        assert collision_summary(result) == collision_summary(expected)
+
+    def test_trajectory_boxes(self):
+        """Test forward runs are split every window steps and turns extend the current box"""
+        program = compile_commands("FFFRFL")
+        assert trajectory_boxes(0, 0, 0, program, 10, 10, 100, window=2) == [
+            (1, 2, 0, 0, 0, 2), (3, 4, 0, 0, 2, 3), (5, 100, 0, 1, 3, 3)
+        ]
+
+    def test_candidate_pairs(self):
+        """Test only boxes close in both space and time are paired"""
+        car_boxes = [
+            [(1, 10, 0, 5, 0, 0)],
+            [(1, 10, 3, 3, 0, 4)],
+            [(11, 20, 0, 5, 0, 0)],
+            [(1, 10, 500, 505, 500, 500)],
+        ]
+        assert candidate_pairs(car_boxes, cell_size=64) == [(1, 10, 0, 1)]
+
+    def test_sparse_fleet_has_no_candidates(self):
+        """Test cars driving far apart on a huge field are never compared"""
+        cars = [Car(f"C{i}", i * 1000, i * 1000, "N", "F" * 500) for i in range(200)]
+        result = BroadPhaseEngine(200_000, 200_000).run(cars)
+        assert result['collisions'] == []
+        assert result['positions'][3] == (3000, 3500, 'N')
+
+    def test_head_on_collision(self, collision_summary):
+        cars = [Car("A", 0, 0, "E", "F" * 200), Car("B", 150, 0, "W", "F" * 200), Car("C", 75, 5, "S", "F" * 200)]
+        result = BroadPhaseEngine(1000, 1000).run(cars)
+        assert collision_summary(result) == [(75, (75, 0), ["A", "B", "C"])]
+        assert result['positions'] == [(74, 0, 'E'), (76, 0, 'W'), (75, 0, 'S')]
@@ -0,0 +1,52 @@
+import random
+import pytest
+from entities.batched_engine import BatchedEngine
+from entities.broad_phase_engine import BroadPhaseEngine
+from entities.car import Car
+from entities.simulation_engine import SimulationEngine
+from entities.streaming_engine import StreamingEngine
+from entities.trajectory_engine import TrajectorySweepEngine
+from entities.vectorized_engine import VectorizedEngine
+
+ENGINES = [VectorizedEngine, TrajectorySweepEngine, BatchedEngine, StreamingEngine, BroadPhaseEngine]
+
+class TestEngineParity:
+    @pytest.mark.parametrize("engine_class", ENGINES)
+    @pytest.mark.parametrize("seed", range(30))
+    def test_matches_simulation_engine(self, engine_class, seed, random_cars, collision_summary):
+        """Test random fields give the same positions, steps and collisions as SimulationEngine"""
+        rng = random.Random(seed)
+        width, height = rng.randint(1, 8), rng.randint(1, 8)
+        cars = random_cars(rng, width, height, rng.randint(1, max(1, width * height // 3)), 40)
+        expected = SimulationEngine(width, height).run(cars)
+        result = engine_class(width, height).run(cars)
+        assert result['positions'] == expected['positions']
+        assert collision_summary(result) == collision_summary(expected)
+
+    @pytest.mark.parametrize("engine_class", ENGINES)
+    @pytest.mark.parametrize("seed", range(10))
+    def test_matches_on_large_field(self, engine_class, seed, random_cars, collision_summary):
+        """Test cars crowded in a corner of a large, sparsely used field"""
+        rng = random.Random(seed)
+        cars = random_cars(rng, 8, 8, 20, 40)
+        expected = SimulationEngine(5000, 5000).run(cars)
+        result = engine_class(5000, 5000).run(cars)
+        assert result['positions'] == expected['positions']
+        assert collision_summary(result) == collision_summary(expected)
+
+    @pytest.mark.parametrize("engine_class", ENGINES)
+    def test_stationary_cars_collide_at_step_one(self, engine_class, collision_summary):
+        """Test cars placed on the same cell collide at the first step"""
+        cars = [Car("A", 1, 1, "N", ""), Car("B", 1, 1, "S", ""), Car("C", 0, 0, "E", "F")]
+        result = engine_class(5, 5).run(cars)
+        assert collision_summary(result) == [(1, (1, 1), ["A", "B"])]
+        assert result['positions'] == [(1, 1, 'N'), (1, 1, 'S'), (0, 0, 'E')]
+
+    @pytest.mark.parametrize("engine_class", ENGINES)
+    @pytest.mark.parametrize("arguments", [{'start_step': 2}, {'states': [(0, 0, 'N')]}, {'stop_step': 3}])
+    def test_partial_runs_are_refused(self, engine_class, arguments):
+        """Test engines running scenarios whole raise instead of ignoring resume arguments"""
+        cars = [Car("A", 0, 0, "N", "FFRFF")]
+        with pytest.raises(NotImplementedError, match="can't resume or stop a run early"):
+            engine_class(10, 10).run(cars, **arguments)
+        assert engine_class(10, 10).run(cars, 0, None, None) == SimulationEngine(10, 10).run(cars)
@@ -1,6 +1,9 @@
 import pytest
-from entities.field import Field
 from entities.car import Car
+from entities.field import Field
+from entities.loop_engine import LoopEngine
+from utils.command_loop import parse_commands
+from utils.command_stream import CommandStream
 
 class TestField:
     @pytest.mark.parametrize("width,height", [
@@ -31,4 +34,76 @@ class TestField:
     #     with pytest.raises(ValueError):
     #         Field(0, 10)
     #     with pytest.raises(ValueError):
-    #         Field(10, -5)
\ No newline at end of file
+    #         Field(10, -5)
+
+class TestFieldIndexes:
+    def test_add_car_indexes_name_and_position(self):
+        """Test added cars are found by name and occupied cell"""
+        field = Field(10, 10)
+        car = field.add_car("A", 1, 2, "N", "FF")
+        assert field.has_car("A")
+        assert field.is_occupied(1, 2)
+        assert not field.is_occupied(2, 1)
+        assert field.car_names["A"] is car
+
+    def test_add_cars_bulk(self):
+        """Test bulk loading adds every car in order"""
+        field = Field(1000, 1000)
+        field.add_cars((f"C{i}", i, i, "E", "F") for i in range(1000))
+        assert len(field.cars) == 1000
+        assert field.cars[999].name == "C999"
+        assert field.is_occupied(999, 999)
+
+    @pytest.mark.parametrize("cars, message", [
+        ([("B", 3, 3, "N", ""), ("B", 4, 4, "N", "")], "same name"),
+        ([("B", 3, 3, "N", ""), ("C", 3, 3, "N", "")], "already occupied"),
+        ([("B", 1, 2, "N", "")], "already occupied"),
+        ([("B", 3, 3, "N", ""), ("C", 10, 3, "N", "")], "within field border"),
+        ([("B", 3, 3, "X", "")], "Direction"),
+        ([("B", 3, 3, "N", "FX")], "Commands"),
+    ])
+    def test_add_cars_is_atomic(self, cars, message):
+        """Test an invalid car rejects the whole batch"""
+        field = Field(10, 10)
+        field.add_car("A", 1, 2, "N", "")
+        with pytest.raises(ValueError, match=message):
+            field.add_cars(cars)
+        assert [car.name for car in field.cars] == ["A"]
+        assert not field.has_car("B")
+
+    def test_streamed_commands(self):
+        """Test streams are admitted unread and get no preview, so the simulation reads them whole"""
+        field = Field(5, 5)
+        field.add_cars([("A", 0, 0, "N", CommandStream.from_iterable("FF"))])
+        field.add_car("B", 0, 4, "S", CommandStream.from_iterable("FF"))
+        assert field.has_streams
+        assert field.collision_preview("B") is None
+
+    def test_collision_preview_with_loops(self):
+        """Test previews of looped commands come from a simulation instead of the index"""
+        field = Field(5, 5)
+        field.add_car("A", 0, 0, "N", parse_commands("(F)*1000000"))
+        field.add_car("B", 3, 4, "W", parse_commands("(R)*999996FFF"))
+        assert field.has_loops
+        assert field.collision_preview("A") is None
+        preview = field.collision_preview("B")
+        assert (preview['step'], preview['position'], [car.name for car in preview['cars']]) == (999999, (0, 4), ["A"])
+
+    def test_loop_previews_are_cached(self, monkeypatch):
+        """Test previews on fields with loops are simulated once until the cars change"""
+        field = Field(5, 5)
+        field.add_car("A", 0, 0, "N", parse_commands("(F)*1000"))
+        field.add_car("B", 0, 4, "S", "")
+        runs = []
+        run = LoopEngine.run
+        monkeypatch.setattr(LoopEngine, 'run', lambda engine, cars: runs.append(len(cars)) or run(engine, cars))
+        assert field.collision_preview("B")['step'] == 4
+        field.add_car("C", 4, 4, "S", "")
+        assert field.collision_preview("B")['step'] == 4
+        assert field.collision_preview("C") is None
+        assert field.collision_preview("C") is None
+        assert runs == [2, 3]
+        field.cars[1].x = 1
+        field.cars_changed()
+        assert field.collision_preview("B") is None
+        assert runs == [2, 3, 2]
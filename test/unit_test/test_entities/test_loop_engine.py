@@ -0,0 +1,55 @@
+import random
+import pytest
+from entities.car import Car
+from entities.loop_engine import LoopEngine, periodic_windows
+from entities.simulation_engine import SimulationEngine
+from utils.command_loop import parse_commands
+
+def random_looped_cars(rng, width, height, count):
+    """Random cars on distinct cells with a mix of literal and looped commands"""
+    cells = rng.sample([(x, y) for x in range(width) for y in range(height)], count)
+    cars = []
+    for i, (x, y) in enumerate(cells):
+        parts = []
+        for _ in range(rng.randint(0, 3)):
+            body = "".join(rng.choice("FFFLR") for _ in range(rng.randint(1, 6)))
+            parts.append(f"({body})*{rng.randint(1, 40)}" if rng.random() < 0.6 else body)
+        cars.append(Car(f"C{i}", x, y, rng.choice("NESW"), parse_commands("".join(parts) or "F")))
+    return cars
+
+class TestLoopEngine:
+    @pytest.mark.parametrize("seed", range(40))
+    def test_matches_simulation_engine(self, seed, collision_summary):
+        """Test random looped commands give SimulationEngine's result"""
+        rng = random.Random(seed)
+        width, height = rng.randint(1, 8), rng.randint(1, 8)
+        cars = random_looped_cars(rng, width, height, rng.randint(1, max(1, width * height // 4)))
+        expected = SimulationEngine(width, height).run(cars)
+        result = LoopEngine(width, height).run(cars)
+        assert result['positions'] == expected['positions']
+        assert collision_summary(result) == collision_summary(expected)
+
+    def test_periodic_windows(self):
+        """Test a car against the wall repeats its pose each iteration after the first ones"""
+        car = Car("A", 0, 0, "N", parse_commands("R(FF)*10"))
+        assert periodic_windows(car, 3, 3) == [(3, 21, 2), (21, float('inf'), 1)]
+
+    def test_jumps_over_million_repeats(self):
+        """Test a million laps of a square route run without stepping through them"""
+        cars = [
+            Car("A", 0, 0, "N", parse_commands("(FFRFFRFFRFFR)*1000000F")),
+            Car("B", 5, 5, "S", parse_commands("(FLFR)*1000000")),
+        ]
+        result = LoopEngine(10, 10).run(cars)
+        assert result['positions'] == [(0, 1, 'N'), (9, 0, 'S')]
+        assert result['collisions'] == []
+
+    def test_collision_after_loops(self, collision_summary):
+        """Test a car driving into a looping car after a long loop is still caught"""
+        cars = [
+            Car("A", 0, 0, "N", parse_commands("(F)*1000000")),
+            Car("B", 3, 4, "W", parse_commands("(R)*999996FFF")),
+        ]
+        result = LoopEngine(5, 5).run(cars)
+        assert collision_summary(result) == [(999999, (0, 4), ["A", "B"])]
+        assert result['positions'] == [(0, 4, 'N'), (1, 4, 'W')]
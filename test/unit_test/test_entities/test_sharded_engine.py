@@ -0,0 +1,51 @@
+import random
+import pytest
+from entities.car import Car
+from entities.sharded_engine import ShardedEngine
+from entities.simulation_engine import SimulationEngine
+
+class SmallBlockEngine(ShardedEngine):
+    """Blocks short enough for the random commands to span many of them"""
+    block_steps = 7
+
+class TestShardedEngine:
+    @pytest.mark.parametrize("seed", range(8))
+    def test_matches_simulation_engine(self, seed, random_cars, collision_summary):
+        """Test random fields spread over several tiles give SimulationEngine's result"""
+        rng = random.Random(seed)
+        width, height = rng.randint(6, 12), rng.randint(1, 6)
+        cars = random_cars(rng, width, height, rng.randint(1, max(1, width * height // 3)), 60)
+        expected = SimulationEngine(width, height).run(cars)
+        result = ShardedEngine(width, height, workers=3).run(cars)
+        assert result['positions'] == expected['positions']
+        assert collision_summary(result) == collision_summary(expected)
+
+    @pytest.mark.parametrize("seed", range(8))
+    def test_blocks_match_simulation_engine(self, seed, random_cars, collision_summary):
+        """Test collisions are found in any block, and states carried from block to block"""
+        rng = random.Random(seed)
+        width, height = rng.randint(6, 12), rng.randint(1, 6)
+        cars = random_cars(rng, width, height, rng.randint(1, max(1, width * height // 3)), 60)
+        expected = SimulationEngine(width, height).run(cars)
+        result = SmallBlockEngine(width, height, workers=3).run(cars)
+        assert result['positions'] == expected['positions']
+        assert collision_summary(result) == collision_summary(expected)
+
+    def test_collision_across_tile_border(self, collision_summary):
+        """Test cars meeting on a cell right after crossing into another tile"""
+        cars = [Car("A", 1, 0, "E", "FF"), Car("B", 2, 1, "S", "FF")]
+        result = ShardedEngine(4, 3, workers=2).run(cars)
+        assert collision_summary(result) == [(1, (2, 0), ["A", "B"])]
+        assert result['positions'] == [(1, 0, 'E'), (2, 1, 'S')]
+
+    def test_cars_crossing_tiles_without_collision(self):
+        """Test cars handed over between tiles end where SimulationEngine puts them"""
+        cars = [Car("A", 0, 0, "E", "FFFFFF"), Car("B", 5, 1, "W", "FFFFFFRF")]
+        result = ShardedEngine(6, 2, workers=3).run(cars)
+        assert result['positions'] == [(5, 0, 'E'), (0, 1, 'N')]
+        assert result['collisions'] == []
+
+    def test_more_workers_than_columns(self):
+        """Test the tile count is capped by the field width"""
+        cars = [Car("A", 0, 0, "N", "FFRF")]
+        assert ShardedEngine(2, 5, workers=8).run(cars)['positions'] == [(1, 2, 'E')]
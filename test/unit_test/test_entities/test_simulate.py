@@ -0,0 +1,59 @@
+import random
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from entities.field import Field
+from entities.simulation import CarSpec, Collision, FieldSpec, field_spec, simulate
+from entities.vectorized_engine import VectorizedEngine
+from utils.command_loop import parse_commands
+from utils.command_stream import CommandStream
+
+def collision_field():
+    field = Field(10, 10)
+    field.add_car("A", 1, 2, "N", "FFRFFFFRRL")
+    field.add_car("B", 7, 8, "W", "FFLFFFFFFF")
+    return field
+
+class TestSimulate:
+    def test_result(self):
+        result = simulate(field_spec(collision_field()))
+        assert result.collisions == (Collision(7, (5, 4), ("A", "B")),)
+        assert [tuple(car) for car in result.cars] == [("A", 4, 4, "E"), ("B", 5, 5, "S")]
+
+    def test_inputs_untouched_and_rerunnable(self):
+        """Test the field is not mutated and repeated runs give the same result"""
+        field = collision_field()
+        spec = field_spec(field)
+        first = simulate(spec)
+        assert simulate(spec) == first
+        assert [(car.x, car.y, car.direction) for car in field.cars] == [(1, 2, "N"), (7, 8, "W")]
+        assert field.collisions == []
+
+    def test_result_is_immutable(self):
+        result = simulate(field_spec(collision_field()))
+        with pytest.raises(AttributeError):
+            result.cars[0].x = 0
+        with pytest.raises(TypeError):
+            result.collisions[0] = None
+
+    def test_concurrent_runs_share_one_spec(self):
+        """Test one spec simulated from many threads gives one result"""
+        rng = random.Random(5)
+        cells = rng.sample([(x, y) for x in range(30) for y in range(30)], 60)
+        spec = FieldSpec(30, 30, tuple(
+            CarSpec(f"C{i}", x, y, rng.choice("NESW"), "".join(rng.choice("FFFLR") for _ in range(200)))
+            for i, (x, y) in enumerate(cells)
+        ))
+        expected = simulate(spec)
+        with ThreadPoolExecutor(8) as pool:
+            results = list(pool.map(simulate, [spec] * 32))
+        assert all(result == expected for result in results)
+        assert simulate(spec, VectorizedEngine) == expected
+
+    def test_loops_use_loop_engine(self):
+        spec = FieldSpec(5, 5, (CarSpec("A", 0, 0, "N", parse_commands("(F)*1000000000")),))
+        assert simulate(spec).cars[0] == ("A", 0, 4, "N")
+
+    def test_streams_use_streaming_engine(self):
+        field = Field(5, 5)
+        field.add_cars([("A", 0, 0, "N", CommandStream.from_iterable("FFRF")), ("B", 4, 4, "S", "F")])
+        assert simulate(field_spec(field)).cars == (("A", 1, 2, "E"), ("B", 4, 3, "S"))
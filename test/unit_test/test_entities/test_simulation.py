@@ -2,6 +2,7 @@ import pytest
 from entities.field import Field
 from entities.car import Car
 from entities.auto_driving_car_app import AutoDrivingCarApp
+from utils.command_stream import CommandStream
 
 @pytest.fixture
 def app():
@@ -72,4 +73,30 @@ class TestSimulation:
         app.field = empty_field
         app.run_simulation()
         assert car.x == expected_x
-        assert car.y == expected_y
\ No newline at end of file
+        assert car.y == expected_y
+
+    def test_streamed_commands(self, app, empty_field):
+        """Test fields with streams are run by the streaming engine"""
+        empty_field.add_car("A", 0, 0, "N", CommandStream.from_iterable("FFF"))
+        empty_field.add_car("B", 0, 5, "S", CommandStream.from_iterable("FF"))
+        app.field = empty_field
+        app.run_simulation()
+        assert [(car.x, car.y) for car in empty_field.cars] == [(0, 2), (0, 3)]
+        assert [car.name for car in empty_field.collisions[0]['cars']] == ["A", "B"]
+
+class TestContinueAfterCollision:
+    def test_results_report_every_collision(self, empty_field, capsys):
+        """Test continue mode reports all collisions and the surviving cars"""
+        app = AutoDrivingCarApp(continue_after_collision=True)
+        app.field = empty_field
+        app.field.add_car("X", 5, 5, "N", "F")
+        app.field.add_car("Y", 5, 7, "S", "F")
+        app.field.add_car("Z", 2, 6, "E", "FFFF")
+        app.field.add_car("W", 0, 0, "N", "FF")
+        app.run_simulation()
+        app.show_simulation_results()
+        output = capsys.readouterr().out
+        assert "- X, collides with Y at (5,6) at step 1" in output
+        assert "- Y, collides with X at (5,6) at step 1" in output
+        assert "- Z, collides with X, Y at (5,6) at step 3" in output
+        assert "- W, (0,2) N" in output
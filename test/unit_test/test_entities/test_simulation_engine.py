@@ -0,0 +1,58 @@
+import pytest
+from entities.car import Car
+from entities.field import Field
+from entities.simulation_engine import SimulationEngine
+
+@pytest.fixture
+def engine():
+    """Fixture providing an engine for a 10x10 field"""
+    return SimulationEngine(10, 10)
+
+class TestSimulationEngine:
+    def test_run_does_not_mutate_cars(self, engine):
+        """Test the engine leaves the input cars untouched"""
+        car = Car("A", 1, 2, "N", "FFRFFFFRRL")
+        result = engine.run([car])
+        assert result['positions'] == [(5, 4, 'S')]
+        assert result['collisions'] == []
+        assert (car.x, car.y, car.direction) == (1, 2, 'N')
+
+    def test_collision_keeps_last_positions(self, engine):
+        """Test positions are the states before the collision step"""
+        cars = [Car("A", 1, 2, "N", "FFRFFFFRRL"), Car("B", 7, 8, "W", "FFLFFFFFFF")]
+        result = engine.run(cars)
+        assert len(result['collisions']) == 1
+        collision = result['collisions'][0]
+        assert collision['step'] == 7
+        assert collision['position'] == (5, 4)
+        assert collision['cars'] == cars
+        assert result['positions'] == [(4, 4, 'E'), (5, 5, 'S')]
+
+    def test_no_cars(self, engine):
+        """Test an empty car list runs zero steps"""
+        assert engine.run([]) == {'positions': [], 'collisions': []}
+
+    def test_apply_to_field(self):
+        """Test apply() writes results back like run_simulation"""
+        field = Field(10, 10)
+        field.add_car("X", 5, 5, "N", "F")
+        field.add_car("Y", 5, 7, "S", "F")
+        engine = SimulationEngine.from_field(field)
+        engine.apply(field, engine.run(field.cars))
+        assert field.collisions[0]['position'] == (5, 6)
+        assert [(car.x, car.y) for car in field.cars] == [(5, 5), (5, 7)]
+
+    def test_apply_rebuilds_previews_and_occupancy(self):
+        """Test previews and occupied cells follow the cars apply() moved"""
+        field = Field(10, 10)
+        field.add_car("A", 0, 0, "N", "FFF")
+        field.add_car("B", 5, 5, "E", "")
+        assert field.collision_preview("B") is None
+        engine = SimulationEngine.from_field(field)
+        engine.apply(field, engine.run(field.cars))
+        assert field.is_occupied(0, 3)
+        assert not field.is_occupied(0, 0)
+        # A now starts at (0, 3) and runs into C on its way north
+        field.add_car("C", 0, 5, "S", "")
+        preview = field.collision_preview("C")
+        assert (preview['step'], preview['position'], [car.name for car in preview['cars']]) == (2, (0, 5), ["A"])
@@ -0,0 +1,65 @@
+import pytest
+from entities.active_set_engine import ActiveSetEngine
+from entities.broad_phase_engine import BroadPhaseEngine
+from entities.car import Car
+from entities.simulation_engine import SimulationEngine
+from entities.simulation_observer import SimulationObserver
+from entities.vectorized_engine import VectorizedEngine
+
+class TestSimulationObserver:
+    @pytest.mark.parametrize("cars", [
+        [Car("A", 1, 2, "N", "FFRFFFFRRL"), Car("B", 7, 8, "W", "FFLFFFFFFF")],
+        [Car("A", 1, 2, "N", "FFRFFFFRRL"), Car("B", 7, 8, "W", "FFLFFFRFFF")],
+        [Car("A", 0, 0, "S", "FLFR")],
+    ])
+    def test_same_result_as_uninstrumented(self, cars):
+        """Test observing a run does not change its result"""
+        observed = SimulationEngine(10, 10, SimulationObserver()).run(cars)
+        assert observed == SimulationEngine(10, 10).run(cars)
+
+    def test_counters_and_callbacks(self):
+        """Test step counters, collision events and the summary"""
+        steps = []
+        collisions = []
+        observer = SimulationObserver(
+            on_step=lambda step, counters: steps.append((step, counters)),
+            on_collision=collisions.append
+        )
+        cars = [Car("A", 0, 0, "S", "FLFR"), Car("B", 5, 5, "N", "F")]
+        SimulationEngine(10, 10, observer).run(cars)
+
+        assert [step for step, _ in steps] == [1, 2, 3, 4]
+        assert steps[0][1] == {'moves': 1, 'turns': 0, 'blocked': 1, 'idle': 0, 'cells_checked': 2}
+        assert steps[3][1]['idle'] == 1
+        assert collisions == []
+
+        summary = observer.summary()
+        assert summary['steps'] == 4
+        assert (summary['moves'], summary['turns'], summary['blocked'], summary['idle']) == (2, 2, 1, 3)
+        assert summary['cells_checked'] == 8
+        assert set(summary['phase_times']) == {'move', 'collide', 'commit'}
+        assert sum(summary['phase_shares'].values()) == pytest.approx(1.0)
+
+    def test_collision_event(self):
+        """Test collisions are reported as they are found"""
+        collisions = []
+        observer = SimulationObserver(on_collision=collisions.append)
+        cars = [Car("X", 5, 5, "N", "F"), Car("Y", 5, 7, "S", "F")]
+        SimulationEngine(10, 10, observer).run(cars)
+        assert [(c['step'], c['position']) for c in collisions] == [(1, (5, 6))]
+        assert observer.summary()['collisions'] == 1
+
+    def test_trace_reports_to_observer(self):
+        """Test tracing a run reports the same steps as running it"""
+        cars = [Car("A", 1, 2, "N", "FFRFFFFRRL"), Car("B", 7, 8, "W", "FFLFFFRFFF")]
+        ran, traced = SimulationObserver(), SimulationObserver()
+        SimulationEngine(10, 10, ran).run(cars)
+        records = list(SimulationEngine(10, 10, traced).trace(cars))
+        assert len(records) == traced.summary()['steps'] == ran.summary()['steps']
+        assert traced.totals == ran.totals
+
+    @pytest.mark.parametrize("engine_class", [VectorizedEngine, BroadPhaseEngine, ActiveSetEngine])
+    def test_engines_with_own_run_reject_observer(self, engine_class):
+        """Test engines that can't report to an observer say so instead of ignoring it"""
+        with pytest.raises(NotImplementedError, match="can't report to an observer"):
+            engine_class(10, 10, SimulationObserver())
@@ -0,0 +1,57 @@
+import json
+import pytest
+from entities.field import Field
+from entities.simulation_engine import SimulationEngine
+from entities.simulation_session import SimulationSession
+
+@pytest.fixture
+def field():
+    """Fixture providing a 50x50 field with two long-running cars"""
+    field = Field(50, 50)
+    field.add_car("A", 0, 0, "N", "FFFFFRFFFFFR" * 20)
+    field.add_car("B", 40, 40, "S", "FFRRFF" * 40)
+    return field
+
+def fresh_result(field):
+    return SimulationEngine.from_field(field).run(field.cars)
+
+class TestSimulationSession:
+    def test_run_matches_engine(self, field):
+        """Test a session run gives the engine's result and keeps checkpoints"""
+        session = SimulationSession(field, checkpoint_interval=10)
+        assert session.run() == fresh_result(field)
+        assert sorted(session.checkpoints)[:3] == [0, 10, 20]
+
+    def test_update_resumes_from_checkpoint(self, field, monkeypatch):
+        """Test an edit re-runs from the last checkpoint before the edited command"""
+        session = SimulationSession(field, checkpoint_interval=10)
+        session.run()
+        starts = []
+        trace = session.engine.trace
+        monkeypatch.setattr(session.engine, "trace", lambda cars, start, states: starts.append(start) or trace(cars, start, states))
+
+        commands = field.cars[1].commands
+        result = session.update_commands("B", commands[:125] + "LL" + commands[127:])
+        assert starts == [120]
+        assert result == fresh_result(field)
+
+    def test_edit_after_collision_is_free(self):
+        """Test an edit after the collision step keeps the previous result"""
+        field = Field(10, 10)
+        field.add_car("A", 1, 2, "N", "FFRFFFFRRL")
+        field.add_car("B", 7, 8, "W", "FFLFFFFFFF")
+        session = SimulationSession(field)
+        result = session.run()
+        assert session.update_commands("B", "FFLFFFFFFR") is result
+        assert session.update_commands("B", "FFFFFFFFFF") == fresh_result(field)
+        assert not session.result['collisions']
+
+    def test_snapshot_restore(self, field):
+        """Test a JSON round-tripped snapshot resumes to the same result"""
+        session = SimulationSession(field, checkpoint_interval=64)
+        expected = session.run()
+        snapshot = json.loads(json.dumps(session.snapshot(77)))
+        assert snapshot['step'] == 77
+
+        restored = SimulationSession.restore(snapshot)
+        assert restored.run(77) == expected
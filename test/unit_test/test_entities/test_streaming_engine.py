@@ -0,0 +1,52 @@
+import random
+import pytest
+from entities.car import Car
+from entities.simulation_engine import SimulationEngine
+from entities.streaming_engine import StreamingEngine
+from utils.command_loop import parse_commands
+from utils.command_stream import CommandStream
+
+def streamed(cars, chunk_size):
+    """Copies of the cars with their commands as streams of chunk_size"""
+    return [
+        Car(car.name, car.x, car.y, car.direction, CommandStream.from_iterable(car.commands, chunk_size))
+        for car in cars
+    ]
+
+class TestStreamingEngine:
+    @pytest.mark.parametrize("seed", range(30))
+    def test_matches_simulation_engine(self, seed, random_cars, collision_summary):
+        """Test streamed commands give SimulationEngine's result, whatever the chunk size"""
+        rng = random.Random(seed)
+        width, height = rng.randint(1, 8), rng.randint(1, 8)
+        cars = random_cars(rng, width, height, rng.randint(1, max(1, width * height // 3)), 30)
+        expected = SimulationEngine(width, height).run(cars)
+        result = StreamingEngine(width, height).run(streamed(cars, rng.randint(1, 7)))
+        assert result['positions'] == expected['positions']
+        assert collision_summary(result) == collision_summary(expected)
+
+    def test_unbounded_generator(self, collision_summary):
+        """Test a car fed by an endless generator runs until the first collision"""
+        def circle():
+            while True:
+                yield from "FFRFFR"
+        cars = [
+            Car("A", 0, 0, "N", CommandStream.from_iterable(circle())),
+            Car("B", 2, 4, "S", "FF"),
+        ]
+        result = StreamingEngine(5, 5).run(cars)
+        assert collision_summary(result) == [(5, (2, 2), ["A", "B"])]
+        assert result['positions'] == [(1, 2, 'E'), (2, 2, 'S')]
+
+    def test_file_and_looped_sources(self, tmp_path):
+        """Test streams from a file run alongside plain and looped commands"""
+        path = tmp_path / "commands.txt"
+        path.write_text("FFRFF\n" * 2)
+        cars = [
+            Car("A", 0, 0, "N", CommandStream.from_file(path, chunk_size=4)),
+            Car("B", 9, 9, "S", parse_commands("(FL)*3")),
+            Car("C", 5, 5, "W", "RR"),
+        ]
+        result = StreamingEngine(10, 10).run(cars)
+        assert result['positions'] == [(4, 0, 'S'), (9, 9, 'W'), (5, 5, 'E')]
+        assert result['collisions'] == []
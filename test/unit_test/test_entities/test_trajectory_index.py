@@ -0,0 +1,55 @@
+import random
+import pytest
+from entities.car import Car
+from entities.field import Field
+from entities.simulation_engine import SimulationEngine
+from entities.trajectory_index import TrajectoryIndex
+
+class TestTrajectoryIndex:
+    def test_preview_collision(self):
+        """Test the new car's first collision is reported when it is added"""
+        field = Field(10, 10)
+        field.add_car("A", 1, 2, "N", "FFRFFFFRRL")
+        assert field.collision_preview("A") is None
+        field.add_car("B", 7, 8, "W", "FFLFFFFFFF")
+        preview = field.collision_preview("B")
+        assert preview['step'] == 7
+        assert preview['position'] == (5, 4)
+        assert [car.name for car in preview['cars']] == ["A"]
+
+    def test_no_preview_after_earlier_collision(self):
+        """Test a collision after the simulation already stopped is not reported"""
+        index = TrajectoryIndex(10, 10)
+        index.add(Car("X", 5, 5, "N", "F"))
+        index.add(Car("Y", 5, 7, "S", "F"))
+        assert index.add(Car("Z", 2, 6, "E", "FFFF")) is None
+
+    def test_parked_car_extends_the_run(self):
+        """Test a longer new car makes a parked car's later collision count"""
+        index = TrajectoryIndex(10, 10)
+        index.add(Car("P", 0, 0, "E", "FF"))
+        preview = index.add(Car("Q", 5, 0, "W", "FFFFF"))
+        assert (preview['step'], preview['position']) == (3, (2, 0))
+
+    @pytest.mark.parametrize("seed", range(20))
+    def test_matches_simulation(self, seed):
+        """Test the last car's preview agrees with a full simulation"""
+        rng = random.Random(seed)
+        cells = rng.sample([(x, y) for x in range(6) for y in range(6)], 8)
+        cars = [
+            Car(f"C{i}", x, y, rng.choice("NESW"), "".join(rng.choice("FFLR") for _ in range(rng.randint(0, 20))))
+            for i, (x, y) in enumerate(cells)
+        ]
+        index = TrajectoryIndex(6, 6)
+        for car in cars:
+            preview = index.add(car)
+
+        collisions = SimulationEngine(6, 6).run(cars)['collisions']
+        last = cars[-1]
+        hit = [c for c in collisions if last in c['cars']]
+        if hit:
+            assert preview['step'] == hit[0]['step']
+            assert preview['position'] == hit[0]['position']
+            assert preview['cars'] == [car for car in hit[0]['cars'] if car is not last]
+        else:
+            assert preview is None
@@ -0,0 +1,18 @@
+import pytest
+from entities.car import Car
+from entities.vectorized_engine import VectorizedEngine, encode_commands
+
+class TestVectorizedEngine:
+    def test_encode_commands(self):
+        """Test commands are encoded into a padded matrix"""
+        matrix = encode_commands(["FLR", "F", ""])
+        assert matrix.tolist() == [[1, 2, 3], [1, 0, 0], [0, 0, 0]]
+
+    @pytest.mark.parametrize("cars, expected", [
+        ([Car("A", 1, 2, "N", "FFRFFFFRRL")], [(5, 4, 'S')]),
+        ([Car("A", 0, 0, "S", "FLFR")], [(1, 0, 'S')]),
+        ([Car("A", 1, 2, "N", "FFRFFFFRRL"), Car("B", 7, 8, "W", "FFLFFFRFFF")], [(5, 4, 'S'), (2, 5, 'W')]),
+    ])
+    def test_final_positions(self, cars, expected):
+        """Test known scenarios end where run_simulation ends"""
+        assert VectorizedEngine(10, 10).run(cars)['positions'] == expected
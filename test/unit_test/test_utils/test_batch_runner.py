@@ -0,0 +1,42 @@
+import pytest
+from entities.field import Field
+from entities.simulation_engine import SimulationEngine
+from entities.vectorized_engine import VectorizedEngine
+from utils.batch_runner import pack_field, run_batch
+
+def make_fields():
+    """Fields alternating single-car and two-car collision scenarios"""
+    fields = []
+    for i in range(7):
+        field = Field(10, 10)
+        field.add_car("A", 1, 2, "N", "FFRFFFFRRL")
+        if i % 2:
+            field.add_car("B", 7, 8, "W", "FFLFFFFFFF")
+        fields.append(field)
+    return fields
+
+class TestBatchRunner:
+    def test_pack_field(self):
+        """Test fields are packed into plain tuples"""
+        field = make_fields()[0]
+        assert pack_field(field) == (10, 10, (("A", 1, 2, "N", "FFRFFFFRRL"),))
+
+    @pytest.mark.parametrize("ordered, engine_class", [
+        (True, SimulationEngine),
+        (False, SimulationEngine),
+        (True, VectorizedEngine),
+    ])
+    def test_run_batch_matches_serial(self, ordered, engine_class):
+        """Test every field gets the same result as a serial run"""
+        fields = make_fields()
+        results = list(run_batch(iter(fields), workers=2, chunk_size=2, ordered=ordered, engine_class=engine_class))
+
+        indexes = [index for index, _ in results]
+        if ordered:
+            assert indexes == list(range(len(fields)))
+        assert sorted(indexes) == list(range(len(fields)))
+
+        for index, result in results:
+            field = fields[index]
+            expected = SimulationEngine.from_field(field).run(field.cars)
+            assert result == expected
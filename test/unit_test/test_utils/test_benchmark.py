@@ -0,0 +1,45 @@
+import pytest
+from entities.simulation_engine import SimulationEngine
+from utils import engine_dispatcher
+from utils.benchmark import ENGINES, compare, run_benchmarks
+from utils.scenario_generator import generate_scenario
+from utils.scenario_stream import load_field
+
+class TestScenarioGenerator:
+    def test_seeded(self):
+        """Test the same seed gives the same scenario"""
+        assert generate_scenario(3, 50, 50, 20, 30) == generate_scenario(3, 50, 50, 20, 30)
+        assert generate_scenario(3, 50, 50, 20, 30) != generate_scenario(4, 50, 50, 20, 30)
+
+    def test_density_packs_cars(self):
+        """Test a density packs the cars into a corner region"""
+        scenario = generate_scenario(0, 1000, 1000, 25, 10, density=1.0)
+        assert all(car['x'] < 5 and car['y'] < 5 for car in scenario['cars'])
+
+    def test_lanes_never_collide(self):
+        """Test lane scenarios run all their commands without collision"""
+        field = load_field(generate_scenario(1, 30, 30, 30, 200, lanes=True))
+        assert all(len(car.commands) == 200 for car in field.cars)
+        assert SimulationEngine.from_field(field).run(field.cars)['collisions'] == []
+
+    def test_too_many_cars(self):
+        with pytest.raises(ValueError):
+            generate_scenario(0, 3, 3, 10, 5)
+
+class TestBenchmark:
+    def test_run_and_compare(self):
+        """Test a report compares clean against itself and flags a slowdown"""
+        report = run_benchmarks(['simulation', 'vectorized'], ['small'], repeat=1)
+        assert [(r['engine'], r['size']) for r in report['results']] == [('simulation', 'small'), ('vectorized', 'small')]
+        assert report['results'][0]['steps'] == 100
+        assert compare(report, report) == []
+
+        baseline = {'results': [dict(r, wall_time=r['wall_time'] / 2) for r in report['results']]}
+        regressions = compare(report, baseline, threshold=0.5)
+        assert len(regressions) == 2
+        assert regressions[0].startswith("simulation small: wall_time")
+
+    def test_every_engine_is_benchmarked(self):
+        """Test the benchmark follows the dispatcher's registry, new engines included"""
+        assert set(engine_dispatcher.ENGINES) | {'active_set'} == set(ENGINES)
+        assert 'broad_phase' in ENGINES
@@ -0,0 +1,108 @@
+import random
+import pytest
+from entities.simulation_engine import SimulationEngine
+from utils.bulk_ingest import read_binary, read_text, write_binary
+from utils.navigation import DIRECTIONS
+
+def write_text(path, width, height, cars):
+    with open(path, 'w') as file:
+        file.write(f"{width} {height}\n")
+        for name, x, y, direction, commands in cars:
+            file.write(f"{name} {x} {y} {direction} {commands}\n")
+
+def random_car_rows(seed, width, height, count):
+    rng = random.Random(seed)
+    cells = rng.sample([(x, y) for x in range(width) for y in range(height)], count)
+    return [
+        (f"C{i}", x, y, rng.choice("NESW"), "".join(rng.choice("FFFLR") for _ in range(rng.randint(0, 30))))
+        for i, (x, y) in enumerate(cells)
+    ]
+
+def expected_result(width, height, scenario):
+    return SimulationEngine(width, height).run(list(scenario.cars()))
+
+class TestBulkIngest:
+    def test_read_text_into_arrays(self, tmp_path):
+        path = tmp_path / "field.txt"
+        path.write_bytes(b"10 10\r\nA 1 2 N FFRFFFFRRL\r\n\r\nlong_name 7 8 w FFLFFFFFFF\nC 0 0 E\n")
+        with read_text(path) as scenario:
+            assert len(scenario) == 3
+            assert scenario.xs.tolist() == [1, 7, 0]
+            assert scenario.ys.tolist() == [2, 8, 0]
+            assert [DIRECTIONS[d] for d in scenario.dirs] == ['N', 'W', 'E']
+            assert [scenario.name(i) for i in range(3)] == ["A", "long_name", "C"]
+            assert [scenario.commands(i) for i in range(3)] == ["FFRFFFFRRL", "FFLFFFFFFF", ""]
+            assert scenario.lines.tolist() == [2, 4, 5]
+
+    def test_lowercase_commands(self, tmp_path):
+        """Test lowercase commands are accepted and turn like the prompts' upper-cased ones"""
+        path = tmp_path / "field.txt"
+        path.write_text("6 6\nA 1 2 N ffr\nB 4 4 s fLrFl\n")
+        with read_text(path) as scenario:
+            assert [scenario.commands(i) for i in range(2)] == ["FFR", "FLRFL"]
+            result = scenario.run()
+            expected = expected_result(6, 6, scenario)
+            positions = list(zip(result['xs'].tolist(), result['ys'].tolist(), [DIRECTIONS[d] for d in result['dirs']]))
+            assert positions == expected['positions'] == [(1, 4, 'E'), (4, 2, 'E')]
+
+    @pytest.mark.parametrize("seed", range(5))
+    def test_run_matches_simulation_engine(self, tmp_path, seed):
+        """Test simulating from the arrays gives SimulationEngine's result"""
+        path = tmp_path / "field.txt"
+        write_text(path, 12, 9, random_car_rows(seed, 12, 9, 30))
+        with read_text(path) as scenario:
+            expected = expected_result(12, 9, scenario)
+            result = scenario.run()
+            positions = list(zip(result['xs'].tolist(), result['ys'].tolist(), [DIRECTIONS[d] for d in result['dirs']]))
+            assert positions == expected['positions']
+            assert [(c['step'], c['position'], c['cars']) for c in result['collisions']] == [
+                (c['step'], c['position'], [int(car.name[1:]) for car in c['cars']]) for c in expected['collisions']
+            ]
+
+    def test_binary_round_trip(self, tmp_path):
+        """Test the binary layout holds the same scenario as the text it was made from"""
+        text, binary = tmp_path / "field.txt", tmp_path / "field.bin"
+        write_text(text, 20, 20, random_car_rows(1, 20, 20, 50))
+        with read_text(text) as scenario:
+            write_binary(binary, scenario)
+            cars = [vars(car) for car in scenario.cars()]
+        with read_binary(binary) as scenario:
+            assert [vars(car) for car in scenario.cars()] == cars
+            assert not scenario.xs.flags.owndata
+
+    @pytest.mark.parametrize("lines, message", [
+        (["0 5"], "Line 1: Width and height must be positive integers"),
+        (["5"], "Line 1: Please enter correct format"),
+        (["5 5", "A 1 2"], "Line 2: Please enter correct format"),
+        (["5 5", "A x 2 N F"], "Line 2: Invalid input format"),
+        (["5 5", "Car A 1 2 N F"], "Line 2: Please enter correct format, names and commands can't contain spaces"),
+        (["5 5", "A 1 2 N F F"], "Line 2: Please enter correct format, names and commands can't contain spaces"),
+        (["5 5", "A 1 2 N F", "A 2 2 N F"], "Line 3: A car with same name already exists"),
+        (["5 5", "A 1 2 X F"], "Line 2: Direction must be N, S, E, or W"),
+        (["5 5", "A 1 2 NE F"], "Line 2: Direction must be N, S, E, or W"),
+        (["5 5", "A -1 2 N F"], r"Line 2: Position must be within field border \(0-4, 0-4\)"),
+        (["5 5", "A 1 2 N F", "B 1 2 S"], r"Line 3: Position \(1,2\) is already occupied by another car"),
+        (["5 5", "A 1 2 N F", "B 2 2 S FFX"], "Line 3: Commands can only be F, L, or R"),
+    ])
+    def test_validation_errors(self, tmp_path, lines, message):
+        path = tmp_path / "field.txt"
+        path.write_text("\n".join(lines) + "\n")
+        with pytest.raises(ValueError, match=message):
+            read_text(path)
+
+    def test_not_binary(self, tmp_path):
+        path = tmp_path / "field.bin"
+        path.write_bytes(b"5 5\n")
+        with pytest.raises(ValueError, match="Not a binary scenario file"):
+            read_binary(path)
+
+    @pytest.mark.parametrize("width, height", [(0, 5), (5, 0)])
+    def test_binary_empty_field(self, tmp_path, width, height):
+        """Test a binary header with no cells is rejected like the text layout"""
+        text, binary = tmp_path / "field.txt", tmp_path / "field.bin"
+        write_text(text, 5, 5, [("A", 0, 0, "N", "F")])
+        with read_text(text) as scenario:
+            scenario.width, scenario.height = width, height
+            write_binary(binary, scenario)
+        with pytest.raises(ValueError, match="Width and height must be positive integers"):
+            read_binary(binary)
@@ -0,0 +1,40 @@
+import pytest
+from utils.command_loop import CommandLoop, parse_commands
+
+class TestCommandLoop:
+    def test_plain_commands_stay_strings(self):
+        assert parse_commands("ffrl") == "FFRL"
+
+    def test_loop_is_not_expanded(self):
+        """Test a repeated body is stored once with its count"""
+        commands = parse_commands("FF(FFRFF)*1000000L")
+        assert isinstance(commands, CommandLoop)
+        assert commands.segments == [("FF", 1), ("FFRFF", 1000000), ("L", 1)]
+        assert len(commands) == 2 + 5 * 1000000 + 1
+        assert str(commands) == "FF(FFRFF)*1000000L"
+
+    def test_reads_like_expanded_string(self):
+        """Test indexing and iterating give the commands of the expanded string"""
+        commands = parse_commands("F(RL)*3(F)*1R")
+        expanded = "FRLRLRLFR"
+        assert commands.expand() == expanded
+        assert "".join(commands) == expanded
+        assert [commands[i] for i in range(len(commands))] == list(expanded)
+        with pytest.raises(IndexError):
+            commands[len(expanded)]
+
+    @pytest.mark.parametrize("text, message", [
+        ("FFX", "Commands can only be F, L, or R"),
+        ("123", "Commands can only be F, L, or R"),
+        ("(FX)*2", "Commands can only be F, L, or R"),
+        ("(FF)2", "Loops must be written as (commands)*count"),
+        ("((F)*2)*3", "Loops must be written as (commands)*count"),
+        ("()*3", "Loops must be written as (commands)*count"),
+        ("(FF*3", "Loops must be written as (commands)*count"),
+        ("(F)*99999999999999999999", "Loops can repeat at most"),
+        ("(FF)*5000000000000000000(F)*5000000000000000000", "Loops can repeat at most"),
+        ("(F)*" + "9" * 5000, "Loops can repeat at most"),
+    ])
+    def test_invalid_commands(self, text, message):
+        with pytest.raises(ValueError, match=message.replace("(", r"\(").replace(")", r"\)").replace("*", r"\*")):
+            parse_commands(text)
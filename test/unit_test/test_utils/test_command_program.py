@@ -0,0 +1,25 @@
+import pytest
+from utils.command_program import FORWARD, TURN, advance, compile_commands
+
+class TestCommandProgram:
+    def test_compile_run_length_encodes(self):
+        """Test forward runs and turn runs become one op each"""
+        program = compile_commands("FFFRRRRLFF")
+        assert program.ops == [
+            (FORWARD, 0, 3, 0),
+            (TURN, 3, 5, 3),  # RRRRL is a net left turn
+            (FORWARD, 8, 2, 0),
+        ]
+        assert len(program) == 10
+
+    @pytest.mark.parametrize("x, y, direction, commands, steps, expected", [
+        (1, 2, 0, "FFRFFFFRRL", 10, (5, 4, 2)),
+        (1, 2, 0, "FFRFFFFRRL", 4, (2, 4, 1)),
+        (1, 2, 0, "FFRFFFFRRL", 8, (5, 4, 2)),   # Stops inside the turn run
+        (0, 0, 2, "FLFR", 4, (1, 0, 2)),         # Blocked by the bottom border
+        (9, 5, 1, "F" * 1000000, 1000000, (9, 5, 1)),
+        (0, 0, 1, "F" * 1000000, 3, (3, 0, 1)),
+    ])
+    def test_advance(self, x, y, direction, commands, steps, expected):
+        """Test advancing matches running commands one by one on a 10x10 field"""
+        assert advance(compile_commands(commands), x, y, direction, steps, 10, 10) == expected
@@ -0,0 +1,37 @@
+import mmap
+import pytest
+from utils.command_stream import CommandStream
+
+class TestCommandStream:
+    def test_from_iterable(self):
+        """Test single commands are grouped into chunks"""
+        assert list(CommandStream.from_iterable(iter("FFLRF"), chunk_size=2)) == ["FF", "LR", "F"]
+
+    def test_from_file(self, tmp_path):
+        """Test a file is read in chunks, without its newlines"""
+        path = tmp_path / "commands.txt"
+        path.write_text("FFRF\nLLF\n")
+        assert "".join(CommandStream.from_file(path, chunk_size=3)) == "FFRFLLF"
+
+    def test_from_buffer(self, tmp_path):
+        path = tmp_path / "commands.txt"
+        path.write_bytes(b"FRFRFL")
+        with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            stream = CommandStream.from_buffer(buffer, chunk_size=4)
+            assert list(stream) == ["FRFR", "FL"]
+
+    def test_invalid_commands(self):
+        """Test invalid commands are rejected once their chunk is read"""
+        stream = CommandStream(["FF", "FX"])
+        assert next(stream) == "FF"
+        with pytest.raises(ValueError, match="Commands can only be F, L, or R"):
+            next(stream)
+
+    def test_close(self, tmp_path):
+        """Test closing a partly read file stream closes the file"""
+        path = tmp_path / "commands.txt"
+        path.write_text("F" * 100)
+        stream = CommandStream.from_file(path, chunk_size=10)
+        next(stream)
+        stream.close()
+        assert list(stream) == []
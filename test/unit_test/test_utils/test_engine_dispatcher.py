@@ -0,0 +1,112 @@
+import json
+import numpy as np
+import pytest
+import utils.engine_dispatcher as engine_dispatcher
+from entities.car import Car
+from entities.loop_engine import LoopEngine
+from entities.simulation_engine import SimulationEngine
+from entities.streaming_engine import StreamingEngine
+from entities.vectorized_engine import VectorizedEngine
+from utils.command_loop import parse_commands
+from utils.command_stream import CommandStream
+from utils.engine_dispatcher import CANDIDATES, EngineDispatcher
+
+# Made-up coefficients: simulation is cheap per scenario, vectorized per car step
+COEFFICIENTS = {
+    'simulation': [0.0, 0.0, 0.0, 1e-7, 0.0],
+    'vectorized': [1e-2, 0.0, 0.0, 1e-9, 0.0],
+    'trajectory': [1.0, 0.0, 0.0, 0.0, 0.0],
+    'broad_phase': [1.0, 0.0, 0.0, 0.0, 0.0],
+}
+
+@pytest.fixture
+def cache_path(tmp_path, monkeypatch):
+    monkeypatch.delenv('AUTO_DRIVING_CAR_ENGINE', raising=False)
+    path = tmp_path / "engine_costs.json"
+    path.write_text(json.dumps({'environment': engine_dispatcher.environment(), 'coefficients': COEFFICIENTS}))
+    return path
+
+def cars(count, length):
+    return [Car(f"C{i}", i, 0, "N", "F" * length) for i in range(count)]
+
+class TestEngineDispatcher:
+    def test_picks_cheapest_estimate(self, cache_path):
+        """Test mid-sized scenarios go to the plain loop and big ones to the vectorized engine"""
+        dispatcher = EngineDispatcher(cache_path)
+        engine_class, report = dispatcher.choose(200, 200, cars(100, 200))
+        assert engine_class is SimulationEngine
+        assert report['engine'] == 'simulation'
+        assert report['features'] == {'cars': 100, 'steps': 200, 'area': 40000, 'density': 0.0025}
+        assert report['reason'].startswith("simulation has the lowest estimated time")
+        assert "next vectorized" in report['reason']
+        engine_class, report = dispatcher.choose(1000, 1000, cars(1000, 1000))
+        assert engine_class is VectorizedEngine
+        assert set(report['estimates']) == set(CANDIDATES)
+
+    def test_small_scenarios_skip_calibration(self, tmp_path, monkeypatch):
+        """Test interactive sized scenarios neither calibrate nor read the cache"""
+        monkeypatch.delenv('AUTO_DRIVING_CAR_ENGINE', raising=False)
+        monkeypatch.setattr(engine_dispatcher, 'calibrate', lambda: pytest.fail("calibrated"))
+        path = tmp_path / "engine_costs.json"
+        engine_class, report = EngineDispatcher(path).choose(10, 10, cars(2, 10))
+        assert engine_class is SimulationEngine
+        assert report['reason'] == "2 cars x 10 steps is too small to be worth calibrating"
+        assert not path.exists()
+
+    def test_padded_matrix_over_budget(self, cache_path, monkeypatch):
+        """Test the vectorized engine is left out when its command matrix wouldn't fit"""
+        monkeypatch.setattr(engine_dispatcher, 'MATRIX_BUDGET', 500_000)
+        engine_class, report = EngineDispatcher(cache_path).choose(1000, 1000, cars(1000, 1000))
+        assert engine_class is SimulationEngine
+        assert 'vectorized' not in report['estimates']
+
+    def test_fit_non_negative(self):
+        """Test terms fitted negative are dropped and the rest refitted"""
+        rows = np.array([[1.0, 1.0], [1.0, 2.0], [1.0, 3.0]])
+        assert engine_dispatcher.fit_non_negative(rows, np.array([3.0, 2.0, 1.0])).tolist() == [2.0, 0.0]
+        assert engine_dispatcher.fit_non_negative(rows, rows[:, 1] * 2).tolist() == pytest.approx([0.0, 2.0])
+
+    def test_override(self, cache_path):
+        engine_class, report = EngineDispatcher(cache_path, override='vectorized').choose(10, 10, cars(2, 10))
+        assert engine_class is VectorizedEngine
+        assert report['reason'] == "forced by override"
+        with pytest.raises(ValueError, match="Unknown engine"):
+            EngineDispatcher(cache_path, override='warp')
+
+    def test_loops_go_to_loop_engine(self, cache_path):
+        looped = [Car("A", 0, 0, "N", parse_commands("(FR)*1000"))]
+        assert EngineDispatcher(cache_path).choose(10, 10, looped)[0] is LoopEngine
+
+    def test_streams_go_to_streaming_engine(self, cache_path):
+        streamed = [Car("A", 0, 0, "N", CommandStream.from_iterable("FFR")), *cars(1, 10)]
+        assert EngineDispatcher(cache_path).choose(10, 10, streamed)[0] is StreamingEngine
+
+    @pytest.mark.parametrize("override", ['vectorized', 'trajectory', 'broad_phase', 'batched', 'sharded'])
+    def test_override_falls_back_for_loops_and_streams(self, cache_path, override):
+        """Test engines needing command strings are replaced, and the report says so"""
+        dispatcher = EngineDispatcher(cache_path, override=override)
+        looped = [Car("A", 0, 0, "N", parse_commands("(FFRFF)*3"))]
+        engine_class, report = dispatcher.choose(10, 10, looped)
+        assert engine_class is LoopEngine
+        assert report['reason'] == f"{override} can't run looped commands, falling back to loop"
+        streamed = [Car("A", 0, 0, "N", CommandStream.from_iterable("FFR")), *looped]
+        assert dispatcher.choose(10, 10, streamed)[0] is StreamingEngine
+        assert EngineDispatcher(cache_path, override='simulation').choose(10, 10, looped)[0] is SimulationEngine
+
+    def test_calibration_is_cached(self, tmp_path, monkeypatch):
+        """Test the micro-benchmark runs once, later dispatchers read its results from disk"""
+        monkeypatch.delenv('AUTO_DRIVING_CAR_ENGINE', raising=False)
+        path = tmp_path / "costs" / "engine_costs.json"
+        calls = []
+        monkeypatch.setattr(engine_dispatcher, 'calibrate', lambda: calls.append(1) or COEFFICIENTS)
+        EngineDispatcher(path).choose(200, 200, cars(100, 200))
+        EngineDispatcher(path).choose(200, 200, cars(100, 200))
+        assert len(calls) == 1
+        assert json.loads(path.read_text())['coefficients'] == COEFFICIENTS
+
+    def test_calibrate(self):
+        """Test the real micro-benchmark fits every candidate"""
+        coefficients = engine_dispatcher.calibrate()
+        assert set(coefficients) == set(CANDIDATES)
+        assert all(len(values) == 5 for values in coefficients.values())
+        assert all(value >= 0 for values in coefficients.values() for value in values)
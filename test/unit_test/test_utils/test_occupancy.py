@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+from entities.field import Field
+from utils.occupancy import DenseOccupancy, SparseOccupancy, has_shared_cell, make_occupancy
+
+BACKENDS = [DenseOccupancy, SparseOccupancy]
+
+class TestOccupancy:
+    @pytest.mark.parametrize("backend", BACKENDS)
+    def test_mapping(self, backend):
+        """Test both backends map occupied cells to car indexes"""
+        occupancy = backend(10, 20)
+        occupancy[(3, 19)] = 0
+        occupancy[(9, 0)] = 1
+        assert (3, 19) in occupancy
+        assert (3, 18) not in occupancy
+        assert occupancy[(9, 0)] == 1
+        assert occupancy.get((0, 0)) is None
+        assert len(occupancy) == 2
+        assert sorted(occupancy.items()) == [((3, 19), 0), ((9, 0), 1)]
+
+    @pytest.mark.parametrize("cells, expected", [
+        ([], False),
+        ([5], False),
+        ([1, 2, 3, 4], False),
+        ([1, 2, 3, 1], True),
+        ([7, 7], True),
+    ])
+    def test_has_shared_cell(self, cells, expected):
+        """Test cars on the same cell are found"""
+        assert has_shared_cell(np.array(cells, dtype=np.int64)) == expected
+
+    @pytest.mark.parametrize("width, height, cars, expected", [
+        (10, 10, 5, DenseOccupancy),
+        (1000, 1000, 5, SparseOccupancy),
+        (1000, 1000, 100000, SparseOccupancy),
+        (1000, 1000, 250000, DenseOccupancy),
+        (2 ** 31, 2 ** 31, 10 ** 6, SparseOccupancy),
+    ])
+    def test_make_occupancy(self, width, height, cars, expected):
+        """Test the backend is picked from the field size and number of cars"""
+        assert type(make_occupancy(width, height, cars)) is expected
+
+    def test_field_moves_to_dense_grid(self):
+        """Test a field switches backend once it gets busy"""
+        field = Field(100, 100)
+        assert isinstance(field.occupied, SparseOccupancy)
+        field.add_cars((f"C{i}", i % 100, i // 100, "N", "") for i in range(2499))
+        assert isinstance(field.occupied, SparseOccupancy)
+        field.add_car("Z", 99, 99, "N", "")
+        assert isinstance(field.occupied, DenseOccupancy)
+        assert field.is_occupied(98, 24)
+        assert not field.is_occupied(98, 25)
+        assert field.occupied[(99, 99)] == 2499
+
+    @pytest.mark.parametrize("backend", BACKENDS)
+    def test_cells_outside_the_field(self, backend):
+        """Test cells outside the grid are free and can't be occupied, instead of wrapping around"""
+        occupancy = backend(10, 10)
+        occupancy[(9, 0)] = 0
+        assert (-1, 0) not in occupancy
+        assert (10, 0) not in occupancy
+        assert occupancy.get((0, -10), 'free') == 'free'
+        for cell in [(-1, 0), (10, 0), (0, 10), (0, -1)]:
+            with pytest.raises(ValueError, match=rf"Position \({cell[0]},{cell[1]}\) is outside the field"):
+                occupancy[cell] = 1
+        assert len(occupancy) == 1
+
+    @pytest.mark.parametrize("width, height", [(10, 10), (10000, 10000)])
+    def test_field_rejects_cars_outside(self, width, height):
+        """Test add_car checks the border on dense and sparse fields alike"""
+        field = Field(width, height)
+        with pytest.raises(ValueError, match="Position must be within field border"):
+            field.add_car("A", -1, 0, "N", "")
+        with pytest.raises(ValueError, match="Position must be within field border"):
+            field.add_car("A", width, 0, "N", "")
+        assert field.cars == []
+        assert len(field.occupied) == 0
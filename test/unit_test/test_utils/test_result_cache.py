@@ -0,0 +1,114 @@
+import json
+import pickle
+import random
+from entities.active_set_engine import ActiveSetEngine
+from entities.car import Car
+from entities.simulation_engine import SimulationEngine
+from entities.streaming_engine import StreamingEngine
+from utils.command_stream import CommandStream
+from utils.result_cache import ResultCache, canonical_order, scenario_key
+
+class TestResultCache:
+    def test_key_ignores_names_and_order(self):
+        """Test renamed and reordered cars share a key, a moved car does not"""
+        cars = [Car("A", 1, 2, "N", "FF"), Car("B", 3, 4, "E", "L")]
+        renamed = [Car("Y", 3, 4, "E", "L"), Car("X", 1, 2, "N", "FF")]
+        moved = [Car("A", 1, 3, "N", "FF"), Car("B", 3, 4, "E", "L")]
+        key = scenario_key(10, 10, cars, canonical_order(cars))
+        assert scenario_key(10, 10, renamed, canonical_order(renamed)) == key
+        assert scenario_key(10, 10, moved, canonical_order(moved)) != key
+        assert scenario_key(10, 11, cars, canonical_order(cars)) != key
+        assert scenario_key(10, 10, cars, canonical_order(cars), 'all') != key
+
+    def test_hit_returns_result_for_callers_cars(self, random_cars, collision_summary):
+        """Test a permuted, renamed scenario is answered from the cache exactly"""
+        cache = ResultCache()
+        for seed in range(20):
+            rng = random.Random(seed)
+            cars = random_cars(rng, 6, 6, 8, 30)
+            engine = SimulationEngine(6, 6)
+            cache.simulate(engine, cars)
+            shuffled = [Car(f"Z{i}", car.x, car.y, car.direction, car.commands) for i, car in enumerate(cars)]
+            rng.shuffle(shuffled)
+            result = cache.simulate(engine, shuffled)
+            expected = engine.run(shuffled)
+            assert result['positions'] == expected['positions']
+            assert collision_summary(result) == collision_summary(expected)
+        assert cache.stats()['hits'] == 20
+        assert cache.stats()['misses'] == 20
+
+    def test_all_collisions_mode(self, random_cars, collision_summary):
+        """Test results of engines that keep going are cached apart and restored in order"""
+        cache = ResultCache()
+        cars = random_cars(random.Random(3), 5, 5, 10, 30)
+        engine = ActiveSetEngine(5, 5)
+        cache.simulate(SimulationEngine(5, 5), cars)
+        first = cache.simulate(engine, cars)
+        reversed_cars = cars[::-1]
+        result = cache.simulate(engine, reversed_cars)
+        assert collision_summary(first) == collision_summary(engine.run(cars))
+        assert collision_summary(result) == collision_summary(engine.run(reversed_cars))
+        assert cache.stats()['hits'] == 1
+
+    def test_lru_bounded_by_bytes(self):
+        cache = ResultCache(max_bytes=10)
+        cache.put("a", b"12345")
+        cache.put("b", b"12345")
+        cache.get("a")
+        cache.put("c", b"12345")
+        assert list(cache.entries) == ["a", "c"]
+        assert cache.stats()['evictions'] == 1
+        assert cache.stats()['bytes'] == 10
+
+    def test_disk_tier_shared(self, tmp_path, collision_summary):
+        """Test a second cache on the same file sees results of the first"""
+        path = tmp_path / "cache.sqlite"
+        cars = [Car("A", 1, 2, "N", "FFRFFFFRRL"), Car("B", 7, 8, "W", "FFLFFFFFFF")]
+        first = ResultCache(path=path)
+        first.simulate(SimulationEngine(10, 10), cars)
+        first.close()
+        second = ResultCache(path=path)
+        result = second.simulate(SimulationEngine(10, 10), cars)
+        assert collision_summary(result) == [(7, (5, 4), ["A", "B"])]
+        assert second.stats()['disk_hits'] == 1
+        second.simulate(SimulationEngine(10, 10), cars)
+        assert second.stats()['memory_hits'] == 1
+        second.close()
+
+    def test_streams_are_not_cached(self):
+        """Test streamed commands are run every time instead of sharing a key"""
+        cache = ResultCache()
+        engine = StreamingEngine(10, 10)
+        first = cache.simulate(engine, [Car("A", 0, 0, "N", CommandStream.from_iterable("FFF"))])
+        second = cache.simulate(engine, [Car("A", 0, 0, "N", CommandStream.from_iterable("RFFFFF"))])
+        assert first['positions'] == [(0, 3, 'N')]
+        assert second['positions'] == [(5, 0, 'E')]
+        assert cache.stats()['hits'] == 0
+
+    def test_tampered_entry_is_run_again(self, tmp_path):
+        """Test a disk entry that isn't a JSON result is never unpickled, the scenario is run instead"""
+        path = tmp_path / "cache.sqlite"
+        cars = [Car("A", 1, 2, "N", "FF")]
+        cache = ResultCache(path=path)
+        key = scenario_key(10, 10, cars, canonical_order(cars))
+        cache.put(key, pickle.dumps(Car("evil", 0, 0, "N", "")))
+        assert cache.simulate(SimulationEngine(10, 10), cars)['positions'] == [(1, 4, 'N')]
+        assert (cache.stats()['hits'], cache.stats()['misses']) == (0, 1)
+        assert json.loads(cache.get(key)) == [[[1, 4, 'N']], []]
+        cache.close()
+
+    def test_corrupt_disk_entry_is_evicted(self, tmp_path):
+        """Test an entry only on disk that can't be decoded is a miss and is deleted"""
+        path = tmp_path / "cache.sqlite"
+        cars = [Car("A", 1, 2, "N", "FF")]
+        key = scenario_key(10, 10, cars, canonical_order(cars))
+        writer = ResultCache(path=path)
+        writer.put(key, b"not json")
+        writer.close()
+        cache = ResultCache(path=path)
+        assert cache.get(key, json.loads) is None
+        assert cache.stats()['misses'] == 1
+        assert cache.stats()['disk_hits'] == 0
+        assert cache.stats()['entries'] == 0
+        assert cache.get(key) is None
+        cache.close()
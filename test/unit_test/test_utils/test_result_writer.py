@@ -0,0 +1,70 @@
+import copy
+import csv
+import numpy as np
+import pytest
+from io import StringIO
+from entities.field import Field
+from entities.simulation_engine import SimulationEngine
+from utils.result_writer import export_results, limit_lines, write_csv, write_npz
+
+def simulated_field(cars):
+    field = Field(10, 10)
+    for car in cars:
+        field.add_car(*car)
+    initial_cars = copy.deepcopy(field.cars)
+    engine = SimulationEngine.from_field(field)
+    engine.apply(field, engine.run(field.cars))
+    return field, initial_cars
+
+class TestResultWriter:
+    def test_write_csv_in_chunks(self):
+        """Test rows spanning several chunks are all written after the header"""
+        out = StringIO()
+        write_csv(out, ('a', 'b'), ((i, i * 2) for i in range(5)), chunk_size=2)
+        assert out.getvalue() == "a,b\n0,0\n1,2\n2,4\n3,6\n4,8\n"
+
+    def test_write_npz_columns(self, tmp_path):
+        """Test each table column becomes an array numpy can load"""
+        path = tmp_path / "out.npz"
+        rows = ((i, f"c{i}") for i in range(5))
+        write_npz(path, {'t': ([('n', np.int64), ('s', 'U2')], rows)}, chunk_size=2)
+        with np.load(path) as data:
+            assert data['t_n'].tolist() == [0, 1, 2, 3, 4]
+            assert data['t_s'].tolist() == ['c0', 'c1', 'c2', 'c3', 'c4']
+
+    def test_export_csv(self, tmp_path):
+        """Test states, collisions and trace tables of a collision"""
+        field, initial_cars = simulated_field([("A", 1, 2, "N", "FFRFFFFRRL"), ("B", 7, 8, "W", "FFLFFFFFFF")])
+        paths = export_results(field, tmp_path / "run", initial_cars=initial_cars)
+        states, collisions, trace = [list(csv.reader(open(path))) for path in paths]
+        assert states == [['name', 'x', 'y', 'direction'], ['A', '4', '4', 'E'], ['B', '5', '5', 'S']]
+        assert collisions == [['step', 'x', 'y', 'car'], ['7', '5', '4', 'A'], ['7', '5', '4', 'B']]
+        assert trace[1:3] == [['0', 'A', '1', '2', 'N'], ['0', 'B', '7', '8', 'W']]
+        assert trace[-2:] == [['6', 'A', '4', '4', 'E'], ['6', 'B', '5', '5', 'S']]
+
+    def test_export_npz(self, tmp_path):
+        """Test the npz export uses indexes for cars and directions"""
+        field, initial_cars = simulated_field([("A", 1, 2, "N", "FFRFFFFRRL"), ("B", 7, 8, "W", "FFLFFFFFFF")])
+        [path] = export_results(field, tmp_path / "run", format='npz', initial_cars=initial_cars)
+        with np.load(path) as data:
+            assert data['states_name'].tolist() == ['A', 'B']
+            assert data['states_direction'].tolist() == [1, 2]
+            assert data['collisions_car'].tolist() == [0, 1]
+            assert data['collisions_step'].tolist() == [7, 7]
+            assert data['trace_step'][:2].tolist() == [0, 0]
+
+    def test_export_unknown_format(self, tmp_path):
+        field, _ = simulated_field([("A", 1, 2, "N", "F")])
+        with pytest.raises(ValueError, match="Unknown export format"):
+            export_results(field, tmp_path / "run", format='xml')
+
+    def test_limit_lines(self):
+        """Test lines past the limit are counted instead of shown"""
+        assert list(limit_lines(iter("abcde"), 2)) == ['a', 'b', "... and 3 more"]
+        assert list(limit_lines(iter("ab"), 2)) == ['a', 'b']
+        assert list(limit_lines(iter("ab"))) == ['a', 'b']
+
+    def test_show_cars_summarized(self, capsys):
+        field, _ = simulated_field([("A", 1, 2, "N", "F"), ("B", 3, 3, "N", "F"), ("C", 4, 4, "N", "F")])
+        field.show_cars(max_lines=1)
+        assert capsys.readouterr().out.splitlines()[2:] == ["- A, (1,3) N, F", "... and 2 more"]
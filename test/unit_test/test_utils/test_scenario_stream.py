@@ -0,0 +1,69 @@
+import json
+import pytest
+from io import StringIO
+from utils.scenario_stream import load_field, run_scenarios, write_results
+
+SCENARIOS = [
+    {"id": "single", "width": 10, "height": 10,
+     "cars": [{"name": "A", "x": 1, "y": 2, "direction": "N", "commands": "FFRFFFFRRL"}]},
+    {"id": "collision", "width": 10, "height": 10,
+     "cars": [{"name": "A", "x": 1, "y": 2, "direction": "N", "commands": "FFRFFFFRRL"},
+              {"name": "B", "x": 7, "y": 8, "direction": "W", "commands": "FFLFFFFFFF"}]},
+]
+
+class TestScenarioStream:
+    def test_run_scenarios(self):
+        """Test results are produced per JSONL line"""
+        stream = StringIO("\n".join(json.dumps(s) for s in SCENARIOS) + "\n\n")
+        results = list(run_scenarios(stream))
+        assert results[0] == {
+            'id': 'single',
+            'cars': [{'name': 'A', 'x': 5, 'y': 4, 'direction': 'S'}],
+            'collisions': []
+        }
+        assert results[1]['collisions'] == [{'step': 7, 'position': [5, 4], 'cars': ['A', 'B']}]
+
+    def test_run_scenarios_is_lazy(self):
+        """Test scenarios are consumed one line at a time"""
+        lines = iter([json.dumps(s) for s in SCENARIOS])
+        results = run_scenarios(lines)
+        assert next(results)['id'] == 'single'
+        assert next(lines) == json.dumps(SCENARIOS[1])
+
+    @pytest.mark.parametrize("car, message", [
+        ({"name": "", "x": 0, "y": 0, "direction": "N"}, "Name cannot be empty"),
+        ({"name": "B", "x": 0, "y": 0, "direction": "X"}, "Direction must be N, S, E, or W"),
+        ({"name": "B", "x": 10, "y": 0, "direction": "N"}, "Position must be within field border"),
+        ({"name": "B", "x": 1, "y": 2, "direction": "N"}, "Position (1,2) is already occupied"),
+        ({"name": "A", "x": 0, "y": 0, "direction": "N"}, "A car with same name already exists"),
+        ({"name": "B", "x": 0, "y": 0, "direction": "N", "commands": "FFX"}, "Commands can only be F, L, or R"),
+    ])
+    def test_load_field_validation(self, car, message):
+        """Test invalid cars are rejected with the prompt's error messages"""
+        scenario = {"width": 10, "height": 10,
+                    "cars": [{"name": "A", "x": 1, "y": 2, "direction": "N"}, car]}
+        with pytest.raises(ValueError, match=message.replace("(", r"\(").replace(")", r"\)")):
+            load_field(scenario)
+
+    def test_write_results_reports_errors(self):
+        """Test an invalid scenario produces an error line instead of stopping the stream"""
+        out = StringIO()
+        write_results(StringIO('{"id": 1, "width": 0, "height": 5}\n'), out)
+        assert json.loads(out.getvalue()) == {'id': 1, 'error': 'Width and height must be positive integers'}
+
+    def test_invalid_lines_do_not_stop_the_stream(self):
+        """Test lines that aren't JSON objects get an error result and later lines still run"""
+        lines = 'not json\n[1, 2]\n{"id": 3, "width": 5, "height": 5, "cars": []}\n'
+        results = list(run_scenarios(StringIO(lines)))
+        assert results == [
+            {'id': None, 'error': "Invalid JSON"},
+            {'id': None, 'error': "Scenario must be a JSON object"},
+            {'id': 3, 'cars': [], 'collisions': []},
+        ]
+
+    def test_too_long_loop_is_an_error_line(self):
+        """Test a loop longer than an index can hold is reported instead of stopping the stream"""
+        car = {"name": "A", "x": 0, "y": 0, "direction": "N", "commands": "(F)*99999999999999999999"}
+        [result] = run_scenarios(StringIO(json.dumps({"id": 1, "width": 5, "height": 5, "cars": [car]}) + "\n"))
+        assert result['id'] == 1
+        assert result['error'].startswith("Loops can repeat at most")
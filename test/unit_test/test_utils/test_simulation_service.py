@@ -0,0 +1,87 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+import utils.simulation_service as simulation_service
+from utils.scenario_stream import run_scenario
+from utils.simulation_service import SimulationService, request_simulations
+
+SINGLE = {"id": "single", "width": 10, "height": 10,
+          "cars": [{"name": "A", "x": 1, "y": 2, "direction": "N", "commands": "FFRFFFFRRL"}]}
+COLLISION = {"id": "collision", "width": 10, "height": 10,
+             "cars": [{"name": "A", "x": 1, "y": 2, "direction": "N", "commands": "FFRFFFFRRL"},
+                      {"name": "B", "x": 7, "y": 8, "direction": "W", "commands": "FFLFFFFFFF"}]}
+INVALID = {"id": "invalid", "width": 10, "height": 10,
+           "cars": [{"name": "A", "x": 1, "y": 2, "direction": "N", "commands": "FFX"}]}
+
+async def with_service(coroutine, **options):
+    service = SimulationService(**options)
+    await service.start()
+    try:
+        return await coroutine(service)
+    finally:
+        await service.close()
+
+class TestSimulationService:
+    def test_results_match_local_runs(self):
+        """Test many concurrent requests get the same results as run_scenario"""
+        scenarios = [SINGLE, COLLISION, INVALID] * 50
+
+        async def scenario(service):
+            return await asyncio.gather(
+                request_simulations(scenarios, service.host, service.port),
+                request_simulations(scenarios[::-1], service.host, service.port),
+            )
+
+        first, second = asyncio.run(with_service(scenario, executor=ThreadPoolExecutor(2), workers=2, batch_size=8))
+        assert first == [run_scenario(s) for s in scenarios]
+        assert second == first[::-1]
+        assert first[2]['error'] == "Commands can only be F, L, or R"
+
+    def test_process_pool_and_invalid_json(self):
+        """Test the default process pool and a malformed request line"""
+        async def scenario(service):
+            reader, writer = await asyncio.open_connection(service.host, service.port)
+            writer.write(b'not json\n' + json.dumps(SINGLE).encode() + b'\n')
+            writer.write_eof()
+            lines = [json.loads(await reader.readline()) for _ in range(2)]
+            writer.close()
+            return lines
+
+        lines = asyncio.run(with_service(scenario, workers=1))
+        assert {'id': None, 'error': "Invalid JSON"} in lines
+        assert run_scenario(SINGLE) in lines
+
+    def test_line_over_limit(self, monkeypatch):
+        """Test a request line over the limit gets an error and the next requests still run"""
+        monkeypatch.setattr(simulation_service, 'LINE_LIMIT', 1000)
+
+        async def scenario(service):
+            reader, writer = await asyncio.open_connection(service.host, service.port)
+            writer.write(b'[' + b'1,' * 5000 + b'1]\n' + json.dumps(SINGLE).encode() + b'\n' + b'x' * 1500)
+            writer.write_eof()
+            lines = [json.loads(line) async for line in reader]
+            writer.close()
+            return lines
+
+        lines = asyncio.run(with_service(scenario, executor=ThreadPoolExecutor(1)))
+        too_long = {'id': None, 'error': "Request lines can be at most 1000 bytes"}
+        assert lines[0] == too_long
+        assert sorted(lines[1:], key=str) == sorted([too_long, run_scenario(SINGLE)], key=str)
+
+    def test_requests_the_service_cannot_read(self, monkeypatch):
+        """Test scenarios without an id, not objects or too long are answered in order"""
+        monkeypatch.setattr(simulation_service, 'LINE_LIMIT', 1000)
+        long_scenario = {**SINGLE, 'id': 'long', 'padding': 'x' * 1000}
+        no_id = {key: value for key, value in SINGLE.items() if key != 'id'}
+        scenarios = [no_id, [1, 2], long_scenario, COLLISION]
+
+        async def scenario(service):
+            return await request_simulations(scenarios, service.host, service.port)
+
+        results = asyncio.run(with_service(scenario, executor=ThreadPoolExecutor(1)))
+        assert results == [
+            run_scenario(no_id),
+            {'id': None, 'error': "Scenario must be a JSON object"},
+            {'id': 'long', 'error': "Request lines can be at most 1000 bytes"},
+            run_scenario(COLLISION),
+        ]
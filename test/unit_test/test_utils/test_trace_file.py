@@ -0,0 +1,41 @@
+import random
+import pytest
+from entities.car import Car
+from entities.simulation_engine import SimulationEngine
+from utils.trace_file import TraceReader, write_trace
+
+class TestTraceFile:
+    def test_trace_yields_changes(self):
+        """Test the trace generator yields only changed cars"""
+        cars = [Car("A", 0, 0, "N", "FR"), Car("B", 5, 5, "E", "")]
+        trace = list(SimulationEngine(10, 10).trace(cars))
+        assert trace == [
+            {'step': 1, 'changes': [(0, 0, 1, 'N')], 'collisions': []},
+            {'step': 2, 'changes': [(0, 0, 1, 'E')], 'collisions': []},
+        ]
+
+    @pytest.mark.parametrize("seed", range(5))
+    def test_state_at_every_step(self, tmp_path, seed, random_cars):
+        """Test seeking to any step gives the engine's state at that step"""
+        cars = random_cars(random.Random(seed), 20, 20, 10, 60)
+        path = tmp_path / "trace.bin"
+        steps = write_trace(path, cars, 20, 20, keyframe_interval=7)
+        engine = SimulationEngine(20, 20)
+        with TraceReader(path) as reader:
+            assert reader.steps == steps
+            for step in range(steps + 1):
+                # Running only the first step commands gives the state after that step
+                truncated = [Car(c.name, c.x, c.y, c.direction, c.commands[:step]) for c in cars]
+                assert reader.state_at(step) == engine.run(truncated)['positions']
+
+    def test_collision_is_recorded(self, tmp_path):
+        """Test the collision ending the run is stored with car indexes"""
+        cars = [Car("A", 1, 2, "N", "FFRFFFFRRL"), Car("B", 7, 8, "W", "FFLFFFFFFF")]
+        path = tmp_path / "trace.bin"
+        assert write_trace(path, cars, 10, 10) == 6
+        with TraceReader(path) as reader:
+            assert reader.collisions() == [{'step': 7, 'position': (5, 4), 'cars': [0, 1]}]
+            assert reader.state_at(6) == SimulationEngine(10, 10).run(cars)['positions']
+            assert [step for step, _ in reader.replay(4)] == [5, 6]
+            with pytest.raises(IndexError):
+                reader.changes(7)
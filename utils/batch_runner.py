@@ -0,0 +1,92 @@
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import wait
+from itertools import islice
+
+from entities.car import Car
+from entities.simulation_engine import SimulationEngine
+
+# Fields and results cross the process boundary as plain tuples, which pickle
+# far smaller than Field/Car objects:
+#   field  -> (width, height, ((name, x, y, direction, commands), ...))
+#   result -> (positions, ((step, position, car_indexes), ...))
+
+def pack_field(field):
+    """Pack a Field into a compact tuple for pickling"""
+    cars = tuple((car.name, car.x, car.y, car.direction, car.commands) for car in field.cars)
+    return field.width, field.height, cars
+
+def pack_result(result, cars):
+    """Pack an engine result, replacing collided cars with their indexes"""
+    index = {id(car): i for i, car in enumerate(cars)}
+    collisions = tuple(
+        (c['step'], c['position'], tuple(index[id(car)] for car in c['cars']))
+        for c in result['collisions']
+    )
+    return result['positions'], collisions
+
+def unpack_result(packed, cars):
+    """Rebuild an engine result dict against the caller's own cars"""
+    positions, collisions = packed
+    return {
+        'positions': positions,
+        'collisions': [
+            {'step': step, 'position': position, 'cars': [cars[i] for i in indexes]}
+            for step, position, indexes in collisions
+        ]
+    }
+
+def run_packed(engine_class, packed_fields):
+    """Worker entry point, simulate a chunk of packed fields"""
+    results = []
+    for width, height, packed_cars in packed_fields:
+        cars = [Car(*car) for car in packed_cars]
+        results.append(pack_result(engine_class(width, height).run(cars), cars))
+    return results
+
+def run_batch(fields, workers=None, chunk_size=64, ordered=True, engine_class=SimulationEngine):
+    """Simulate independent fields over a process pool
+
+    Lazily yields (index, result) pairs where index is the field's position in
+    fields and result is the engine's result dict. With ordered=False results
+    are yielded chunk by chunk as soon as they complete. Only a bounded number
+    of chunks is in flight, so fields may be a generator of any length.
+    """
+    workers = workers or os.cpu_count() or 1
+    fields = iter(fields)
+    pending = deque()
+    start = 0
+
+    def submit_chunk(executor):
+        nonlocal start
+        chunk = list(islice(fields, chunk_size))
+        if not chunk:
+            return False
+        future = executor.submit(run_packed, engine_class, [pack_field(f) for f in chunk])
+        pending.append((future, start, chunk))
+        start += len(chunk)
+        return True
+
+    def unpack_chunk(first, chunk, packed_results):
+        for offset, (field, packed) in enumerate(zip(chunk, packed_results)):
+            yield first + offset, unpack_result(packed, field.cars)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Keep every worker busy with one chunk queued behind it
+        while len(pending) < workers * 2 and submit_chunk(executor):
+            pass
+
+        while pending:
+            if ordered:
+                future, first, chunk = pending.popleft()
+                yield from unpack_chunk(first, chunk, future.result())
+            else:
+                done, _ = wait([p[0] for p in pending], return_when=FIRST_COMPLETED)
+                for item in [p for p in pending if p[0] in done]:
+                    pending.remove(item)
+                    future, first, chunk = item
+                    yield from unpack_chunk(first, chunk, future.result())
+            while len(pending) < workers * 2 and submit_chunk(executor):
+                pass
@@ -0,0 +1,110 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from entities.active_set_engine import ActiveSetEngine
+from utils import engine_dispatcher
+from utils.scenario_generator import generate_scenario
+from utils.scenario_stream import load_field
+
+# Every engine the dispatcher knows, plus the one that keeps going after collisions
+ENGINES = {**engine_dispatcher.ENGINES, 'active_set': ActiveSetEngine}
+
+# Size name -> generate_scenario keyword arguments
+# Lane scenarios never collide, so every engine runs all the steps
+SIZES = {
+    'small': {'width': 100, 'height': 100, 'car_count': 10, 'command_length': 100, 'lanes': True},
+    'medium': {'width': 1000, 'height': 1000, 'car_count': 1000, 'command_length': 500, 'lanes': True},
+    'large': {'width': 100000, 'height': 100000, 'car_count': 10000, 'command_length': 2000, 'lanes': True},
+    'crowded': {'width': 200, 'height': 200, 'car_count': 4000, 'command_length': 200, 'density': 0.1},
+}
+
+def simulated_steps(engine, result, cars):
+    if result['collisions'] and engine.stops_at_first_collision:
+        return result['collisions'][0]['step']
+    return max((len(car.commands) for car in cars), default=0)
+
+def measure(engine_class, field, repeat=3):
+    """Best wall time over repeat runs, then peak traced memory of one more run"""
+    engine = engine_class.from_field(field)
+    wall_time = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = engine.run(field.cars)
+        wall_time = min(wall_time, time.perf_counter() - start)
+
+    tracemalloc.start()
+    engine.run(field.cars)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    steps = simulated_steps(engine, result, field.cars)
+    return {
+        'cars': len(field.cars),
+        'steps': steps,
+        'wall_time': wall_time,
+        'steps_per_sec': steps / wall_time if wall_time else None,
+        'car_steps_per_sec': steps * len(field.cars) / wall_time if wall_time else None,
+        'peak_memory': peak_memory,
+    }
+
+def run_benchmarks(engines, sizes, seed=0, repeat=3):
+    """Benchmark every engine on the seeded scenario of every size"""
+    results = []
+    for size in sizes:
+        field = load_field(generate_scenario(seed, **SIZES[size]))
+        for name in engines:
+            results.append({'engine': name, 'size': size, **measure(ENGINES[name], field, repeat)})
+    return {
+        'environment': {'python': platform.python_version(), 'platform': platform.platform()},
+        'seed': seed,
+        'results': results,
+    }
+
+def compare(report, baseline, threshold=0.2):
+    """Messages for every result slower or bigger than the baseline by more than threshold"""
+    previous = {(r['engine'], r['size']): r for r in baseline['results']}
+    regressions = []
+    for result in report['results']:
+        base = previous.get((result['engine'], result['size']))
+        if base is None:
+            continue
+        for metric in ('wall_time', 'peak_memory'):
+            if base[metric] and result[metric] > base[metric] * (1 + threshold):
+                change = result[metric] / base[metric] - 1
+                regressions.append(f"{result['engine']} {result['size']}: {metric} {base[metric]:.6g} -> {result[metric]:.6g} (+{change:.0%})")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the simulation engines")
+    parser.add_argument('--engines', nargs='+', choices=sorted(ENGINES), default=sorted(ENGINES))
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=['small', 'medium'])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help="Write the JSON results to this file")
+    parser.add_argument('--baseline', help="JSON results to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Allowed slowdown, 0.2 means 20%%")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.engines, args.sizes, args.seed, args.repeat)
+    for r in report['results']:
+        print(f"{r['engine']:>12} {r['size']:>7}: {r['wall_time']:.4f}s, {r['steps']} steps, "
+              f"{r['car_steps_per_sec'] or 0:.0f} car-steps/s, {r['peak_memory'] / 1024:.0f} KiB peak")
+    if args.output:
+        with open(args.output, 'w') as out:
+            json.dump(report, out, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as stream:
+            regressions = compare(report, json.load(stream), args.threshold)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
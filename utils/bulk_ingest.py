@@ -0,0 +1,311 @@
+import mmap
+import struct
+
+import numpy as np
+
+from entities.car import Car
+from entities.vectorized_engine import VectorizedEngine
+from entities.vectorized_engine import encode_command_spans
+from utils.navigation import DIRECTIONS
+
+# Bulk scenario files hold one field and its cars, in one of two layouts.
+#
+# Text, like the interactive answers, fields separated by single spaces:
+#   width height
+#   name x y direction [commands]
+# so unlike at the prompts, names can't contain spaces; such fields need the
+# binary layout, which stores names as raw bytes.
+#
+# Binary, little endian, every array right after the previous one:
+#   header, name offsets (uint64, cars + 1), command offsets (uint64, cars + 1),
+#   x (uint32), y (uint32), direction index (uint8), name bytes, command bytes
+
+MAGIC = b'ADCS'
+VERSION = 1
+HEADER = struct.Struct('<4sHHQQQQQ')
+
+# Byte -> direction index, 255 for anything else
+DIRECTION_CODES = np.full(256, 255, dtype=np.uint8)
+for index, direction in enumerate(DIRECTIONS):
+    DIRECTION_CODES[ord(direction)] = DIRECTION_CODES[ord(direction.lower())] = index
+
+# Bytes allowed in commands, lowercase too since the prompts upper-case commands
+COMMAND_BYTES = np.zeros(256, dtype=bool)
+COMMAND_BYTES[list(b'FLRflr')] = True
+
+def gather_spans(data, starts, lengths):
+    """Copy the spans data[starts[i]:starts[i] + lengths[i]] into one buffer, with their offsets"""
+    offsets = np.zeros(len(lengths) + 1, dtype=np.uint64)
+    np.cumsum(lengths, out=offsets[1:])
+    within = np.arange(int(offsets[-1]), dtype=np.int64) - np.repeat(offsets[:-1].astype(np.int64), lengths)
+    return data[np.repeat(starts, lengths) + within], offsets
+
+def parse_integers(data, starts, ends):
+    """Decimal integers at data[starts[i]:ends[i]], and a mask of the ones that are not"""
+    negative = (ends > starts) & (data[np.minimum(starts, len(data) - 1)] == ord('-'))
+    starts = starts + negative
+    lengths = ends - starts
+    invalid = (lengths <= 0) | (lengths > 18)
+    values = np.zeros(len(starts), dtype=np.int64)
+    for j in range(int(lengths[~invalid].max(initial=0))):
+        has = (lengths > j) & ~invalid
+        digits = data[ends[has] - 1 - j].astype(np.int64) - ord('0')
+        bad = (digits < 0) | (digits > 9)
+        invalid[np.flatnonzero(has)[bad]] = True
+        values[has] += digits * 10 ** j
+    values[negative] *= -1
+    return values, invalid
+
+class BulkScenario:
+    """One field and its cars held as typed arrays, never as Car objects
+
+    xs, ys and dirs hold the starting states, with directions as indexes into
+    DIRECTIONS. Car i's name is name_data[name_starts[i]:][:name_lengths[i]]
+    and its commands are command_data[command_starts[i]:][:command_lengths[i]],
+    both usually slices of the memory-mapped file.
+    """
+
+    def __init__(self, width, height, xs, ys, dirs, name_data, name_starts, name_lengths,
+                 command_data, command_starts, command_lengths, buffer=None, lines=None):
+        self.width = width
+        self.height = height
+        self.xs = xs
+        self.ys = ys
+        self.dirs = dirs
+        self.name_data = name_data
+        self.name_starts = name_starts
+        self.name_lengths = name_lengths
+        self.command_data = command_data
+        self.command_starts = command_starts
+        self.command_lengths = command_lengths
+        # Memory map backing the arrays, closed by close()
+        self.buffer = buffer
+        # Line number of each car in a text file, for error messages
+        self.lines = lines
+
+    def __len__(self):
+        return len(self.xs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.xs = self.ys = self.dirs = self.name_data = self.command_data = None
+        if self.buffer is not None:
+            self.buffer.close()
+            self.buffer = None
+
+    def name(self, i):
+        start = int(self.name_starts[i])
+        return self.name_data[start:start + int(self.name_lengths[i])].tobytes().decode()
+
+    def commands(self, i):
+        start = int(self.command_starts[i])
+        return self.command_data[start:start + int(self.command_lengths[i])].tobytes().decode().upper()
+
+    def cars(self):
+        """Lazily build Car objects, for engines that need them"""
+        for i in range(len(self)):
+            yield Car(self.name(i), int(self.xs[i]), int(self.ys[i]), DIRECTIONS[self.dirs[i]], self.commands(i))
+
+    def where(self, i):
+        return f"Line {self.lines[i]}" if self.lines is not None else f"Car {i}"
+
+    def validate(self):
+        """Raise ValueError for the first car the interactive prompts would reject"""
+        checks = []
+
+        empty_names = np.flatnonzero(self.name_lengths == 0)
+        if len(empty_names):
+            checks.append((empty_names[0], "Name cannot be empty"))
+
+        duplicates = self.duplicate_names()
+        if len(duplicates):
+            checks.append((duplicates.min(), "A car with same name already exists"))
+
+        bad_directions = np.flatnonzero(self.dirs > 3)
+        if len(bad_directions):
+            checks.append((bad_directions[0], "Direction must be N, S, E, or W"))
+
+        outside = np.flatnonzero((self.xs < 0) | (self.ys < 0) | (self.xs >= self.width) | (self.ys >= self.height))
+        if len(outside):
+            checks.append((outside[0], f"Position must be within field border (0-{self.width-1}, 0-{self.height-1})"))
+
+        cells = self.xs.astype(np.int64) * self.height + self.ys
+        order = np.argsort(cells, kind='stable')
+        same = cells[order][1:] == cells[order][:-1]
+        if same.any():
+            i = order[1:][same].min()
+            checks.append((i, f"Position ({self.xs[i]},{self.ys[i]}) is already occupied by another car"))
+
+        bad_commands = self.invalid_commands()
+        if len(bad_commands):
+            checks.append((bad_commands.min(), "Commands can only be F, L, or R"))
+
+        if checks:
+            i, message = min(checks, key=lambda check: check[0])
+            raise ValueError(f"{self.where(i)}: {message}")
+
+    def duplicate_names(self):
+        """Indexes of cars whose name was already used by an earlier car"""
+        width = int(self.name_lengths.max(initial=1)) or 1
+        names, _ = gather_spans(self.name_data, self.name_starts, self.name_lengths)
+        padded = np.zeros((len(self), width), dtype=np.uint8)
+        rows = np.repeat(np.arange(len(self)), self.name_lengths)
+        offsets = np.cumsum(self.name_lengths) - self.name_lengths
+        padded[rows, np.arange(len(names)) - np.repeat(offsets, self.name_lengths)] = names
+        keys = padded.view(f'S{width}').ravel()
+        order = np.argsort(keys, kind='stable')
+        same = keys[order][1:] == keys[order][:-1]
+        return order[1:][same]
+
+    def invalid_commands(self):
+        """Indexes of cars with a byte other than F, L or R in their commands"""
+        bad_positions = np.flatnonzero(~COMMAND_BYTES[self.command_data])
+        if not len(bad_positions) or not len(self):
+            return bad_positions[:0]
+        order = np.argsort(self.command_starts, kind='stable')
+        starts = self.command_starts[order]
+        owners = np.searchsorted(starts, bad_positions, side='right') - 1
+        inside = owners >= 0
+        owners = order[owners[inside]]
+        inside_span = bad_positions[inside] < self.command_starts[owners] + self.command_lengths[owners]
+        return np.unique(owners[inside_span])
+
+    def run(self):
+        """Simulate on VectorizedEngine straight from the arrays
+
+        Returns the final 'xs', 'ys' and 'dirs' arrays and the 'collisions'
+        with car indexes as 'cars'.
+        """
+        commands = encode_command_spans(self.command_data, self.command_starts, self.command_lengths)
+        return VectorizedEngine(self.width, self.height).run_arrays(
+            self.xs.astype(np.int64), self.ys.astype(np.int64), self.dirs.astype(np.int64), commands
+        )
+
+def map_file(path):
+    with open(path, 'rb') as file:
+        try:
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise ValueError("Empty scenario file")
+
+def read_text(path, validate=True):
+    """Memory-map a text scenario file into a BulkScenario"""
+    buffer = map_file(path)
+    data = np.frombuffer(buffer, dtype=np.uint8)
+    newlines = np.flatnonzero(data == ord('\n'))
+    starts = np.r_[0, newlines + 1]
+    ends = np.r_[newlines, len(data)]
+    ends -= (ends > starts) & (data[np.maximum(ends - 1, 0)] == ord('\r'))
+    lines = np.flatnonzero(ends > starts)
+    starts, ends = starts[lines], ends[lines]
+    lines += 1
+
+    try:
+        width, height = (int(value) for value in data[starts[0]:ends[0]].tobytes().split())
+    except (IndexError, ValueError):
+        del data
+        buffer.close()
+        raise ValueError("Line 1: Please enter correct format")
+    if width <= 0 or height <= 0:
+        del data
+        buffer.close()
+        raise ValueError("Line 1: Width and height must be positive integers")
+    starts, ends, lines = starts[1:], ends[1:], lines[1:]
+
+    # Every car line has three or four single spaces between its fields
+    spaces = np.flatnonzero(data == ord(' '))
+    first = np.searchsorted(spaces, starts)
+    count = np.searchsorted(spaces, ends) - first
+    malformed = np.flatnonzero((count < 3) | (count > 4))
+    if len(malformed):
+        i = malformed[0]
+        message = "Please enter correct format"
+        if count[i] > 4:
+            message += ", names and commands can't contain spaces"
+        del data, spaces
+        buffer.close()
+        raise ValueError(f"Line {lines[i]}: {message}")
+    spaces = np.r_[spaces, len(data)]
+    name_end, x_end, y_end = spaces[first], spaces[first + 1], spaces[first + 2]
+    direction_end = np.where(count == 4, spaces[first + 3], ends)
+    command_starts = np.minimum(direction_end + 1, ends)
+
+    xs, bad_x = parse_integers(data, name_end + 1, x_end)
+    ys, bad_y = parse_integers(data, x_end + 1, y_end)
+    bad_direction = direction_end - y_end - 1 != 1
+    dirs = DIRECTION_CODES[data[np.minimum(y_end + 1, len(data) - 1)]]
+    dirs[bad_direction] = 255
+    bad = np.flatnonzero(bad_x | bad_y)
+    if len(bad):
+        del data, spaces
+        buffer.close()
+        raise ValueError(f"Line {lines[bad[0]]}: Invalid input format, should be like '1 2 N'")
+
+    scenario = BulkScenario(
+        width, height, xs, ys, dirs,
+        data, starts, name_end - starts,
+        data, command_starts, ends - command_starts,
+        buffer, lines
+    )
+    del data
+    if validate:
+        try:
+            scenario.validate()
+        except ValueError:
+            scenario.close()
+            raise
+    return scenario
+
+def read_binary(path, validate=True):
+    """Memory-map a binary scenario file into a BulkScenario, arrays are views of the file"""
+    buffer = map_file(path)
+    try:
+        magic, version, _, width, height, n, names_size, commands_size = HEADER.unpack_from(buffer, 0)
+    except struct.error:
+        magic = version = None
+    if magic != MAGIC or version != VERSION:
+        buffer.close()
+        raise ValueError("Not a binary scenario file")
+    if width <= 0 or height <= 0:
+        buffer.close()
+        raise ValueError("Width and height must be positive integers")
+
+    offset = HEADER.size
+    arrays = []
+    for dtype, count in ((np.uint64, n + 1), (np.uint64, n + 1), (np.uint32, n), (np.uint32, n),
+                         (np.uint8, n), (np.uint8, names_size), (np.uint8, commands_size)):
+        arrays.append(np.frombuffer(buffer, dtype=dtype, count=count, offset=offset))
+        offset += arrays[-1].nbytes
+    name_offsets, command_offsets, xs, ys, dirs, names, commands = arrays
+
+    scenario = BulkScenario(
+        width, height, xs, ys, dirs,
+        names, name_offsets[:-1].astype(np.int64), np.diff(name_offsets).astype(np.int64),
+        commands, command_offsets[:-1].astype(np.int64), np.diff(command_offsets).astype(np.int64),
+        buffer
+    )
+    del arrays, name_offsets, command_offsets, xs, ys, dirs, names, commands
+    if validate:
+        try:
+            scenario.validate()
+        except ValueError:
+            scenario.close()
+            raise
+    return scenario
+
+def write_binary(path, scenario):
+    """Write a BulkScenario in the binary layout"""
+    names, name_offsets = gather_spans(scenario.name_data, scenario.name_starts, scenario.name_lengths)
+    commands, command_offsets = gather_spans(scenario.command_data, scenario.command_starts, scenario.command_lengths)
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, 0, scenario.width, scenario.height, len(scenario),
+                               len(names), len(commands)))
+        for array, dtype in ((name_offsets, np.uint64), (command_offsets, np.uint64), (scenario.xs, np.uint32),
+                             (scenario.ys, np.uint32), (scenario.dirs, np.uint8), (names, np.uint8),
+                             (commands, np.uint8)):
+            np.asarray(array, dtype=dtype).tofile(file)
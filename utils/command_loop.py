@@ -0,0 +1,93 @@
+import re
+import sys
+from bisect import bisect_right
+
+# Commands with (body)*count loops, one level deep, e.g. 'FF(FFRFF)*1000000L'
+LOOP_SYNTAX = re.compile(r'(?:\([FLR]+\)\*[0-9]+|[FLR])*')
+SEGMENT_PATTERN = re.compile(r'\(([FLR]+)\)\*([0-9]+)|([FLR]+)')
+
+# len() of a CommandLoop has to fit in an index
+MAX_COMMANDS = sys.maxsize
+
+class CommandLoop:
+    """Commands with repeated parts stored as (body, count) segments, never expanded
+
+    Reads like the expanded command string: len() is the number of commands,
+    commands[step] the command of a step and iterating yields every command,
+    so engines stepping through commands run it unchanged. str() gives the
+    compact loop syntax back.
+    """
+
+    def __init__(self, segments):
+        self.segments = []
+        self.starts = []
+        self.length = 0
+        for body, count in segments:
+            if not body or not count:
+                continue
+            # Merge literal runs, so a literal segment always has count 1
+            if count == 1 and self.segments and self.segments[-1][1] == 1:
+                self.segments[-1] = (self.segments[-1][0] + body, 1)
+            else:
+                self.segments.append((body, count))
+                self.starts.append(self.length)
+            self.length += len(body) * count
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, step):
+        if not 0 <= step < self.length:
+            raise IndexError("command index out of range")
+        i = bisect_right(self.starts, step) - 1
+        body = self.segments[i][0]
+        return body[(step - self.starts[i]) % len(body)]
+
+    def __iter__(self):
+        for body, count in self.segments:
+            for _ in range(count):
+                yield from body
+
+    def __eq__(self, other):
+        if isinstance(other, CommandLoop):
+            return self.segments == other.segments
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(tuple(self.segments))
+
+    def __str__(self):
+        return ''.join(body if count == 1 else f"({body})*{count}" for body, count in self.segments)
+
+    def __repr__(self):
+        return f"CommandLoop({str(self)!r})"
+
+    def expand(self):
+        """The plain command string, for code that needs one"""
+        return ''.join(body * count for body, count in self.segments)
+
+def parse_commands(text):
+    """Parse commands, with optional (body)*count loops, raise ValueError with the error to show
+
+    Plain commands stay a string, commands with loops become a CommandLoop.
+    """
+    commands = text.upper()
+    if '(' not in commands or commands.strip('FLR()*0123456789'):
+        if commands.strip('FLR'):
+            raise ValueError("Commands can only be F, L, or R")
+        return commands
+    if not LOOP_SYNTAX.fullmatch(commands):
+        raise ValueError("Loops must be written as (commands)*count")
+    segments = []
+    length = 0
+    for match in SEGMENT_PATTERN.finditer(commands):
+        body, count, literal = match.groups()
+        # Compare digit counts first, so huge counts are never converted
+        if not literal and len(count.lstrip('0')) > len(str(MAX_COMMANDS)):
+            raise ValueError(f"Loops can repeat at most {MAX_COMMANDS} commands in total")
+        segment = (literal, 1) if literal else (body, int(count))
+        length += len(segment[0]) * segment[1]
+        if length > MAX_COMMANDS:
+            raise ValueError(f"Loops can repeat at most {MAX_COMMANDS} commands in total")
+        segments.append(segment)
+    return CommandLoop(segments)
@@ -0,0 +1,68 @@
+import re
+
+from utils.navigation import DX
+from utils.navigation import DY
+
+# Opcodes of a compiled program
+FORWARD, TURN = 0, 1
+
+# Anything but L/R moves forward, like run_simulation
+RUN_PATTERN = re.compile(r'[LR]+|[^LR]+')
+
+class CommandProgram:
+    """Command string compiled into run-length encoded ops
+
+    Each op is (opcode, first_command, count, rotation): a run of count
+    forward moves, or a run of count turns collapsed into its net rotation
+    in quarter turns to the right, so 'RRRR' is one op with rotation 0.
+    Directions are indexes into DIRECTIONS.
+    """
+
+    def __init__(self, commands):
+        self.commands = commands
+        self.length = len(commands)
+        self.ops = []
+        for match in RUN_PATTERN.finditer(commands):
+            run = match.group()
+            if run[0] in 'LR':
+                rotation = (run.count('R') - run.count('L')) & 3
+                self.ops.append((TURN, match.start(), len(run), rotation))
+            else:
+                self.ops.append((FORWARD, match.start(), len(run), 0))
+
+    def __len__(self):
+        return self.length
+
+def compile_commands(commands):
+    return CommandProgram(commands)
+
+def forward_room(x, y, direction, width, height):
+    """How many cells a car can move forward before reaching the border"""
+    if direction == 0:  # N
+        return height - 1 - y
+    if direction == 1:  # E
+        return width - 1 - x
+    if direction == 2:  # S
+        return y
+    return x  # W
+
+def advance(program, x, y, direction, steps, width, height):
+    """State (x, y, direction index) after the first steps commands of a program
+
+    Every op is applied in O(1): a forward run is clamped at the border in one
+    go, since moving along one axis can only be blocked at the end of it.
+    """
+    for opcode, first, count, rotation in program.ops:
+        if first >= steps:
+            break
+        taken = min(count, steps - first)
+        if opcode == TURN:
+            if taken < count:
+                run = program.commands[first:first + taken]
+                rotation = (run.count('R') - run.count('L')) & 3
+            direction = (direction + rotation) & 3
+        else:
+            moves = min(taken, forward_room(x, y, direction, width, height))
+            x += DX[direction] * moves
+            y += DY[direction] * moves
+    return x, y, direction
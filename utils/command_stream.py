@@ -0,0 +1,60 @@
+from itertools import islice
+
+# Commands pulled from a stream at once, so a car holds at most one chunk in memory
+CHUNK_SIZE = 4096
+
+class CommandStream:
+    """Commands of one car read lazily, a chunk at a time
+
+    Iterating yields the non-empty chunks of commands, validated and with
+    whitespace dropped, so a program of any length, a file or a live feed
+    only costs the memory of one chunk. A stream has no length and can be
+    read only once; close() releases a file it was reading from.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+
+    @classmethod
+    def from_iterable(cls, commands, chunk_size=CHUNK_SIZE):
+        """Stream of an iterable of commands, e.g. a generator of 'F', 'L' and 'R'"""
+        commands = iter(commands)
+        return cls(iter(lambda: "".join(islice(commands, chunk_size)), ""))
+
+    @classmethod
+    def from_file(cls, path, chunk_size=CHUNK_SIZE):
+        """Stream of the commands in a text file, read chunk_size characters at a time"""
+        def read_chunks():
+            with open(path) as file:
+                while True:
+                    chunk = file.read(chunk_size)
+                    if not chunk:
+                        return
+                    yield chunk
+        return cls(read_chunks())
+
+    @classmethod
+    def from_buffer(cls, buffer, chunk_size=CHUNK_SIZE):
+        """Stream of the ASCII commands in a bytes-like object, such as an mmap of a file"""
+        view = memoryview(buffer)
+        return cls(bytes(view[start:start + chunk_size]).decode('ascii') for start in range(0, len(view), chunk_size))
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        for chunk in self.chunks:
+            chunk = "".join(chunk.split())
+            if chunk.strip('FLR'):
+                raise ValueError("Commands can only be F, L, or R")
+            if chunk:
+                return chunk
+        raise StopIteration
+
+    def __str__(self):
+        return "<command stream>"
+
+    def close(self):
+        close = getattr(self.chunks, 'close', None)
+        if close is not None:
+            close()
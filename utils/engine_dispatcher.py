@@ -0,0 +1,212 @@
+import json
+import os
+import platform
+import time
+
+import numpy as np
+
+from entities.batched_engine import BatchedEngine
+from entities.broad_phase_engine import BroadPhaseEngine
+from entities.loop_engine import LoopEngine
+from entities.sharded_engine import ShardedEngine
+from entities.simulation_engine import SimulationEngine
+from entities.streaming_engine import StreamingEngine
+from entities.trajectory_engine import TrajectorySweepEngine
+from entities.vectorized_engine import VectorizedEngine
+from utils.command_loop import CommandLoop
+from utils.command_stream import CommandStream
+from utils.scenario_generator import generate_scenario
+from utils.scenario_stream import load_field
+
+# Engines that can be forced by name, every one gives SimulationEngine's result for plain command strings
+ENGINES = {
+    'simulation': SimulationEngine,
+    'vectorized': VectorizedEngine,
+    'trajectory': TrajectorySweepEngine,
+    'broad_phase': BroadPhaseEngine,
+    'loop': LoopEngine,
+    'sharded': ShardedEngine,
+    'batched': BatchedEngine,
+    'streaming': StreamingEngine,
+}
+
+# Engines that can run looped and streamed commands, other engines need command strings
+LOOP_ENGINES = ('simulation', 'loop', 'streaming')
+STREAM_ENGINES = ('streaming',)
+
+# Engines the cost model chooses between
+CANDIDATES = ('simulation', 'vectorized', 'trajectory', 'broad_phase')
+
+# Bump when the features or the calibration scenarios change, to recalibrate
+MODEL_VERSION = 3
+
+# Calibration scenarios: (car count, command length, field height), lanes one column per car
+CALIBRATION_SIZES = [
+    (cars, steps, height)
+    for cars in (10, 100, 600)
+    for steps in (20, 150)
+    for height in (50, 5000)
+]
+
+# Scenarios up to this many car steps take milliseconds on any engine, they
+# run on SimulationEngine without calibrating, so interactive use stays instant
+SMALL_CAR_STEPS = 10_000
+
+# The vectorized engine holds a (cars x steps) byte matrix of padded commands,
+# it is left out when that matrix would be bigger than this
+MATRIX_BUDGET = 1 << 30
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'auto_driving_car', 'engine_costs.json')
+
+def scenario_features(width, height, cars):
+    """Car count, longest command list, field area and density of a scenario
+
+    Streamed commands have no length, they count as no steps.
+    """
+    return {
+        'cars': len(cars),
+        'steps': max((len(car.commands) for car in cars if not isinstance(car.commands, CommandStream)), default=0),
+        'area': width * height,
+        'density': len(cars) / (width * height),
+    }
+
+def feature_vector(features):
+    """Terms of the linear cost model: fixed, per car, per step, per car step, per car step scaled by density"""
+    car_steps = features['cars'] * features['steps']
+    return [1.0, features['cars'], features['steps'], car_steps, car_steps * features['density']]
+
+def environment():
+    return {
+        'model': MODEL_VERSION,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'numpy': np.__version__,
+    }
+
+def fit_non_negative(rows, targets):
+    """Least squares coefficients that are all 0 or more
+
+    Terms fitted negative are dropped, the most negative first, and the rest
+    fitted again, so no term can push an estimate below the others' cost.
+    """
+    kept = list(range(rows.shape[1]))
+    coefficients = np.zeros(rows.shape[1])
+    while kept:
+        fitted = np.linalg.lstsq(rows[:, kept], targets, rcond=None)[0]
+        if (fitted >= 0).all():
+            coefficients[kept] = fitted
+            break
+        del kept[int(np.argmin(fitted))]
+    return coefficients
+
+def calibrate(engines=CANDIDATES, seed=0):
+    """Time each engine on the calibration scenarios and fit its cost model coefficients"""
+    fields = []
+    for cars, steps, height in CALIBRATION_SIZES:
+        scenario = generate_scenario(seed, cars * 2, height, cars, steps, lanes=True)
+        fields.append(load_field(scenario))
+
+    coefficients = {}
+    for name in engines:
+        rows = []
+        times = []
+        for field in fields:
+            engine = ENGINES[name].from_field(field)
+            start = time.perf_counter()
+            engine.run(field.cars)
+            times.append(time.perf_counter() - start)
+            rows.append(feature_vector(scenario_features(field.width, field.height, field.cars)))
+        # Fit relative errors, so small scenarios count as much as big ones
+        weights = 1 / np.maximum(times, 1e-9)
+        rows = np.array(rows) * weights[:, np.newaxis]
+        coefficients[name] = fit_non_negative(rows, np.ones(len(times))).tolist()
+    return coefficients
+
+class EngineDispatcher:
+    """Pick the engine expected to simulate a scenario the fastest
+
+    Estimates come from a linear cost model per engine, calibrated once by
+    timing every candidate on a few generated scenarios and cached on disk
+    per Python, machine and NumPy version. override (or the
+    AUTO_DRIVING_CAR_ENGINE environment variable) forces an engine by name.
+    Every choice comes with a report of the engine, the reason and the
+    estimates it was based on.
+    """
+
+    def __init__(self, cache_path=None, override=None):
+        self.cache_path = cache_path or os.environ.get('AUTO_DRIVING_CAR_CALIBRATION') or DEFAULT_CACHE_PATH
+        self.override = override or os.environ.get('AUTO_DRIVING_CAR_ENGINE') or None
+        if self.override is not None and self.override != 'auto' and self.override not in ENGINES:
+            raise ValueError(f"Unknown engine: {self.override}, expected one of {', '.join(['auto', *ENGINES])}")
+        self.coefficients = None
+
+    def load_coefficients(self):
+        """Cached coefficients if calibrated in this environment, else calibrate and cache them"""
+        if self.coefficients is not None:
+            return self.coefficients
+        try:
+            with open(self.cache_path) as file:
+                cached = json.load(file)
+            if cached.get('environment') == environment() and set(cached['coefficients']) >= set(CANDIDATES):
+                self.coefficients = cached['coefficients']
+                return self.coefficients
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+        self.coefficients = calibrate()
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+            with open(self.cache_path, 'w') as file:
+                json.dump({'environment': environment(), 'coefficients': self.coefficients}, file, indent=2)
+        except OSError:
+            pass
+        return self.coefficients
+
+    def estimate(self, features):
+        """Estimated seconds per candidate engine"""
+        vector = feature_vector(features)
+        return {
+            name: max(sum(c * v for c, v in zip(coefficients, vector)), 1e-9)
+            for name, coefficients in self.load_coefficients().items()
+            if name in CANDIDATES
+        }
+
+    def choose(self, width, height, cars):
+        """Engine class for the scenario and the report of why it was chosen"""
+        features = scenario_features(width, height, cars)
+        report = {'features': features, 'estimates': None}
+        looped = any(isinstance(car.commands, CommandLoop) for car in cars)
+        streamed = any(isinstance(car.commands, CommandStream) for car in cars)
+        forced = self.override not in (None, 'auto')
+        if forced and streamed and self.override not in STREAM_ENGINES:
+            name, reason = 'streaming', f"{self.override} can't read streamed commands, falling back to streaming"
+        elif forced and looped and self.override not in LOOP_ENGINES:
+            name, reason = 'loop', f"{self.override} can't run looped commands, falling back to loop"
+        elif forced:
+            name, reason = self.override, "forced by override"
+        elif streamed:
+            name, reason = 'streaming', "streamed commands are only read a chunk at a time by StreamingEngine"
+        elif looped:
+            name, reason = 'loop', "looped commands are only skipped over by LoopEngine"
+        elif features['cars'] * features['steps'] <= SMALL_CAR_STEPS:
+            name, reason = 'simulation', f"{features['cars']} cars x {features['steps']} steps is too small to be worth calibrating"
+        else:
+            estimates = self.estimate(features)
+            if features['cars'] * features['steps'] > MATRIX_BUDGET:
+                estimates.pop('vectorized', None)
+            ranking = sorted(estimates, key=estimates.get)
+            name = ranking[0]
+            reason = (
+                f"{name} has the lowest estimated time {estimates[name]:.3g}s for {features['cars']} cars x "
+                f"{features['steps']} steps on {features['area']} cells (density {features['density']:.3g})"
+            )
+            if len(ranking) > 1:
+                reason += f", next {ranking[1]} at {estimates[ranking[1]]:.3g}s"
+            report['estimates'] = estimates
+        report.update(engine=name, reason=reason)
+        return ENGINES[name], report
+
+    def engine_for(self, field):
+        """Engine instance for a Field, and the report"""
+        engine_class, report = self.choose(field.width, field.height, field.cars)
+        return engine_class.from_field(field), report
@@ -2,10 +2,17 @@
 DIRECTIONS = ['N', 'E', 'S', 'W']
 DELTA = {'N': (0, 1), 'S': (0, -1), 'E': (1, 0), 'W': (-1, 0)}
 
+# Precomputed rotations, so turning needs no DIRECTIONS.index() lookup
+RIGHT_OF = {d: DIRECTIONS[(i + 1) % 4] for i, d in enumerate(DIRECTIONS)}
+LEFT_OF = {d: DIRECTIONS[(i - 1) % 4] for i, d in enumerate(DIRECTIONS)}
+
+# Tables on direction indexes (into DIRECTIONS) for compiled programs
+DIRECTION_INDEX = {d: i for i, d in enumerate(DIRECTIONS)}
+DX = [DELTA[d][0] for d in DIRECTIONS]
+DY = [DELTA[d][1] for d in DIRECTIONS]
+
 def turn(current_dir, command):
-    idx = DIRECTIONS.index(current_dir)
     if command == 'R':
-        return DIRECTIONS[(idx + 1) % 4]
+        return RIGHT_OF[current_dir]
     else:  # 'L'
-        return DIRECTIONS[(idx - 1) % 4]
-    
\ No newline at end of file
+        return LEFT_OF[current_dir]
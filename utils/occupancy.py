@@ -0,0 +1,106 @@
+import numpy as np
+
+# A dense grid costs memory and time per cell, so it is only used on fields
+# up to DENSE_MAX_CELLS cells with at most DENSE_MAX_CELLS_PER_CAR cells per
+# car, beyond that hashing the occupied cells is cheaper. Tiny fields always get a grid.
+DENSE_MAX_CELLS = 1 << 24
+DENSE_MAX_CELLS_PER_CAR = 4
+DENSE_MIN_CELLS = 4096
+
+def prefers_dense(width, height, car_count):
+    area = width * height
+    return area <= DENSE_MIN_CELLS or (area <= DENSE_MAX_CELLS and area <= car_count * DENSE_MAX_CELLS_PER_CAR)
+
+def make_occupancy(width, height, car_count):
+    """Occupancy backend suited to the field size and number of cars"""
+    if prefers_dense(width, height, car_count):
+        return DenseOccupancy(width, height)
+    return SparseOccupancy(width, height)
+
+def has_shared_cell(cells):
+    """Whether two cars share a cell, given an array of linear cell indexes
+
+    Sorts the cars' cells, O(cars log cars) whatever the size of the field.
+    """
+    if len(cells) < 2:
+        return False
+    sorted_cells = np.sort(cells)
+    return bool((sorted_cells[1:] == sorted_cells[:-1]).any())
+
+class SparseOccupancy:
+    """Occupied (x, y) cells -> car index in a hash, memory grows with cars only"""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.cells = {}
+
+    def __contains__(self, cell):
+        return cell in self.cells
+
+    def __getitem__(self, cell):
+        return self.cells[cell]
+
+    def __setitem__(self, cell, index):
+        x, y = cell
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            raise ValueError(f"Position ({cell[0]},{cell[1]}) is outside the field")
+        self.cells[cell] = index
+
+    def __len__(self):
+        return len(self.cells)
+
+    def get(self, cell, default=None):
+        return self.cells.get(cell, default)
+
+    def items(self):
+        return self.cells.items()
+
+class DenseOccupancy:
+    """Occupied (x, y) cells -> car index in a grid, for small busy fields"""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.grid = np.full(width * height, -1, dtype=np.int32)
+        self.count = 0
+
+    def offset(self, cell):
+        """Grid offset of a cell, None outside the field"""
+        x, y = cell
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return x * self.height + y
+        return None
+
+    def __contains__(self, cell):
+        offset = self.offset(cell)
+        return offset is not None and bool(self.grid[offset] >= 0)
+
+    def __getitem__(self, cell):
+        index = self.get(cell)
+        if index is None:
+            raise KeyError(cell)
+        return index
+
+    def __setitem__(self, cell, index):
+        offset = self.offset(cell)
+        if offset is None:
+            raise ValueError(f"Position ({cell[0]},{cell[1]}) is outside the field")
+        if self.grid[offset] < 0:
+            self.count += 1
+        self.grid[offset] = index
+
+    def __len__(self):
+        return self.count
+
+    def get(self, cell, default=None):
+        offset = self.offset(cell)
+        if offset is None:
+            return default
+        index = int(self.grid[offset])
+        return default if index < 0 else index
+
+    def items(self):
+        occupied = np.flatnonzero(self.grid >= 0)
+        for cell, index in zip(occupied.tolist(), self.grid[occupied].tolist()):
+            yield divmod(cell, self.height), index
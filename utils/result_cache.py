@@ -0,0 +1,173 @@
+import hashlib
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from utils.command_stream import CommandStream
+
+# Results are cached in a canonical form that does not depend on car names or
+# on the order cars were added in: cars are sorted by their starting state, and
+# results store positions in that order and collided cars as canonical indexes.
+# Engines report collisions by step, then by the lowest index of the cars
+# involved, so mapping the indexes back and sorting again restores the exact
+# result of the caller's order.
+
+def canonical_order(cars):
+    """Car indexes sorted by starting cell, direction and commands"""
+    return sorted(range(len(cars)), key=lambda i: (cars[i].x, cars[i].y, cars[i].direction, str(cars[i].commands)))
+
+def scenario_key(width, height, cars, order, mode='first'):
+    """Hex digest of the field dimensions and the cars in canonical order
+
+    mode tells results of engines stopping at the first collision ('first')
+    from ones reporting all of them ('all').
+    """
+    digest = hashlib.sha256(f"{mode}:{width}x{height}".encode())
+    for i in order:
+        car = cars[i]
+        digest.update(f";{car.x},{car.y},{car.direction},{car.commands}".encode())
+    return digest.hexdigest()
+
+def pack_canonical(result, cars, order):
+    """Engine result with positions in canonical order and cars as canonical indexes"""
+    canonical_index = {id(cars[i]): k for k, i in enumerate(order)}
+    positions = tuple(result['positions'][i] for i in order)
+    collisions = tuple(
+        (c['step'], c['position'], tuple(canonical_index[id(car)] for car in c['cars']))
+        for c in result['collisions']
+    )
+    return positions, collisions
+
+def unpack_canonical(packed, cars, order):
+    """Rebuild an engine result dict for the caller's cars from a canonical one"""
+    canonical_positions, canonical_collisions = packed
+    positions = [None] * len(cars)
+    for k, i in enumerate(order):
+        positions[i] = tuple(canonical_positions[k])
+    collisions = []
+    for step, position, indexes in canonical_collisions:
+        collisions.append((step, sorted(order[k] for k in indexes), tuple(position)))
+    collisions.sort()
+    return {
+        'positions': positions,
+        'collisions': [
+            {'step': step, 'position': position, 'cars': [cars[i] for i in indexes]}
+            for step, indexes, position in collisions
+        ]
+    }
+
+class ResultCache:
+    """Simulation results memoized by canonical scenario hash
+
+    An in-memory LRU tier holds JSON encoded results up to max_bytes; with a path,
+    an sqlite database is a second tier shared by every process using it.
+    Memory misses found on disk are promoted to memory. stats() reports hits
+    and misses per tier. Results are stored as JSON rather than pickles, so a
+    tampered cache file can't run code, and unreadable entries are evicted and run again.
+    """
+
+    def __init__(self, max_bytes=64 << 20, path=None):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.stats_counts = {'hits': 0, 'misses': 0, 'memory_hits': 0, 'disk_hits': 0, 'evictions': 0}
+        self.db = None
+        if path is not None:
+            self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value BLOB NOT NULL)")
+            self.db.commit()
+
+    def get(self, key, decode=bytes):
+        """Result stored under key, passed through decode, or None
+
+        Entries decode can't read are evicted from both tiers and count as misses.
+        """
+        with self.lock:
+            value = self.entries.get(key)
+            tier = 'memory_hits'
+            if value is None and self.db is not None:
+                row = self.db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    value = bytes(row[0])
+                    tier = 'disk_hits'
+            if value is not None:
+                try:
+                    decoded = decode(value)
+                except (ValueError, TypeError, IndexError, KeyError):
+                    self.discard(key)
+                else:
+                    if tier == 'memory_hits':
+                        self.entries.move_to_end(key)
+                    else:
+                        self.remember(key, value)
+                    self.stats_counts['hits'] += 1
+                    self.stats_counts[tier] += 1
+                    return decoded
+            self.stats_counts['misses'] += 1
+            return None
+
+    def put(self, key, value):
+        """Store an encoded result in memory and, if enabled, on disk"""
+        with self.lock:
+            self.remember(key, value)
+            if self.db is not None:
+                self.db.execute("INSERT OR REPLACE INTO results (key, value) VALUES (?, ?)", (key, value))
+                self.db.commit()
+
+    def remember(self, key, value):
+        """Insert into the LRU tier, evicting the least recently used entries over max_bytes"""
+        if key in self.entries:
+            self.size -= len(self.entries.pop(key))
+        if len(value) > self.max_bytes:
+            return
+        self.entries[key] = value
+        self.size += len(value)
+        while self.size > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted)
+            self.stats_counts['evictions'] += 1
+
+    def discard(self, key):
+        """Drop an entry from memory and disk"""
+        if key in self.entries:
+            self.size -= len(self.entries.pop(key))
+        if self.db is not None:
+            self.db.execute("DELETE FROM results WHERE key = ?", (key,))
+            self.db.commit()
+
+    def simulate(self, engine, cars):
+        """engine.run(cars), answered from the cache when the scenario was seen before
+
+        Streamed commands can't be hashed without reading them, such scenarios
+        are always run.
+        """
+        if any(isinstance(car.commands, CommandStream) for car in cars):
+            return engine.run(cars)
+        order = canonical_order(cars)
+        mode = 'first' if engine.stops_at_first_collision else 'all'
+        key = scenario_key(engine.width, engine.height, cars, order, mode)
+        cached = self.get(key, lambda value: unpack_canonical(json.loads(value), cars, order))
+        if cached is not None:
+            return cached
+        result = engine.run(cars)
+        self.put(key, json.dumps(pack_canonical(result, cars, order), separators=(',', ':')).encode())
+        return result
+
+    def stats(self):
+        """Hit and miss counts, hit rate and memory tier usage"""
+        with self.lock:
+            lookups = self.stats_counts['hits'] + self.stats_counts['misses']
+            return {
+                **self.stats_counts,
+                'hit_rate': self.stats_counts['hits'] / lookups if lookups else 0.0,
+                'entries': len(self.entries),
+                'bytes': self.size,
+            }
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
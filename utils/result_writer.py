@@ -0,0 +1,157 @@
+import csv
+import shutil
+import tempfile
+import zipfile
+from itertools import islice
+
+import numpy as np
+
+from entities.simulation_engine import SimulationEngine
+from utils.navigation import DIRECTION_INDEX
+
+# Rows are written this many at a time
+CHUNK_SIZE = 65536
+
+# Column headers of the exported tables, the NumPy columns are prefixed with the table name
+STATE_COLUMNS = ('name', 'x', 'y', 'direction')
+COLLISION_COLUMNS = ('step', 'x', 'y', 'car')
+TRACE_COLUMNS = ('step', 'car', 'x', 'y', 'direction')
+
+def chunks(rows, chunk_size=CHUNK_SIZE):
+    """Split an iterable of rows into lists of at most chunk_size rows"""
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def state_rows(cars):
+    """One (name, x, y, direction) row per car"""
+    for car in cars:
+        yield car.name, car.x, car.y, car.direction
+
+def collision_rows(collisions):
+    """One (step, x, y, car name) row per car of each collision"""
+    for collision in collisions:
+        x, y = collision['position']
+        for car in collision['cars']:
+            yield collision['step'], x, y, car.name
+
+def trace_rows(cars, width, height):
+    """(step, car name, x, y, direction) rows, every car at step 0 then each change
+
+    Simulates from the cars' current states, so pass the cars before the
+    simulation. The trace stops at the first collision like the simulation.
+    """
+    for car in cars:
+        yield 0, car.name, car.x, car.y, car.direction
+    for step in SimulationEngine(width, height).trace(cars):
+        for i, x, y, direction in step['changes']:
+            yield step['step'], cars[i].name, x, y, direction
+
+def write_csv(file, header, rows, chunk_size=CHUNK_SIZE):
+    """Write a header and the rows to a text file, chunk_size rows at a time"""
+    writer = csv.writer(file, lineterminator='\n')
+    writer.writerow(header)
+    for chunk in chunks(rows, chunk_size):
+        writer.writerows(chunk)
+
+def write_npz(path, tables, chunk_size=CHUNK_SIZE):
+    """Write tables of rows as one .npy column per table column into an .npz archive
+
+    tables maps a table name to (columns, rows) with columns a list of
+    (column name, dtype). The archive holds '<table>_<column>' arrays that
+    numpy.load reads back. Rows are converted chunk_size at a time and
+    spooled to temporary files, so only one chunk is ever in memory.
+    """
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for table, (columns, rows) in tables.items():
+            spools = [tempfile.TemporaryFile() for _ in columns]
+            try:
+                count = 0
+                for chunk in chunks(rows, chunk_size):
+                    count += len(chunk)
+                    for (_, dtype), spool, values in zip(columns, spools, zip(*chunk)):
+                        spool.write(np.asarray(values, dtype=dtype).tobytes())
+                for (column, dtype), spool in zip(columns, spools):
+                    header = {
+                        'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)),
+                        'fortran_order': False,
+                        'shape': (count,),
+                    }
+                    spool.seek(0)
+                    with archive.open(f"{table}_{column}.npy", 'w', force_zip64=True) as member:
+                        np.lib.format.write_array_header_1_0(member, header)
+                        shutil.copyfileobj(spool, member)
+            finally:
+                for spool in spools:
+                    spool.close()
+
+def numeric_rows(rows, car_indexes, car_position=None, direction_position=None):
+    """Replace car names by car indexes and directions by direction indexes"""
+    for row in rows:
+        row = list(row)
+        if car_position is not None:
+            row[car_position] = car_indexes[row[car_position]]
+        if direction_position is not None:
+            row[direction_position] = DIRECTION_INDEX[row[direction_position]]
+        yield row
+
+def export_results(field, prefix, format='csv', initial_cars=None, chunk_size=CHUNK_SIZE):
+    """Export a simulated field's final states, collisions and optional trace
+
+    CSV writes '<prefix>_states.csv', '<prefix>_collisions.csv' and, when
+    initial_cars (the cars before the simulation) are given,
+    '<prefix>_trace.csv'. 'npz' writes all tables into '<prefix>.npz' with
+    directions as indexes into DIRECTIONS and cars as indexes into
+    'states_name'. Returns the written paths.
+    """
+    if format == 'csv':
+        paths = [f"{prefix}_states.csv", f"{prefix}_collisions.csv"]
+        with open(paths[0], 'w', newline='') as file:
+            write_csv(file, STATE_COLUMNS, state_rows(field.cars), chunk_size)
+        with open(paths[1], 'w', newline='') as file:
+            write_csv(file, COLLISION_COLUMNS, collision_rows(field.collisions), chunk_size)
+        if initial_cars is not None:
+            paths.append(f"{prefix}_trace.csv")
+            with open(paths[2], 'w', newline='') as file:
+                write_csv(file, TRACE_COLUMNS, trace_rows(initial_cars, field.width, field.height), chunk_size)
+        return paths
+
+    if format != 'npz':
+        raise ValueError(f"Unknown export format: {format}")
+    car_indexes = {car.name: i for i, car in enumerate(field.cars)}
+    name_width = max((len(car.name) for car in field.cars), default=1)
+    tables = {
+        'states': (
+            [('name', f'U{name_width}'), ('x', np.int64), ('y', np.int64), ('direction', np.uint8)],
+            numeric_rows(state_rows(field.cars), car_indexes, direction_position=3)
+        ),
+        'collisions': (
+            [('step', np.int64), ('x', np.int64), ('y', np.int64), ('car', np.int64)],
+            numeric_rows(collision_rows(field.collisions), car_indexes, 3)
+        ),
+    }
+    if initial_cars is not None:
+        tables['trace'] = (
+            [('step', np.int64), ('car', np.int64), ('x', np.int64), ('y', np.int64), ('direction', np.uint8)],
+            numeric_rows(trace_rows(initial_cars, field.width, field.height), car_indexes, 1, 4)
+        )
+    path = f"{prefix}.npz"
+    write_npz(path, tables, chunk_size)
+    return [path]
+
+def limit_lines(lines, max_lines=None):
+    """The first max_lines lines, then a line counting the ones left out"""
+    if max_lines is None:
+        yield from lines
+        return
+    hidden = 0
+    for i, line in enumerate(lines):
+        if i < max_lines:
+            yield line
+        else:
+            hidden += 1
+    if hidden:
+        yield f"... and {hidden} more"
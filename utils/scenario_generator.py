@@ -0,0 +1,47 @@
+import random
+
+from utils.navigation import DIRECTIONS
+
+def generate_scenario(seed, width, height, car_count, command_length, density=None, turn_ratio=0.3, lanes=False):
+    """Seeded random scenario dict, in the JSONL scenario format
+
+    Cars get distinct cells and command_length commands each, of which about
+    turn_ratio are turns. With a density, the cars are packed into a corner
+    region of the field holding that fraction of cars per cell, otherwise
+    they are spread over the whole field. With lanes, every car drives up and
+    down its own column, turning around with RR/LL, so no car ever collides.
+    """
+    rng = random.Random(seed)
+    if lanes:
+        return generate_lanes(rng, seed, width, height, car_count, command_length, turn_ratio)
+    if density:
+        side = max(1, int((car_count / density) ** 0.5))
+        region_width, region_height = min(width, side), min(height, side)
+    else:
+        region_width, region_height = width, height
+    if car_count > region_width * region_height:
+        raise ValueError("Too many cars for the field")
+
+    cars = []
+    for i, cell in enumerate(rng.sample(range(region_width * region_height), car_count)):
+        x, y = divmod(cell, region_height)
+        commands = ''.join(
+            rng.choice('LR') if rng.random() < turn_ratio else 'F'
+            for _ in range(command_length)
+        )
+        cars.append({'name': f"C{i}", 'x': x, 'y': y, 'direction': rng.choice(DIRECTIONS), 'commands': commands})
+    return {'id': seed, 'width': width, 'height': height, 'cars': cars}
+
+def generate_lanes(rng, seed, width, height, car_count, command_length, turn_ratio):
+    if car_count > width:
+        raise ValueError("Too many cars for the field")
+    cars = []
+    for i, x in enumerate(rng.sample(range(width), car_count)):
+        commands = ''
+        while len(commands) < command_length:
+            if rng.random() < turn_ratio and len(commands) + 2 <= command_length:
+                commands += rng.choice(('RR', 'LL'))
+            else:
+                commands += 'F'
+        cars.append({'name': f"C{i}", 'x': x, 'y': rng.randrange(height), 'direction': rng.choice('NS'), 'commands': commands})
+    return {'id': seed, 'width': width, 'height': height, 'cars': cars}
@@ -0,0 +1,107 @@
+import argparse
+import json
+import sys
+
+from entities.field import Field
+from entities.loop_engine import LoopEngine
+from entities.simulation_engine import SimulationEngine
+from utils.command_loop import parse_commands
+from utils.result_cache import ResultCache
+
+# A scenario is one JSON object per line:
+# {"id": "s1", "width": 10, "height": 10,
+#  "cars": [{"name": "A", "x": 1, "y": 2, "direction": "N", "commands": "FFRFFFFRRL"}]}
+
+def load_field(scenario):
+    """Build a Field from a scenario dict, validated like the interactive prompts"""
+    width, height = int(scenario['width']), int(scenario['height'])
+    if width <= 0 or height <= 0:
+        raise ValueError("Width and height must be positive integers")
+
+    field = Field(width, height)
+    field.add_cars(
+        (
+            str(car['name']).strip(),
+            int(car['x']),
+            int(car['y']),
+            str(car['direction']).upper(),
+            parse_commands(str(car.get('commands', '')))
+        )
+        for car in scenario.get('cars', ())
+    )
+    return field
+
+def dump_field(field):
+    """Scenario dict of a Field, the inverse of load_field"""
+    return {
+        'width': field.width,
+        'height': field.height,
+        'cars': [
+            {'name': car.name, 'x': car.x, 'y': car.y, 'direction': car.direction, 'commands': str(car.commands)}
+            for car in field.cars
+        ]
+    }
+
+def run_scenario(scenario, cache=None):
+    """Simulate one scenario dict and return a JSON-ready result dict
+
+    With a ResultCache, scenarios simulated before are answered from it.
+    """
+    if not isinstance(scenario, dict):
+        return {'id': None, 'error': "Scenario must be a JSON object"}
+    result = {'id': scenario.get('id')}
+    try:
+        field = load_field(scenario)
+    except (KeyError, TypeError, ValueError) as e:
+        result['error'] = str(e)
+        return result
+
+    engine_class = LoopEngine if field.has_loops else SimulationEngine
+    engine = engine_class.from_field(field)
+    outcome = cache.simulate(engine, field.cars) if cache is not None else engine.run(field.cars)
+    result['cars'] = [
+        {'name': car.name, 'x': x, 'y': y, 'direction': direction}
+        for car, (x, y, direction) in zip(field.cars, outcome['positions'])
+    ]
+    result['collisions'] = [
+        {
+            'step': collision['step'],
+            'position': list(collision['position']),
+            'cars': [car.name for car in collision['cars']]
+        }
+        for collision in outcome['collisions']
+    ]
+    return result
+
+def run_scenarios(stream, cache=None):
+    """Lazily yield one result dict per scenario line of the stream, skipping blank lines"""
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            scenario = json.loads(line)
+        except ValueError:
+            yield {'id': None, 'error': "Invalid JSON"}
+            continue
+        yield run_scenario(scenario, cache)
+
+def write_results(stream, out, cache=None):
+    """Run every scenario line of the stream and write one JSON result line each"""
+    for result in run_scenarios(stream, cache):
+        out.write(json.dumps(result, separators=(',', ':')) + '\n')
+
+def stream_results(source, out, cache=None):
+    """Run a JSONL scenario file path ('-' for stdin) and write JSONL results"""
+    if source == '-':
+        write_results(sys.stdin, out, cache)
+        return
+    with open(source) as stream:
+        write_results(stream, out, cache)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate JSONL scenarios into JSONL results")
+    parser.add_argument('source', nargs='?', default='-', help="Scenario file, '-' for stdin")
+    parser.add_argument('--cache', metavar='FILE', help="sqlite file of results to reuse across runs")
+    args = parser.parse_args()
+    cache = ResultCache(path=args.cache) if args.cache else None
+    stream_results(args.source, sys.stdout, cache)
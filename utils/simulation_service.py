@@ -0,0 +1,227 @@
+import argparse
+import asyncio
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.scenario_stream import run_scenario
+
+# Newline-delimited JSON over TCP on localhost: clients send one scenario per
+# line, in the JSONL scenario format, and get one result line per scenario as
+# soon as it is done, in completion order. Results carry the scenario's id.
+
+# Longest accepted request line, without its newline
+LINE_LIMIT = 1 << 26
+
+def run_scenario_batch(scenarios):
+    """Worker entry point, simulate a batch of scenario dicts"""
+    return [run_scenario(scenario) for scenario in scenarios]
+
+async def read_request_line(reader):
+    """Next request line, b'' at the end of the stream, None for a line over the limit
+
+    Lines over the limit are skipped up to their newline, which may not have
+    arrived yet, so the next request is read from its start.
+    """
+    try:
+        return await reader.readuntil(b'\n')
+    except asyncio.IncompleteReadError as e:
+        return e.partial
+    except asyncio.LimitOverrunError as e:
+        consumed = e.consumed
+    while True:
+        try:
+            await reader.readexactly(consumed)
+            await reader.readuntil(b'\n')
+            return None
+        except asyncio.IncompleteReadError:
+            return None
+        except asyncio.LimitOverrunError as e:
+            consumed = e.consumed
+
+class SimulationService:
+    """Asyncio simulation server offloading batches of scenarios to a process pool
+
+    Requests from every connection go through one bounded queue and are
+    grouped into batches of up to batch_size, waiting at most batch_delay
+    seconds for a batch to fill. At most two batches per worker are in
+    flight; once those and the queue are full, connections stop being read,
+    which pushes back on the clients through TCP.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, workers=None, batch_size=64, batch_delay=0.005,
+                 max_pending=10000, max_in_flight_per_connection=1000, executor=None):
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.max_pending = max_pending
+        self.max_in_flight_per_connection = max_in_flight_per_connection
+        self.executor = executor
+        self.owns_executor = executor is None
+        self.server = None
+
+    async def start(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self.queue = asyncio.Queue(self.max_pending)
+        self.batch_slots = asyncio.Semaphore(self.workers * 2)
+        self.batch_tasks = set()
+        self.batcher = asyncio.create_task(self.run_batches())
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port, limit=LINE_LIMIT)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+        self.batcher.cancel()
+        for task in list(self.batch_tasks):
+            task.cancel()
+        if self.owns_executor:
+            self.executor.shutdown(cancel_futures=True)
+
+    async def handle_connection(self, reader, writer):
+        write_lock = asyncio.Lock()
+        in_flight = asyncio.Semaphore(self.max_in_flight_per_connection)
+        responses = set()
+
+        async def respond(result):
+            async with write_lock:
+                writer.write(json.dumps(result, separators=(',', ':')).encode() + b'\n')
+                await writer.drain()
+
+        async def respond_when_done(future):
+            try:
+                await respond(await future)
+            finally:
+                in_flight.release()
+
+        try:
+            while True:
+                line = await read_request_line(reader)
+                if line is None:
+                    await respond({'id': None, 'error': f"Request lines can be at most {LINE_LIMIT} bytes"})
+                    continue
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    scenario = json.loads(line)
+                except ValueError:
+                    await respond({'id': None, 'error': "Invalid JSON"})
+                    continue
+                if not isinstance(scenario, dict):
+                    await respond({'id': None, 'error': "Scenario must be a JSON object"})
+                    continue
+
+                await in_flight.acquire()
+                future = asyncio.get_running_loop().create_future()
+                await self.queue.put((scenario, future))
+                task = asyncio.create_task(respond_when_done(future))
+                responses.add(task)
+                task.add_done_callback(responses.discard)
+
+            if responses:
+                await asyncio.gather(*responses, return_exceptions=True)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def run_batches(self):
+        """Group queued requests into batches and hand them to the workers"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.batch_delay
+            while len(batch) < self.batch_size:
+                if not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            await self.batch_slots.acquire()
+            task = asyncio.create_task(self.run_batch(batch))
+            self.batch_tasks.add(task)
+            task.add_done_callback(self.batch_tasks.discard)
+
+    async def run_batch(self, batch):
+        try:
+            scenarios = [scenario for scenario, _ in batch]
+            results = await asyncio.get_running_loop().run_in_executor(self.executor, run_scenario_batch, scenarios)
+        except Exception as e:
+            for scenario, future in batch:
+                if not future.done():
+                    future.set_result({'id': scenario.get('id'), 'error': f"Simulation failed: {e}"})
+        else:
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self.batch_slots.release()
+
+async def request_simulations(scenarios, host, port):
+    """Send scenarios to a running service, return their results in the same order
+
+    Scenarios are tagged with their position as id so the results, which
+    come back in completion order, can be put back in order. Scenarios the
+    service couldn't read, which aren't objects or are too long, are answered
+    without sending them.
+    """
+    reader, writer = await asyncio.open_connection(host, port, limit=LINE_LIMIT)
+    results = [None] * len(scenarios)
+
+    async def send():
+        for i, scenario in enumerate(scenarios):
+            if not isinstance(scenario, dict):
+                results[i] = {'id': None, 'error': "Scenario must be a JSON object"}
+                continue
+            request = json.dumps({**scenario, 'id': i}).encode()
+            if len(request) > LINE_LIMIT:
+                results[i] = {'id': scenario.get('id'), 'error': f"Request lines can be at most {LINE_LIMIT} bytes"}
+                continue
+            writer.write(request + b'\n')
+            await writer.drain()
+        writer.write_eof()
+
+    # The service closes the connection once every sent scenario is answered
+    sender = asyncio.create_task(send())
+    while line := await reader.readline():
+        result = json.loads(line)
+        i = result['id']
+        if not isinstance(i, int) or not 0 <= i < len(scenarios) or results[i] is not None:
+            raise ValueError(f"Unexpected result from the simulation service: {result}")
+        results[i] = dict(result, id=scenarios[i].get('id'))
+    await sender
+    writer.close()
+    return results
+
+async def serve(host, port, workers, batch_size):
+    service = SimulationService(host, port, workers, batch_size)
+    await service.start()
+    print(f"Simulation service listening on {service.host}:{service.port}")
+    try:
+        await service.serve_forever()
+    finally:
+        await service.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve simulations over TCP as JSON lines")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--batch-size', type=int, default=64)
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port, args.workers, args.batch_size))
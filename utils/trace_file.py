@@ -0,0 +1,154 @@
+import mmap
+import struct
+from array import array
+
+from entities.simulation_engine import SimulationEngine
+from utils.navigation import DIRECTIONS
+from utils.navigation import DIRECTION_INDEX
+
+# Binary trace layout, all little-endian fixed-width records:
+#   header     magic, version, car count, width, height
+#   states     initial (x, y, direction index) of every car
+#   body       per step its change records, every keyframe_interval steps
+#              followed by a keyframe holding the state of every car
+#   step index (body offset, change count) per step
+#   key index  body offset of each keyframe
+#   collisions (step, x, y, car count) each followed by the car indexes
+#   footer     steps, keyframe interval, section offsets, collision count, magic
+MAGIC = b'ADCT'
+VERSION = 1
+HEADER = struct.Struct('<4sHIQQ')
+STATE = struct.Struct('<IIB')
+CHANGE = struct.Struct('<IIIB')
+STEP_ENTRY = struct.Struct('<QI')
+COLLISION = struct.Struct('<IIII')
+FOOTER = struct.Struct('<QQQQQQ4s')
+
+def write_trace(path, cars, width, height, keyframe_interval=1024):
+    """Simulate the cars and stream every step's changes to a binary trace file
+
+    Only the current state of each car and the small step index are kept in
+    memory, whatever the number of steps. Returns the number of steps written.
+    """
+    states = [(car.x, car.y, DIRECTION_INDEX[car.direction]) for car in cars]
+    step_index = array('Q')
+    change_counts = array('I')
+    key_index = array('Q')
+    collisions = []
+    steps = 0
+
+    with open(path, 'wb') as out:
+        out.write(HEADER.pack(MAGIC, VERSION, len(cars), width, height))
+        out.write(b''.join(STATE.pack(*state) for state in states))
+
+        for record in SimulationEngine(width, height).trace(cars):
+            if record['collisions']:
+                collisions = record['collisions']
+                break
+            steps = record['step']
+            step_index.append(out.tell())
+            change_counts.append(len(record['changes']))
+            packed = []
+            for i, x, y, direction in record['changes']:
+                states[i] = (x, y, DIRECTION_INDEX[direction])
+                packed.append(CHANGE.pack(i, x, y, states[i][2]))
+            out.write(b''.join(packed))
+
+            if steps % keyframe_interval == 0:
+                key_index.append(out.tell())
+                out.write(b''.join(STATE.pack(*state) for state in states))
+
+        index_offset = out.tell()
+        for offset, count in zip(step_index, change_counts):
+            out.write(STEP_ENTRY.pack(offset, count))
+        key_offset = out.tell()
+        out.write(struct.pack(f'<{len(key_index)}Q', *key_index))
+
+        collisions_offset = out.tell()
+        car_indexes = {id(car): i for i, car in enumerate(cars)}
+        for collision in collisions:
+            x, y = collision['position']
+            out.write(COLLISION.pack(collision['step'], x, y, len(collision['cars'])))
+            indexes = [car_indexes[id(car)] for car in collision['cars']]
+            out.write(struct.pack(f'<{len(indexes)}I', *indexes))
+
+        out.write(FOOTER.pack(steps, keyframe_interval, index_offset, key_offset,
+                              collisions_offset, len(collisions), MAGIC))
+    return steps
+
+class TraceReader:
+    """Memory-mapped reader of a binary trace file, seekable to any step"""
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.car_count, self.width, self.height = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError("Not a trace file")
+        (self.steps, self.keyframe_interval, self.index_offset, self.key_offset,
+         self.collisions_offset, self.collision_count, magic) = FOOTER.unpack_from(self.data, len(self.data) - FOOTER.size)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError("Trace file is truncated")
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def read_states(self, offset):
+        return [
+            (x, y, DIRECTIONS[direction])
+            for x, y, direction in STATE.iter_unpack(self.data[offset:offset + self.car_count * STATE.size])
+        ]
+
+    def changes(self, step):
+        """(car index, x, y, direction) of the cars that changed at a step"""
+        if not 1 <= step <= self.steps:
+            raise IndexError(f"Step must be within 1-{self.steps}")
+        offset, count = STEP_ENTRY.unpack_from(self.data, self.index_offset + (step - 1) * STEP_ENTRY.size)
+        return [
+            (i, x, y, DIRECTIONS[direction])
+            for i, x, y, direction in CHANGE.iter_unpack(self.data[offset:offset + count * CHANGE.size])
+        ]
+
+    def state_at(self, step):
+        """(x, y, direction) of every car after a step, 0 being the initial state
+
+        Starts from the nearest keyframe, so at most keyframe_interval steps are replayed.
+        """
+        if not 0 <= step <= self.steps:
+            raise IndexError(f"Step must be within 0-{self.steps}")
+        key = step // self.keyframe_interval
+        if key:
+            (offset,) = struct.unpack_from('<Q', self.data, self.key_offset + (key - 1) * 8)
+            states = self.read_states(offset)
+        else:
+            states = self.read_states(HEADER.size)
+        for replayed in range(key * self.keyframe_interval + 1, step + 1):
+            for i, x, y, direction in self.changes(replayed):
+                states[i] = (x, y, direction)
+        return states
+
+    def replay(self, start=0):
+        """Yield (step, changes) for every step after start"""
+        for step in range(start + 1, self.steps + 1):
+            yield step, self.changes(step)
+
+    def collisions(self):
+        """Collisions that ended the simulation, with car indexes instead of cars"""
+        collisions = []
+        offset = self.collisions_offset
+        for _ in range(self.collision_count):
+            step, x, y, count = COLLISION.unpack_from(self.data, offset)
+            offset += COLLISION.size
+            indexes = list(struct.unpack_from(f'<{count}I', self.data, offset))
+            offset += count * 4
+            collisions.append({'step': step, 'position': (x, y), 'cars': indexes})
+        return collisions